@@ -25,4 +25,6 @@ from app import *
 
 # Application code
 if __name__ == '__main__':
-    Planetoids(width=GAME_WIDTH,height=GAME_HEIGHT).run()
+    Planetoids(width=GAME_WIDTH,height=GAME_HEIGHT,retained=RETAINED_VIEW,
+               atlas=USE_ATLAS,atlas_limit=ATLAS_LIMIT,
+               profile=PROFILE,profile_overlay=PROFILE_OVERLAY).run()
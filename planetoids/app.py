@@ -10,8 +10,9 @@ Aaron Baruch Ilan Klimberg
 12/7/2022
 """
 from consts import *
-from game2d import *
-from wave import *
+from game2d import GameApp, GLabel
+from replay import *
+import os.path
 import json
 
 # PRIMARY RULE: Planetoids can only access attributes in wave.py via getters/setters
@@ -83,6 +84,32 @@ class Planetoids(GameApp):
     #
     # Attribute _lastkeys: the number of keys pressed last frame
     # Invariant: _laskeys is an int >= 0
+    #
+    # Attribute _scene: the state, title, message and wave drawn last frame
+    # Invariant: _scene is a 4-element tuple, or None before the first frame
+    #
+    # Attribute _recorder: the recorder of the player input, if recording
+    # Invariant: _recorder is an InputRecorder, or None if RECORD_FILE is None
+    #
+    # Attribute _replay: the recorded input to play instead of the keyboard
+    # Invariant: _replay is a ReplayInput, or None if REPLAY_FILE is None
+    #
+    # Attribute _messages: the message labels made so far, for reuse
+    # Invariant: _messages is a dict mapping each message text to a GLabel
+    #
+    # Attribute _hud: the score, lives and frame rate shown during play
+    # Invariant: _hud is a list of three GText (the score, lives and frame rate),
+    #            or None before the first wave or if SHOW_HUD is False
+    #
+    # Attribute _frametime: the average time between recent frames, in seconds
+    # Invariant: _frametime is a float >= 0
+    #
+    # Attribute _sounds: the sound effects, shared by every wave
+    # Invariant: _sounds is a SoundLibrary, or None before the first wave or if 
+    #            there are no sounds (SOUND_ENABLED is False, or there is no audio)
+    #
+    # The inherited attribute preloader loads the assets in the background while
+    # the title is up. It is None if PRELOAD_ASSETS is False.
 
     # DO NOT MAKE A NEW INITIALIZER!
 
@@ -100,16 +127,31 @@ class Planetoids(GameApp):
         invariants. When done, it sets the _state to STATE_INACTIVE and creates both 
         the title (in attribute _title) and a message (in attribute _message) saying 
         that the user should press a key to play a game.
+
+        If PRELOAD_ASSETS is True, it also starts loading the images, fonts and
+        sounds of the game, as well as the wave, in the background.
         """
         self._state = STATE_INACTIVE
         self._wave = None
         self._lastkeys = 0
         self._title = GLabel(text='Planetoids',font_size=TITLE_SIZE,\
             font_name=TITLE_FONT,x=400,y=350+TITLE_OFFSET)
-        self._message = GLabel(text="Press 'S' to Start",\
-            font_size=MESSAGE_SIZE,\
-            font_name=MESSAGE_FONT,x=400,y=350+MESSAGE_OFFSET)
+        self._messages = {}
+        self._message = self._getMessage("Press 'S' to Start")
         self._sdown = False
+        self._scene = None
+        self._recorder = None
+        self._replay = None
+        self._sounds = None
+        self._hud = None
+        self._frametime = 0.0
+        if not REPLAY_FILE is None:
+            self._replay = ReplayInput(REPLAY_FILE)
+        elif not RECORD_FILE is None:
+            self._recorder = InputRecorder(self.input, RECORD_FILE)
+        if PRELOAD_ASSETS:
+            self.preload(PRELOAD_IMAGES, PRELOAD_FONTS, PRELOAD_SOUNDS,
+                [self._prepareWave], PRELOAD_BUDGET)
 
     def update(self,dt):
         """
@@ -152,29 +194,44 @@ class Planetoids(GameApp):
         You are allowed to add more states if you wish. Should you do so, you should
         describe them here.
         
+        If the game is replaying a recording, the recorded dt and keys are used
+        for this frame instead, and the game stops at the end of the recording.
+        If the game is recording, the keys are captured before they are used.
+
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
+        if not self._replay is None:
+            dt = self._replay.advance()
+            if dt is None:
+                self.stop()
+                return
+        elif not self._recorder is None:
+            self._recorder.capture(dt)
         self._determineState()
         if self._state == STATE_LOADING:
-            json = self.load_json(DEFAULT_WAVE)
+            if not self.preloader is None:
+                self.preloader.finish()
+            json = self._loadWave()
             start = True
             lives = 3
-            self._wave = Wave(json, lives, start)
+            self._wave = self._makeWave(json, lives, start)
             self._state = STATE_ACTIVE
         if self._state == STATE_CONTINUE:
             lives = self._wave.getLives()
             asteroids = self._wave.getAsteroids()
             start = False
-            json = self.load_json(DEFAULT_WAVE)
-            self._wave = Wave(json, lives, start, asteroids)
+            json = self._wave.getData()
+            score = self._wave.getScore()
+            pools = self._wave.getAsteroidPools()
+            self._wave = self._makeWave(json, lives, start, asteroids, score,\
+                pools)
             self._state = STATE_ACTIVE
         self._activeState(dt)
         if self._state == STATE_PAUSED:
-            self._message = GLabel(text="Press 'S' to Continue",\
-                font_size=MESSAGE_SIZE,font_name=MESSAGE_FONT,\
-                x=400,y=350+MESSAGE_OFFSET)
+            self._message = self._getMessage("Press 'S' to Continue")
             self._determineState()
+        self._updateHud(dt)
     
     def draw(self):
         """
@@ -188,6 +245,7 @@ class Planetoids(GameApp):
         attributes or you need to add a draw method to class Wave. We suggest the latter. 
         See the example subcontroller.py from class.
         """
+        self._clearScene()
         if self._state == STATE_INACTIVE:
             self._message.draw(self.view)
             self._title.draw(self.view)
@@ -199,6 +257,18 @@ class Planetoids(GameApp):
         if self._state == STATE_COMPLETE:
             self._wave.draw(self.view)
             self._message.draw(self.view)
+        if not self._hud is None and self._state != STATE_INACTIVE:
+            for text in self._hud:
+                text.draw(self.view)
+    
+    def finish(self):
+        """
+        Closes the recording of the player input, if the game is recording.
+
+        The recorder buffers its frames, so this writes out the last of them.
+        """
+        if not self._recorder is None:
+            self._recorder.close()
     
     # HELPER METHODS FOR THE STATES GO HERE
     def _determineState(self):
@@ -213,7 +283,7 @@ class Planetoids(GameApp):
         change the state.
         """
         # Determine if the 'S' key is currently pressed
-        if self.input.is_key_down('s'):
+        if self._getInput().is_key_down('s'):
             self._sdown = True
         else:
             self._sdown = False
@@ -231,7 +301,7 @@ class Planetoids(GameApp):
             elif self._state == STATE_PAUSED:
                 self._state = STATE_CONTINUE
                 self._message = None
-        self._lastkeys = self.input.key_count
+        self._lastkeys = self._getInput().key_count
 
     def _activeState(self, dt):
         """
@@ -245,18 +315,184 @@ class Planetoids(GameApp):
         Precondition: dt is a number (int or float)
         """
         if self._state == STATE_ACTIVE:
-            self._wave.update(dt, self.input)    
+            self._wave.update(dt, self._getInput())    
             if self._wave.shipDied():
                 self._wave.decrementLives()
                 if self._wave.getLives() == 0:
-                    self._message = GLabel(text='You Lost', \
-                        font_size=MESSAGE_SIZE,\
-                        font_name=MESSAGE_FONT,x=400,y=350+MESSAGE_OFFSET)
+                    self._message = self._getMessage('You Lost')
                     self._state = STATE_COMPLETE
                 else:
                     self._state = STATE_PAUSED
             elif self._wave.getAllDestroyed() == True:
-                self._message = GLabel(text='Congratulations! You Won!',\
-                    font_size=MESSAGE_SIZE,\
-                    font_name=MESSAGE_FONT,x=400,y=350+MESSAGE_OFFSET)
-                self._state = STATE_COMPLETE
\ No newline at end of file
+                self._message = self._getMessage('Congratulations! You Won!')
+                self._state = STATE_COMPLETE
+
+    def _getMessage(self, text):
+        """
+        Returns the message label with the given text.
+
+        Each message is only made once, and is reused whenever it is shown 
+        again. So a message shown every frame (such as while paused) is not 
+        rendered again, and does not change the scene (see _clearScene).
+
+        Parameter text: the text of the message
+        Precondition: text is a string
+        """
+        if not text in self._messages:
+            self._messages[text] = GLabel(text=text,font_size=MESSAGE_SIZE,\
+                font_name=MESSAGE_FONT,x=400,y=350+MESSAGE_OFFSET)
+        return self._messages[text]
+
+    def _clearScene(self):
+        """
+        Clears the view if it is in retained mode and the scene has changed.
+
+        In retained mode, objects stay on screen until they are erased. The
+        wave erases its own objects as they are destroyed, but the title, the 
+        message and the wave itself are replaced as the state changes. So the
+        view is cleared whenever one of them (or the state) is different from
+        the last frame, and the new scene is drawn from scratch.
+        """
+        scene = (self._state, self._title, self._message, self._wave)
+        if self.view.retained and not self._scene is None:
+            if any(a is not b for a, b in zip(scene,self._scene)):
+                self.view.clear()
+        self._scene = scene
+
+    def _makeWave(self, json, lives, start, asteroids=None, score=0, \
+        pools=None):
+        """
+        Returns a new Wave with the given data, lives and asteroids.
+
+        The wave module (and with it, numpy and the models) is imported here,
+        rather than at the top of this module. The title screen does not need
+        any of it, so the first frame is drawn without waiting for it. The
+        sound effects are loaded with the first wave, for the same reason.
+
+        Parameter json: the data of the wave
+        Precondition: json is a dict, PackedWave or WaveStream (see _loadWave)
+
+        Parameter lives: current value of lives left in the wave.
+        Precondition: lives is an int.
+
+        Parameter start: indicates whether the wave is being started 
+        for the first time.
+        Precondition: start is a bool True or False.
+
+        Parameter asteroids: Current asteroids in the wave after the 
+        player has died.
+        Precondition: asteroids is a list of Asteroid objects, or None
+
+        Parameter score: the points scored before this wave
+        Precondition: score is an int >= 0
+
+        Parameter pools: the asteroid pools of the wave being continued
+        Precondition: pools is a dict returned by Wave.getAsteroidPools, or None
+        """
+        from wave import Wave
+        if self._sounds is None and SOUND_ENABLED:
+            self._sounds = self._makeSounds()
+        if self._hud is None and SHOW_HUD:
+            self._hud = self._makeHud()
+        return Wave(json, lives, start, asteroids, self._sounds, score, pools)
+
+    def _makeHud(self):
+        """
+        Returns the texts showing the score, lives and frame rate.
+
+        The score is in the top left corner, the lives at the top center, and 
+        the frame rate in the top right corner. These are GText objects, which 
+        draw from a glyph atlas of HUD_FONT, so that changing them every frame 
+        does not render any text.
+        """
+        from game2d import GText
+        top = GAME_HEIGHT-HUD_MARGIN
+        score = GText(text='SCORE 0',font_name=HUD_FONT,font_size=HUD_SIZE,\
+            linecolor=HUD_COLOR,halign='left',left=HUD_MARGIN,top=top)
+        lives = GText(text='LIVES 0',font_name=HUD_FONT,font_size=HUD_SIZE,\
+            linecolor=HUD_COLOR,x=GAME_WIDTH/2,top=top)
+        rate = GText(text='FPS 0',font_name=HUD_FONT,font_size=HUD_SIZE,\
+            linecolor=HUD_COLOR,halign='right',right=GAME_WIDTH-HUD_MARGIN,top=top)
+        return [score, lives, rate]
+
+    def _updateHud(self, dt):
+        """
+        Updates the score, lives and frame rate shown during play.
+
+        The frame rate is averaged over the last few frames, so that it can 
+        be read.
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        self._frametime += (dt-self._frametime)*0.1
+        if self._hud is None or self._wave is None:
+            return
+        self._hud[0].text = 'SCORE %d' % self._wave.getScore()
+        self._hud[1].text = 'LIVES %d' % self._wave.getLives()
+        if self._frametime > 0:
+            self._hud[2].text = 'FPS %d' % round(1/self._frametime)
+
+    def _makeSounds(self):
+        """
+        Returns a SoundLibrary with the sound effects of the game, or None if 
+        there is no audio.
+
+        Each sound is loaded SOUND_VOICES times, so that it can overlap
+        itself, and at most SOUND_LIMIT sounds play at once. The keys are
+        the file names of the sounds. A sound is only loaded the first time
+        it is played, and the sounds not played recently are unloaded to keep
+        them within SOUND_BUDGET bytes. The exception is FIRE_SOUND, which is 
+        loaded right away to find out whether there is audio at all. Any other
+        sound that cannot be loaded is simply not played.
+        """
+        from game2d import SoundLibrary
+        sounds = SoundLibrary(SOUND_VOICES, SOUND_LIMIT, True, SOUND_BUDGET)
+        for name in GAME_SOUNDS:
+            sounds[name] = name
+        if sounds[FIRE_SOUND] is None:
+            return None
+        return sounds
+
+    def _loadWave(self):
+        """
+        Returns the data of the wave DEFAULT_WAVE in the Data folder.
+
+        This is a dictionary if DEFAULT_WAVE is a JSON file, and a PackedWave
+        if it is a compiled wave file.  Either can be used to create a Wave.
+        If the file is larger than STREAM_SIZE, it is a WaveStream instead, so
+        that play can start before the whole file is read.
+        """
+        from wavefile import isWaveFile, loadWave, WaveStream
+        path = os.path.join(self.json,DEFAULT_WAVE)
+        if os.path.isfile(path) and os.path.getsize(path) > STREAM_SIZE:
+            return WaveStream(path)
+        if isWaveFile(DEFAULT_WAVE):
+            return loadWave(path)
+        return self.load_json(DEFAULT_WAVE)
+
+    def _prepareWave(self):
+        """
+        Imports the wave module and reads the wave DEFAULT_WAVE ahead of time.
+
+        This method is called by the preloader on its worker thread, while the
+        title is up. The wave data is kept in the cache of load_json (or of
+        loadWave), so _loadWave does not read the file again. A wave that is
+        streamed is not read here, as only its first asteroids are needed to
+        start.
+        """
+        import wave
+        path = os.path.join(self.json,DEFAULT_WAVE)
+        if not (os.path.isfile(path) and os.path.getsize(path) > STREAM_SIZE):
+            self._loadWave()
+
+    def _getInput(self):
+        """
+        Returns the input to play the game with.
+
+        This is the recorded input if the game is replaying a recording, and the
+        input attribute (the keyboard) otherwise.
+        """
+        if not self._replay is None:
+            return self._replay
+        return self.input
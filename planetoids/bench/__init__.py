@@ -0,0 +1,104 @@
+"""
+Benchmarks for Planetoids
+
+This package contains reproducible benchmarks for the game.  The benchmarks run the
+simulation headless (see headless.py), so they do not need a display, and they are
+not limited to the 60 frames a second scheduled by GameApp.
+
+The benchmarks must be run as modules from the planetoids folder, so that they can
+import the game modules.  For example:
+
+    python -m bench.wave_update --output results.json
+
+Each benchmark writes its results as JSON, so that they can be compared across
+releases.  This module has the parts that the benchmarks share: the description of
+the machine in every result, the timing loop, and the command line.
+"""
+import os
+
+# The benchmarks always run headless; this must happen before the models are imported
+os.environ.setdefault('PLANETOIDS_HEADLESS','1')
+
+import platform
+import argparse
+import json
+import time
+import gc
+
+
+def metadata(benchmark):
+    """
+    Returns a dictionary describing a run of the given benchmark.
+
+    The dictionary has the name of the benchmark, the Python version, the platform,
+    and the time of the run.  A benchmark adds its results to this dictionary.
+
+    Parameter benchmark: the name of the benchmark
+    Precondition: benchmark is a string
+    """
+    return {'benchmark': benchmark,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def timed(func, repeats=1):
+    """
+    Returns the best time (in seconds) of repeats calls to func.
+
+    The garbage collector is turned off while timing, as timeit does.
+
+    Parameter func: the function to time
+    Precondition: func is a function of no arguments
+
+    Parameter repeats: the number of times to call func
+    Precondition: repeats is an int > 0
+    """
+    best = None
+    for repeat in range(repeats):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter()-start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(description, addArguments, run, args=None):
+    """
+    Runs a benchmark from the command line.
+
+    The command line has the arguments added by addArguments, and the option
+    --output to name the JSON file for the results.  Without it, the results are
+    printed to standard output.
+
+    Parameter description: the description of the benchmark for --help
+    Precondition: description is a string
+
+    Parameter addArguments: the function to add the benchmark arguments
+    Precondition: addArguments is a function taking an ArgumentParser
+
+    Parameter run: the function to run the benchmark
+    Precondition: run is a function taking the parsed arguments and returning a
+    dictionary that can be written as JSON
+
+    Parameter args: the command line arguments (without the program name)
+    Precondition: args is None or a list of strings
+    """
+    parser = argparse.ArgumentParser(description=description)
+    addArguments(parser)
+    parser.add_argument('--output',default=None,
+                        help='the JSON file to write (default: standard output)')
+    options = parser.parse_args(args)
+
+    text = json.dumps(run(options),indent=2)
+    if options.output is None:
+        print(text)
+    else:
+        with open(options.output,'w') as f:
+            f.write(text+'\n')
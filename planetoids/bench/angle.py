@@ -0,0 +1,147 @@
+"""
+Micro-benchmark of the game2d angle setter
+
+Setting the angle of a GObject has to decide whether the angle really changed, as a
+change invalidates the cached transform matrix.  This module times that update for an
+angle that changes every time (as when the ship turns) and for one that stays the same
+(as when the ship is drawn without turning).  Each is timed with the current setter,
+and with the setter it replaced, which compared the angles with numpy.allclose.  The
+results are written as JSON.
+
+This benchmark needs Kivy, as it uses the real game2d classes.  To run it from the
+planetoids folder:
+
+    python -m bench.angle --updates 100000 --output results.json
+"""
+import os
+# Kivy claims the command line options unless told otherwise
+os.environ.setdefault('KIVY_NO_ARGS','1')
+
+from . import metadata, timed, main
+from consts import *
+from game2d import GEllipse
+import numpy as np
+import sys
+
+# The default number of angle updates to time
+DEFAULT_UPDATES = 100000
+# The default number of times to run each workload
+DEFAULT_REPEATS = 10
+
+
+def setAngle(obj, value):
+    """
+    Sets the angle of obj to value with the angle setter of game2d.
+
+    Parameter obj: the object to turn
+    Precondition: obj is a GObject
+
+    Parameter value: the new angle
+    Precondition: value is an int or float
+    """
+    obj.angle = value
+
+
+def setAngleAllclose(obj, value):
+    """
+    Sets the angle of obj to value the way the angle setter used to.
+
+    This imported numpy and compared the angles with numpy.allclose on every call.
+
+    Parameter obj: the object to turn
+    Precondition: obj is a GObject
+
+    Parameter value: the new angle
+    Precondition: value is an int or float
+    """
+    import numpy as np
+    assert type(value) in [int,float], '%s is not a number' % repr(value)
+    diff = np.allclose([obj._rotate.angle],[value])
+    obj._rotate.angle = float(value)
+    if not diff:
+        obj._mtrue = False
+
+
+# The angle setters to compare
+SETTERS = {'scalar': setAngle, 'allclose': setAngleAllclose}
+
+
+def turnAngles(count):
+    """
+    Returns a list of count angles, each SHIP_TURN_RATE more than the last.
+
+    Parameter count: the number of angles
+    Precondition: count is an int > 0
+    """
+    return [(i*SHIP_TURN_RATE) % 360.0 for i in range(count)]
+
+
+def setAngles(setter, obj, angles):
+    """
+    Sets the angle of obj to each value in angles, in order.
+
+    Parameter setter: the angle setter to use
+    Precondition: setter is one of the values of SETTERS
+
+    Parameter obj: the object to turn
+    Precondition: obj is a GObject
+
+    Parameter angles: the angles to set, in order
+    Precondition: angles is a list of numbers
+    """
+    for value in angles:
+        setter(obj,value)
+
+
+def run(count=DEFAULT_UPDATES, repeats=DEFAULT_REPEATS):
+    """
+    Returns a dictionary of results for the current and the old angle setter.
+
+    Each setter is timed repeats times on each workload, and the best time per
+    update (in ns) is reported.
+
+    Parameter count: the number of angle updates per workload
+    Precondition: count is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+    """
+    obj = GEllipse(x=GAME_WIDTH/2,y=GAME_HEIGHT/2,width=2*SHIP_RADIUS,
+                   height=2*SHIP_RADIUS,fillcolor=BULLET_COLOR)
+    workloads = {'changing': turnAngles(count), 'unchanged': [90.0]*count}
+    results = {}
+    for name in SETTERS:
+        results[name] = {}
+        for workload in workloads:
+            obj.angle = 0
+            elapsed = timed(lambda: setAngles(SETTERS[name],obj,workloads[workload]),
+                            repeats)
+            results[name][workload] = 1e9*elapsed/count
+
+    speedup = {}
+    for workload in workloads:
+        speedup[workload] = results['allclose'][workload]/results['scalar'][workload]
+    result = metadata('angle')
+    result.update({'numpy': np.__version__,
+                   'updates': count, 'repeats': repeats,
+                   'scalar_ns': results['scalar'], 'allclose_ns': results['allclose'],
+                   'speedup': speedup})
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--updates',type=int,default=DEFAULT_UPDATES,
+                        help='the number of angle updates per workload')
+    parser.add_argument('--repeats',type=int,default=DEFAULT_REPEATS,
+                        help='the number of times to run each workload')
+
+
+if __name__ == '__main__':
+    main('Benchmark the game2d angle setter.',addArguments,
+         lambda options: run(options.updates,options.repeats),sys.argv[1:])
@@ -0,0 +1,139 @@
+"""
+Micro-benchmark of showing a text message
+
+Planetoids shows a message (such as "Press 'S' to Continue") every frame while the
+game is paused.  This module times the cost of that per frame, four ways:
+
+    widget: a new Kivy Label widget each frame, which is what GLabel used to build
+    cold:   a new GLabel each frame, rendering its text (the texture cache is cleared)
+    cached: a new GLabel each frame, taking its texture from the texture cache
+    reused: the same GLabel each frame, as Planetoids now does
+
+The results (the best time per frame, in microseconds) are written as JSON.  This
+benchmark needs Kivy and a window, as the text is rendered to textures.  To run it
+from the planetoids folder:
+
+    python -m bench.label --frames 200 --output results.json
+"""
+import os
+# Kivy claims the command line options unless told otherwise
+os.environ.setdefault('KIVY_NO_ARGS','1')
+
+from . import metadata, timed, main
+from consts import *
+from game2d import GameApp, GLabel
+# Textures can only be made once there is a window
+from kivy.core.window import Window
+import sys
+
+# The default number of frames to time
+DEFAULT_FRAMES = 200
+# The default number of times to run each workload
+DEFAULT_REPEATS = 5
+# The message to show
+MESSAGE = "Press 'S' to Continue"
+
+
+def makeWidget():
+    """
+    Returns a Kivy Label widget with the message, rendered the way GLabel used to.
+    """
+    from kivy.uix.label import Label
+    label = Label(text=MESSAGE,font_size=MESSAGE_SIZE,font_name=MESSAGE_FONT)
+    label.size_hint = (None,None)
+    label.texture_update()
+    label.size = label.texture_size
+    return label
+
+
+def makeLabel():
+    """
+    Returns a new GLabel with the message, as Planetoids used to make every frame.
+    """
+    return GLabel(text=MESSAGE,font_size=MESSAGE_SIZE,font_name=MESSAGE_FONT,
+                  x=GAME_WIDTH/2,y=GAME_HEIGHT/2+MESSAGE_OFFSET)
+
+
+def makeCold():
+    """
+    Returns a new GLabel with the message, after emptying the texture cache.
+    """
+    GLabel.TEXTURE_CACHE.clear()
+    return makeLabel()
+
+
+def reuseLabel(label):
+    """
+    Returns label, after setting its text to the message (which it already has).
+
+    Parameter label: the label to reuse
+    Precondition: label is a GLabel with the text MESSAGE
+    """
+    label.text = MESSAGE
+    return label
+
+
+def showFrames(function, frames):
+    """
+    Calls function frames times, once for each frame.
+
+    Parameter function: the function showing the message
+    Precondition: function is a function of no arguments
+
+    Parameter frames: the number of calls
+    Precondition: frames is an int > 0
+    """
+    for frame in range(frames):
+        function()
+
+
+def run(frames=DEFAULT_FRAMES, repeats=DEFAULT_REPEATS):
+    """
+    Returns a dictionary of the time per frame (in us) of each way to show the message.
+
+    Each workload is timed repeats times, and the best time is reported.
+
+    Parameter frames: the number of frames per workload
+    Precondition: frames is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+    """
+    # Find the Fonts folder the way a running game does
+    GameApp.fonts = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))),'Fonts')
+    import kivy.resources
+    kivy.resources.resource_add_path(GameApp.fonts)
+
+    reused = makeLabel()
+    workloads = {'widget': makeWidget, 'cold': makeCold, 'cached': makeLabel,
+                 'reused': lambda: reuseLabel(reused)}
+    results = {}
+    for name in workloads:
+        elapsed = timed(lambda: showFrames(workloads[name],frames),repeats)
+        results[name] = 1e6*elapsed/frames
+
+    result = metadata('label')
+    result.update({'frames': frames, 'repeats': repeats,
+                   'frame_us': results,
+                   'speedup': {'cached': results['widget']/results['cached'],
+                               'reused': results['widget']/results['reused']}})
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--frames',type=int,default=DEFAULT_FRAMES,
+                        help='the number of frames per workload')
+    parser.add_argument('--repeats',type=int,default=DEFAULT_REPEATS,
+                        help='the number of times to run each workload')
+
+
+if __name__ == '__main__':
+    main('Benchmark showing a GLabel message.',addArguments,
+         lambda options: run(options.frames,options.repeats),sys.argv[1:])
@@ -0,0 +1,187 @@
+"""
+Benchmark of the game2d property setters, with and without their checks
+
+This module times the attribute updates that the Planetoids models make every frame:
+moving an object (as in Asteroid.move and Bullet.move), wrapping it around the screen
+(as in Wave._wrap), turning it (as in Ship.turn), and creating a new object.  The checks
+in the setters are asserts, so each workload is timed in a normal Python process, and
+again in one started with python -O, which removes them.  The results are written as
+JSON.
+
+This benchmark needs Kivy, as it uses the real game2d classes.  To run it from the
+planetoids folder:
+
+    python -m bench.setters --objects 1000 --output results.json
+"""
+import os
+# Kivy claims the command line options unless told otherwise
+os.environ.setdefault('KIVY_NO_ARGS','1')
+
+from . import metadata, timed, main
+from consts import *
+from game2d import GEllipse
+import subprocess
+import json
+import sys
+
+# The default number of objects to update
+DEFAULT_OBJECTS = 1000
+# The default number of times to run each workload
+DEFAULT_REPEATS = 20
+
+
+def moveObjects(objects):
+    """
+    Moves every object by one step, the way Asteroid.move does.
+
+    Parameter objects: the objects to move
+    Precondition: objects is a list of GObject
+    """
+    for obj in objects:
+        obj.x += 1.5
+        obj.y -= 0.5
+
+
+def wrapObjects(objects):
+    """
+    Wraps every object around the screen, the way Wave._wrap does.
+
+    Parameter objects: the objects to wrap
+    Precondition: objects is a list of GObject
+    """
+    for obj in objects:
+        if obj.x > GAME_WIDTH+DEAD_ZONE:
+            obj.x = obj.x - (GAME_WIDTH+2*DEAD_ZONE)
+        if obj.x < -DEAD_ZONE:
+            obj.x = obj.x + (GAME_WIDTH+2*DEAD_ZONE)
+        if obj.y > GAME_HEIGHT+DEAD_ZONE:
+            obj.y = obj.y - (GAME_HEIGHT+2*DEAD_ZONE)
+        if obj.y < -DEAD_ZONE:
+            obj.y = obj.y + (GAME_HEIGHT+2*DEAD_ZONE)
+
+
+def turnObjects(objects):
+    """
+    Turns every object by SHIP_TURN_RATE, the way Wave turns the ship.
+
+    Parameter objects: the objects to turn
+    Precondition: objects is a list of GObject
+    """
+    for obj in objects:
+        obj.angle += SHIP_TURN_RATE
+
+
+def makeObjects(count):
+    """
+    Returns a list of count new objects, the way Wave makes bullets.
+
+    Parameter count: the number of objects
+    Precondition: count is an int >= 0
+    """
+    return [GEllipse(x=i % GAME_WIDTH,y=i % GAME_HEIGHT,width=2*BULLET_RADIUS,
+                     height=2*BULLET_RADIUS,fillcolor=BULLET_COLOR) for i in range(count)]
+
+
+# The workloads, as functions of the list of objects
+WORKLOADS = {'move': moveObjects, 'wrap': wrapObjects, 'turn': turnObjects,
+             'create': lambda objects: makeObjects(len(objects))}
+
+
+# The program run by each process.  It prints the result of measure.
+_PROGRAM = '''
+import os, sys, json
+os.environ['KIVY_NO_ARGS'] = '1'
+from bench.setters import measure
+sys.stdout.write('SETTERS '+json.dumps(measure(%d,%d))+'\\n')
+'''
+
+
+def measure(count, repeats):
+    """
+    Returns a dictionary of the best time per object (in ns) of each workload.
+
+    This is run in a separate process for each mode, as python -O cannot be turned
+    on or off once Python has started.
+
+    Parameter count: the number of objects per workload
+    Precondition: count is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+    """
+    objects = makeObjects(count)
+    result = {}
+    for name in WORKLOADS:
+        result[name] = 1e9*timed(lambda: WORKLOADS[name](objects),repeats)/count
+    return result
+
+
+def measureProcess(folder, count, repeats, optimize):
+    """
+    Returns the result of measure, run in a new Python process.
+
+    Parameter folder: the planetoids folder
+    Precondition: folder is a string naming the folder with consts.py
+
+    Parameter count: the number of objects per workload
+    Precondition: count is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+
+    Parameter optimize: whether to start the process with python -O
+    Precondition: optimize is a bool
+    """
+    command = [sys.executable]+(['-O'] if optimize else [])
+    command += ['-c',_PROGRAM % (count,repeats)]
+    output = subprocess.run(command,cwd=folder,stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL,universal_newlines=True).stdout
+    for line in output.splitlines():
+        if line.startswith('SETTERS '):
+            return json.loads(line[8:])
+    raise RuntimeError('the benchmark process did not finish')
+
+
+def run(count=DEFAULT_OBJECTS, repeats=DEFAULT_REPEATS):
+    """
+    Returns a dictionary of results for the checked and the optimized setters.
+
+    Each workload is run repeats times in a normal process and in a python -O
+    process, and the best time per object (in ns) is reported.
+
+    Parameter count: the number of objects per workload
+    Precondition: count is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+    """
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    checked = measureProcess(folder,count,repeats,False)
+    optimized = measureProcess(folder,count,repeats,True)
+
+    speedup = {}
+    for name in checked:
+        speedup[name] = checked[name]/optimized[name]
+    result = metadata('setters')
+    result.update({'objects': count, 'repeats': repeats,
+                   'checked_ns': checked, 'optimized_ns': optimized,
+                   'speedup': speedup})
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--objects',type=int,default=DEFAULT_OBJECTS,
+                        help='the number of objects per workload')
+    parser.add_argument('--repeats',type=int,default=DEFAULT_REPEATS,
+                        help='the number of times to run each workload')
+
+
+if __name__ == '__main__':
+    main('Benchmark the game2d setters.',addArguments,
+         lambda options: run(options.objects,options.repeats),sys.argv[1:])
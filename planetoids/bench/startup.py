@@ -0,0 +1,120 @@
+"""
+Benchmark of the Planetoids cold start
+
+This module measures how long the game takes to start: from launching a new Python
+process to the first frame drawn by Planetoids on screen (the first flip of the
+window after Planetoids.draw has run).  It also reports how long the imports of the
+game modules took, and which of the heavier subsystems (numpy, audio, the wave
+simulation) were already loaded by the first frame.  The results are written as JSON.
+
+Every run is a fresh process, so nothing is cached by the Python interpreter between
+runs (the operating system may still cache the files themselves).  Each run opens a
+window, so this benchmark needs a display.  To run it from the planetoids folder:
+
+    python -m bench.startup --runs 5 --output results.json
+"""
+from . import metadata, main
+import subprocess
+import os.path
+import json
+import time
+import sys
+
+# The default number of processes to start
+DEFAULT_RUNS = 5
+
+# The modules whose presence at the first frame is reported
+WATCHED = ('numpy', 'kivy.core.audio', 'kivy.uix.image', 'introcs', 'wave', 'models',
+           'game2d.gbatch', 'game2d.sound')
+
+# The program run by each process.  It stops the game at its first frame.
+_PROGRAM = '''
+import time
+start = time.time()
+import os, sys, json
+os.environ['KIVY_NO_ARGS'] = '1'
+sys.argv = sys.argv[:1]
+from consts import *
+from app import Planetoids
+imported = time.time()
+
+from kivy.core.window import Window
+drawn = []
+draw = Planetoids.draw
+def first(self):
+    draw(self)
+    drawn.append(True)
+Planetoids.draw = first
+
+def flip(window):
+    if drawn:
+        Window.unbind(on_flip=flip)
+        result = {'start': start, 'imported': imported, 'frame': time.time(),
+                  'modules': [name for name in %r if name in sys.modules]}
+        sys.stdout.write('STARTUP '+json.dumps(result)+'\\n')
+        sys.stdout.flush()
+        game.stop()
+Window.bind(on_flip=flip)
+
+game = Planetoids(width=GAME_WIDTH,height=GAME_HEIGHT,retained=RETAINED_VIEW,
+                  atlas=USE_ATLAS,atlas_limit=ATLAS_LIMIT)
+game.run()
+'''
+
+
+def startOnce(folder):
+    """
+    Returns a dictionary of the timings (in ms) of one cold start of the game.
+
+    Parameter folder: the planetoids folder
+    Precondition: folder is a string naming the folder with app.py
+    """
+    program = _PROGRAM % (WATCHED,)
+    launch = time.time()
+    output = subprocess.run([sys.executable,'-c',program],cwd=folder,
+                            stdout=subprocess.PIPE,stderr=subprocess.DEVNULL,
+                            universal_newlines=True).stdout
+    for line in output.splitlines():
+        if line.startswith('STARTUP '):
+            data = json.loads(line[8:])
+            return {'interpreter_ms': 1000*(data['start']-launch),
+                    'imports_ms': 1000*(data['imported']-data['start']),
+                    'first_frame_ms': 1000*(data['frame']-launch),
+                    'modules': data['modules']}
+    raise RuntimeError('the game did not draw a frame')
+
+
+def run(runs=DEFAULT_RUNS):
+    """
+    Returns a dictionary of results for runs cold starts of the game.
+
+    The median and best of each timing are reported, with the modules that were
+    loaded by the first frame (in the last run).
+
+    Parameter runs: the number of processes to start
+    Precondition: runs is an int > 0
+    """
+    folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = [startOnce(folder) for run in range(runs)]
+    result = metadata('startup')
+    result.update({'runs': runs, 'modules': samples[-1]['modules']})
+    for key in ('interpreter_ms', 'imports_ms', 'first_frame_ms'):
+        values = sorted(sample[key] for sample in samples)
+        result[key] = {'median': values[len(values)//2], 'best': values[0]}
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--runs',type=int,default=DEFAULT_RUNS,
+                        help='the number of processes to start')
+
+
+if __name__ == '__main__':
+    main('Benchmark the Planetoids cold start.',addArguments,
+         lambda options: run(options.runs),sys.argv[1:])
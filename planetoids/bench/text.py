@@ -0,0 +1,105 @@
+"""
+Micro-benchmark of text that changes every frame
+
+The Planetoids HUD shows the score, the lives and the frame rate, and the frame rate
+changes nearly every frame.  This module times the cost per frame of changing such a
+text, two ways:
+
+    label: a GLabel, which renders the whole text to a texture when it changes
+    text:  a GText, which only moves the quads of its characters in a glyph atlas
+
+Each frame shows a different number, so the texture cache of GLabel never helps.  The
+results (the best time per frame, in microseconds) are written as JSON.  This benchmark
+needs Kivy and a window, as the text is rendered to textures.  To run it from the
+planetoids folder:
+
+    python -m bench.text --frames 200 --output results.json
+"""
+import os
+# Kivy claims the command line options unless told otherwise
+os.environ.setdefault('KIVY_NO_ARGS','1')
+
+from . import metadata, timed, main
+from consts import *
+from game2d import GameApp, GLabel, GText
+# Textures can only be made once there is a window
+from kivy.core.window import Window
+import sys
+
+# The default number of frames to time
+DEFAULT_FRAMES = 200
+# The default number of times to run each workload
+DEFAULT_REPEATS = 5
+# The format of the text shown
+MESSAGE = 'SCORE %d'
+
+
+def showFrames(shape, frames):
+    """
+    Changes the text of shape frames times, once for each frame.
+
+    Every frame sets a text that the shape has not shown before.
+
+    Parameter shape: the object showing the text
+    Precondition: shape is a GLabel or a GText
+
+    Parameter frames: the number of frames
+    Precondition: frames is an int > 0
+    """
+    offset = showFrames.count
+    showFrames.count += frames
+    for frame in range(offset,offset+frames):
+        shape.text = MESSAGE % frame
+
+# The number of texts shown so far, so that no text is shown twice
+showFrames.count = 0
+
+
+def run(frames=DEFAULT_FRAMES, repeats=DEFAULT_REPEATS):
+    """
+    Returns a dictionary of the time per frame (in us) of each way to show the text.
+
+    Each workload is timed repeats times, and the best time is reported.
+
+    Parameter frames: the number of frames per workload
+    Precondition: frames is an int > 0
+
+    Parameter repeats: the number of times to run each workload
+    Precondition: repeats is an int > 0
+    """
+    # Find the Fonts folder the way a running game does
+    GameApp.fonts = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))),'Fonts')
+    import kivy.resources
+    kivy.resources.resource_add_path(GameApp.fonts)
+
+    workloads = {'label': GLabel(text=MESSAGE % 0,font_name=HUD_FONT,font_size=HUD_SIZE),
+                 'text':  GText(text=MESSAGE % 0,font_name=HUD_FONT,font_size=HUD_SIZE)}
+    results = {}
+    for name in workloads:
+        elapsed = timed(lambda: showFrames(workloads[name],frames),repeats)
+        results[name] = 1e6*elapsed/frames
+
+    result = metadata('text')
+    result.update({'frames': frames, 'repeats': repeats,
+                   'frame_us': results,
+                   'speedup': results['label']/results['text']})
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--frames',type=int,default=DEFAULT_FRAMES,
+                        help='the number of frames per workload')
+    parser.add_argument('--repeats',type=int,default=DEFAULT_REPEATS,
+                        help='the number of times to run each workload')
+
+
+if __name__ == '__main__':
+    main('Benchmark changing the text of a HUD.',addArguments,
+         lambda options: run(options.frames,options.repeats),sys.argv[1:])
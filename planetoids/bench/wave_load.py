@@ -0,0 +1,191 @@
+"""
+Benchmark of loading a wave from a JSON file and from a wave file
+
+This module times how long it takes to go from a file on disk to a ready Wave, for
+synthetic waves of increasing size.  Each wave is saved as JSON and compiled to a
+wave file (see wavefile.py).  It is then loaded both ways, and the time to read the
+file and the time to build the Wave from it are reported separately, in ms.
+
+The JSON file is also read with a WaveStream.  For the stream, the benchmark reports
+the time until the Wave can start play, and the peak memory used to read the whole
+file (compared to loading it with json.load).  The results are written as JSON.
+
+To run this benchmark from the planetoids folder:
+
+    python -m bench.wave_load --sizes 100 1000 10000 50000 --output results.json
+"""
+from . import metadata, timed, main
+from .waves import makeWave
+from consts import *
+from wave import Wave
+import wavefile
+import tracemalloc
+import tempfile
+import shutil
+import os.path
+import json
+import time
+import sys
+
+# The default numbers of asteroids to benchmark
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+# The default number of times to load each wave
+DEFAULT_REPEATS = 5
+
+
+def readJson(path):
+    """
+    Returns the wave dictionary in the JSON file at path.
+
+    Parameter path: the file name
+    Precondition: path is a string naming a wave JSON file
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def readPacked(path):
+    """
+    Returns the PackedWave in the wave file at path, bypassing the cache.
+
+    Parameter path: the file name
+    Precondition: path is a string naming a wave file
+    """
+    wavefile._cache.clear()
+    return wavefile.loadWave(path)
+
+
+def readMapped(path):
+    """
+    Returns the memory mapped PackedWave in the wave file at path, bypassing the cache.
+
+    Parameter path: the file name
+    Precondition: path is a string naming a wave file
+    """
+    wavefile._cache.clear()
+    return wavefile.loadWave(path,True)
+
+
+def drainStream(path):
+    """
+    Returns the number of asteroids read from the file at path with a WaveStream.
+
+    The asteroids are read STREAM_BATCH at a time, and thrown away.
+
+    Parameter path: the file name
+    Precondition: path is a string naming a wave JSON file or wave file
+    """
+    stream = wavefile.WaveStream(path)
+    while not stream.isDone():
+        stream.readAsteroids(STREAM_BATCH)
+    return stream.getCount()
+
+
+def peakMemory(function, path):
+    """
+    Returns the peak memory (in KB) allocated while calling function(path).
+
+    Parameter function: the function to measure
+    Precondition: function is a function of one argument
+
+    Parameter path: the argument to the function
+    Precondition: path is a string
+    """
+    tracemalloc.start()
+    try:
+        function(path)
+        return tracemalloc.get_traced_memory()[1]/1024
+    finally:
+        tracemalloc.stop()
+
+
+# The readers to compare, with the file each one reads
+READERS = {'json': (readJson, '.json'), 'packed': (readPacked, wavefile.WAVE_SUFFIX),
+           'mapped': (readMapped, wavefile.WAVE_SUFFIX)}
+
+
+def runWave(count, folder, repeats=DEFAULT_REPEATS, seed=0):
+    """
+    Returns a dictionary of load times for a synthetic wave of count asteroids.
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int > 0
+
+    Parameter folder: the folder to write the wave files to
+    Precondition: folder is a string naming an existing folder
+
+    Parameter repeats: the number of times to load the wave each way
+    Precondition: repeats is an int > 0
+
+    Parameter seed: the seed of the synthetic wave
+    Precondition: seed is an int
+    """
+    data = makeWave(count,seed)
+    base = os.path.join(folder,'wave%d' % count)
+    with open(base+'.json','w') as f:
+        json.dump(data,f)
+    wavefile.compileWave(data,base+wavefile.WAVE_SUFFIX)
+
+    result = {'asteroids': count, 'bytes': {}, 'read_ms': {}, 'wave_ms': {}}
+    for name in READERS:
+        reader, suffix = READERS[name]
+        result['bytes'][name] = os.path.getsize(base+suffix)
+        for repeat in range(repeats):
+            start = time.perf_counter()
+            loaded = reader(base+suffix)
+            middle = time.perf_counter()
+            Wave(loaded,3,True)
+            end = time.perf_counter()
+            read = 1000*(middle-start)
+            made = 1000*(end-middle)
+            result['read_ms'][name] = min(result['read_ms'].get(name,read),read)
+            result['wave_ms'][name] = min(result['wave_ms'].get(name,made),made)
+
+    first = timed(lambda: Wave(wavefile.WaveStream(base+'.json'),3,True),repeats)
+    result['stream_first_ms'] = 1000*first
+    result['peak_kb'] = {'json': peakMemory(readJson,base+'.json'),
+                         'stream': peakMemory(drainStream,base+'.json')}
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, repeats=DEFAULT_REPEATS, seed=0):
+    """
+    Returns a dictionary of the results for every wave size.
+
+    Parameter sizes: the numbers of asteroids to benchmark
+    Precondition: sizes is a list of ints > 0
+
+    Parameter repeats: the number of times to load each wave each way
+    Precondition: repeats is an int > 0
+
+    Parameter seed: the seed of the synthetic waves
+    Precondition: seed is an int
+    """
+    folder = tempfile.mkdtemp()
+    try:
+        waves = [runWave(count,folder,repeats,seed) for count in sizes]
+    finally:
+        shutil.rmtree(folder,ignore_errors=True)
+    result = metadata('wave_load')
+    result.update({'repeats': repeats, 'seed': seed, 'waves': waves})
+    return result
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--sizes',type=int,nargs='+',default=list(DEFAULT_SIZES),
+                        help='the numbers of asteroids to benchmark')
+    parser.add_argument('--repeats',type=int,default=DEFAULT_REPEATS,
+                        help='the number of times to load each wave each way')
+    parser.add_argument('--seed',type=int,default=0,
+                        help='the seed of the synthetic waves')
+
+
+if __name__ == '__main__':
+    main('Benchmark loading Planetoids waves.',addArguments,
+         lambda options: run(options.sizes,options.repeats,options.seed),sys.argv[1:])
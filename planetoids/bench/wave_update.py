@@ -0,0 +1,247 @@
+"""
+Benchmark of the Planetoids simulation hot path
+
+This module times Wave.update, and the collision step Wave._collisions inside of it,
+on synthetic waves of increasing size.  For each wave it reports the mean, 95th and
+99th percentile cost of a frame, as well as the memory allocated per frame.  The
+results are written as JSON.
+
+The ship turns left every frame, and fires a configurable number of bullets per
+frame, so that the bullets spread out over the field.  If the ship is destroyed, it
+is restored the same way as Planetoids does in STATE_CONTINUE (a new Wave with the
+current asteroids).  Restoring the ship is not part of the timings.
+
+To run this benchmark from the planetoids folder:
+
+    python -m bench.wave_update --sizes 10 100 1000 10000 --output results.json
+"""
+from . import metadata, main
+from .waves import makeWave
+from consts import *
+from headless import HeadlessInput
+from wave import Wave
+import numpy as np
+import tracemalloc
+import time
+import sys
+
+# The default numbers of asteroids to benchmark
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+# The default number of frames to time per wave
+DEFAULT_FRAMES = 300
+
+
+def summarize(samples):
+    """
+    Returns a dictionary with the mean, p95, p99 and max of the given samples.
+
+    Parameter samples: the samples to summarize
+    Precondition: samples is a nonempty list of numbers
+    """
+    values = np.array(samples,dtype=float)
+    return {'mean': float(values.mean()),
+            'p95': float(np.percentile(values,95)),
+            'p99': float(np.percentile(values,99)),
+            'max': float(values.max())}
+
+
+class FrameTimer(object):
+    """
+    A class that times each call of a wave's collision step.
+
+    The method wrap replaces _collisions of a Wave with a timed version.  The time
+    of every call (in seconds) is added to the list of samples.
+    """
+    # Attribute samples: the time of each call, in seconds
+    # Invariant: samples is a list of floats >= 0
+
+    def __init__(self):
+        """
+        Initializes a new timer with no samples.
+        """
+        self.samples = []
+
+    def wrap(self, wave):
+        """
+        Replaces the collision step of wave with a timed version.
+
+        Parameter wave: the wave to time
+        Precondition: wave is a Wave object
+        """
+        step = wave._collisions
+        def timed():
+            start = time.perf_counter()
+            step()
+            self.samples.append(time.perf_counter()-start)
+        wave._collisions = timed
+
+
+def runWave(count, frames=DEFAULT_FRAMES, fire=1, seed=0, memory=True):
+    """
+    Returns a dictionary of results for a synthetic wave of count asteroids.
+
+    The times are in microseconds, and the allocations in bytes.  The allocations
+    are measured in a second pass over the same frames, as tracing allocations
+    slows down the simulation too much to time it.
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int >= 0
+
+    Parameter frames: the number of frames to run
+    Precondition: frames is an int > 0
+
+    Parameter fire: the number of bullets the ship fires each frame
+    Precondition: fire is an int >= 0
+
+    Parameter seed: the seed for the synthetic wave
+    Precondition: seed is an int
+
+    Parameter memory: whether to measure the allocations per frame
+    Precondition: memory is a bool
+    """
+    data = makeWave(count,seed)
+    update = []
+    collisions = FrameTimer()
+    restarts = _simulate(data,frames,fire,update,collisions)
+
+    result = {'asteroids': count, 'fire': fire, 'frames': len(update),
+              'restarts': restarts,
+              'update_us': summarize([1e6*t for t in update]),
+              'collisions_us': summarize([1e6*t for t in collisions.samples])}
+
+    if memory:
+        peaks = []
+        tracemalloc.start()
+        try:
+            _simulate(data,frames,fire,None,None,peaks)
+            result['alloc_bytes'] = summarize(peaks)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run(sizes=DEFAULT_SIZES, frames=DEFAULT_FRAMES, fire=1, seed=0, memory=True):
+    """
+    Returns a dictionary of results for synthetic waves of each of the given sizes.
+
+    Parameter sizes: the numbers of asteroids
+    Precondition: sizes is a list of ints >= 0
+
+    Parameter frames: the number of frames to run per wave
+    Precondition: frames is an int > 0
+
+    Parameter fire: the number of bullets the ship fires each frame
+    Precondition: fire is an int >= 0
+
+    Parameter seed: the seed for the synthetic waves
+    Precondition: seed is an int
+
+    Parameter memory: whether to measure the allocations per frame
+    Precondition: memory is a bool
+    """
+    results = []
+    for count in sizes:
+        results.append(runWave(count,frames,fire,seed,memory))
+    result = metadata('wave_update')
+    result.update({'numpy': np.__version__, 'results': results})
+    return result
+
+
+# HIDDEN FUNCTIONS
+def _simulate(data, frames, fire, update, collisions, peaks=None):
+    """
+    Returns the number of times the ship was restored while simulating data.
+
+    Parameter data: the wave to simulate
+    Precondition: data is a wave dictionary
+
+    Parameter frames: the number of frames to run
+    Precondition: frames is an int > 0
+
+    Parameter fire: the number of bullets the ship fires each frame
+    Precondition: fire is an int >= 0
+
+    Parameter update: the list to add the time of each Wave.update to
+    Precondition: update is a list, or None to skip timing
+
+    Parameter collisions: the timer for the collision step
+    Precondition: collisions is a FrameTimer, or None to skip timing
+
+    Parameter peaks: the list to add the peak allocation of each frame to
+    Precondition: peaks is a list, or None if tracemalloc is not running
+    """
+    input = HeadlessInput('left')
+    wave = _makeWave(data,None,collisions)
+    restarts = 0
+    for frame in range(frames):
+        if wave.getAllDestroyed():
+            break
+        if wave.shipDied():
+            wave = _makeWave(data,wave,collisions)
+            restarts += 1
+        for shot in range(fire):
+            wave._addBullets()
+
+        if not peaks is None:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        wave.update(1/60,input)
+        elapsed = time.perf_counter()-start
+        if not update is None:
+            update.append(elapsed)
+        if not peaks is None:
+            peaks.append(tracemalloc.get_traced_memory()[1]-base)
+    return restarts
+
+
+def _makeWave(data, previous, collisions):
+    """
+    Returns a new Wave for data, with a timed collision step.
+
+    A wave continuing another is given its asteroids and asteroid pools, as
+    Planetoids does after the ship is destroyed.
+
+    Parameter data: the wave to simulate
+    Precondition: data is a wave dictionary
+
+    Parameter previous: the wave to continue, or None to start the wave
+    Precondition: previous is None or a Wave object
+
+    Parameter collisions: the timer for the collision step
+    Precondition: collisions is a FrameTimer, or None to skip timing
+    """
+    if previous is None:
+        wave = Wave(data,SHIP_LIVES,True)
+    else:
+        wave = Wave(data,SHIP_LIVES,False,previous.getAsteroids(),\
+            pools=previous.getAsteroidPools())
+    if not collisions is None:
+        collisions.wrap(wave)
+    return wave
+
+
+
+def addArguments(parser):
+    """
+    Adds the arguments of this benchmark to parser.
+
+    Parameter parser: the command line parser
+    Precondition: parser is an ArgumentParser
+    """
+    parser.add_argument('--sizes',type=int,nargs='+',default=list(DEFAULT_SIZES),
+                        help='the numbers of asteroids to benchmark')
+    parser.add_argument('--frames',type=int,default=DEFAULT_FRAMES,
+                        help='the number of frames to time per wave')
+    parser.add_argument('--fire',type=int,default=1,
+                        help='the number of bullets fired per frame')
+    parser.add_argument('--seed',type=int,default=0,
+                        help='the seed for the synthetic waves')
+    parser.add_argument('--no-memory',action='store_true',
+                        help='skip measuring the allocations per frame')
+
+
+if __name__ == '__main__':
+    main('Benchmark Wave.update.',addArguments,
+         lambda options: run(options.sizes,options.frames,options.fire,options.seed,
+                             not options.no_memory),sys.argv[1:])
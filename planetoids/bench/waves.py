@@ -0,0 +1,56 @@
+"""
+Synthetic waves for the Planetoids benchmarks
+
+This module builds wave dictionaries in the same schema as the files in the Data
+folder: a "ship" with a "position" and "angle", and a list of "asteroids", each with
+a "size", "position" and "direction".  The waves can have any number of asteroids,
+and are generated from a seed so that every run of a benchmark sees the same wave.
+"""
+from consts import *
+import random
+
+# The default fraction of large, medium and small asteroids in a synthetic wave
+DEFAULT_MIX = (0.34, 0.33, 0.33)
+
+
+def makeWave(count, seed=0, mix=DEFAULT_MIX, clearance=3*LARGE_RADIUS):
+    """
+    Returns a synthetic wave dictionary with count asteroids.
+
+    The ship is in the center of the game view, facing up.  The asteroids are placed
+    at random, but no closer to the ship than clearance, so the ship survives the
+    first frames.  Their directions are random (and never zero).
+
+    Parameter count: the number of asteroids
+    Precondition: count is an int >= 0
+
+    Parameter seed: the seed for the random number generator
+    Precondition: seed is an int
+
+    Parameter mix: the fractions of large, medium and small asteroids
+    Precondition: mix is a 3-element tuple of numbers >= 0, not all 0
+
+    Parameter clearance: the smallest distance from an asteroid to the ship
+    Precondition: clearance is a number >= 0, less than half of GAME_HEIGHT
+    """
+    rnd = random.Random(seed)
+    cx = GAME_WIDTH/2
+    cy = GAME_HEIGHT/2
+    sizes = (LARGE_ASTEROID, MEDIUM_ASTEROID, SMALL_ASTEROID)
+
+    asteroids = []
+    while len(asteroids) < count:
+        x = rnd.randint(0,GAME_WIDTH)
+        y = rnd.randint(0,GAME_HEIGHT)
+        if (x-cx)**2+(y-cy)**2 < clearance**2:
+            continue
+        direction = [0,0]
+        while direction == [0,0]:
+            direction = [rnd.randint(-100,100), rnd.randint(-100,100)]
+        size = rnd.choices(sizes,weights=mix)[0]
+        asteroids.append({'size': size, 'position': [x,y], 'direction': direction})
+
+    return {'version': 1.0,
+            'comment': 'Synthetic wave of %d asteroids (seed %d)' % (count,seed),
+            'ship': {'position': [cx,cy], 'angle': 90},
+            'asteroids': asteroids}
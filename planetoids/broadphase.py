@@ -0,0 +1,187 @@
+"""
+Broadphase collision module for Planetoids
+
+This module contains a uniform-grid spatial hash for the asteroid field, and the
+vectorized narrow-phase kernel that tests the pairs it finds.  Testing every
+bullet against every asteroid costs O(bullets x asteroids) distance computations each
+frame, even though almost all of those pairs are on opposite sides of the screen.
+
+The class SpatialGrid buckets the asteroids into square cells.  The cells are large
+enough that two objects can only collide if they are in the same cell or in adjacent
+cells.  So only the asteroids in the 3x3 block of cells around a bullet (or the ship)
+need to reach the narrow-phase test, and the collision cost scales with the local
+density of asteroids instead of the size of the whole field.
+
+The grid is rebuilt each frame from the positions in an AsteroidField.  Rather than a
+dictionary of cells, the rebuild sorts the asteroids by cell key, which is a single
+NumPy call.  A query is then a binary search for each row of the 3x3 block.
+
+The function collide is the narrow phase.  Instead of computing one distance (with a
+square root) per pair in Python, it computes the squared distances of a whole batch of
+pairs in one NumPy expression and compares them to precomputed squared radius sums.
+
+Both work on plain NumPy arrays (the positions and reaches from an AsteroidField), so
+this module uses only consts.py and NumPy.
+"""
+from consts import *
+import numpy as np
+
+# The offset added to the vertical cell coordinate so that it is never negative
+_CELL_OFFSET = 1 << 20
+# The number of vertical cell coordinates per column of the grid
+_CELL_SPAN = 1 << 21
+
+
+def collide(points, centers, reach, pairs=None):
+    """
+    Returns the pairs (p, a) of points and asteroids that collide, as int arrays.
+
+    A point p collides with asteroid a if the squared distance between them is less
+    than reach[a].  The pairs are sorted by asteroid, and then by point.
+
+    If pairs is None, every point is tested against every asteroid, computing all the
+    squared distances as a single (points x asteroids) NumPy broadcast.  Otherwise,
+    pairs is a pair of int arrays (p, a) of candidate pairs, such as the result of
+    SpatialGrid.pairs, and only those pairs are tested.
+
+    Parameter points: the centers of the points (bullets or the ship)
+    Precondition: points is a float array of shape (m,2)
+
+    Parameter centers: the asteroid centers
+    Precondition: centers is a float array of shape (n,2)
+
+    Parameter reach: the squared collision distance of each asteroid, as returned
+    by AsteroidField.getReach
+    Precondition: reach is a float array of shape (n,)
+
+    Parameter pairs: the candidate pairs to test
+    Precondition: pairs is None or a pair of int arrays of the same length
+    """
+    if pairs is None:
+        delta = centers[:,None,:]-points[None,:,:]
+        distance = np.einsum('ijk,ijk->ij',delta,delta)
+        return np.nonzero(distance < reach[:,None])[::-1]
+
+    p, a = pairs
+    delta = centers[a]-points[p]
+    distance = np.einsum('ij,ij->i',delta,delta)
+    mask = distance < reach[a]
+    p = p[mask]
+    a = a[mask]
+    order = np.lexsort((p,a))
+    return (p[order],a[order])
+
+
+class SpatialGrid(object):
+    """
+    A class representing a uniform grid over the asteroids in a wave.
+
+    The cell size must be at least the largest possible distance at which two
+    objects can collide (the sum of their radii).  Then any object colliding with
+    a point is in the cell of that point, or in one of the eight neighboring cells.
+    """
+    # Attribute _size: the width and height of a grid cell
+    # Invariant: _size is a float > 0
+    #
+    # Attribute _keys: the sorted cell keys of the asteroids
+    # Invariant: _keys is a sorted int64 array with one entry per asteroid
+    #
+    # Attribute _order: the asteroid indices, sorted by cell key
+    # Invariant: _order is an int64 array with _keys[j] the key of asteroid _order[j]
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getCellSize(self):
+        """
+        Returns the width (and height) of a grid cell.
+        """
+        return self._size
+
+    # INITIALIZER
+    def __init__(self, size=GRID_CELL_SIZE):
+        """
+        Initializes a new, empty spatial grid.
+
+        Parameter size: the width and height of a grid cell
+        Precondition: size is an int or float > 0, and at least the largest sum of
+        radii of two colliding objects
+        """
+        self._size = float(size)
+        self._keys = np.zeros(0,dtype=np.int64)
+        self._order = np.zeros(0,dtype=np.int64)
+
+    def __len__(self):
+        """
+        Returns the number of asteroids in the grid.
+        """
+        return len(self._keys)
+
+    # ADDITIONAL METHODS
+    def rebuild(self, positions):
+        """
+        Rebuilds the grid from the given asteroid positions.
+
+        Parameter positions: the asteroid centers, as returned by
+        AsteroidField.getPositions
+        Precondition: positions is a float array of shape (n,2)
+        """
+        keys = self._cellKeys(positions)
+        self._order = np.argsort(keys,kind='stable')
+        self._keys = keys[self._order]
+
+    def query(self, x, y):
+        """
+        Returns a sorted array of the indices of the asteroids near (x,y).
+
+        An asteroid is near (x,y) if it is in the cell of (x,y) or in one of the
+        eight neighboring cells.
+
+        Parameter x: The horizontal coordinate of the point
+        Precondition: x is an int or float
+
+        Parameter y: The vertical coordinate of the point
+        Precondition: y is an int or float
+        """
+        points = np.array([[x,y]],dtype=float)
+        return np.sort(self.pairs(points)[1])
+
+    def pairs(self, points):
+        """
+        Returns the candidate pairs between the given points and the asteroids.
+
+        The result is a pair of int arrays (p, a) of the same length.  Entry j is a
+        candidate pair of point p[j] and asteroid a[j], meaning that asteroid a[j] is
+        in the 3x3 block of cells around point p[j].  The pairs are sorted by point.
+
+        Parameter points: the points to query (bullet centers, for example)
+        Precondition: points is a float array of shape (m,2)
+        """
+        empty = np.zeros(0,dtype=np.int64)
+        if len(points) == 0 or len(self._keys) == 0:
+            return (empty,empty)
+
+        # For a fixed column, the three rows of the block are contiguous keys
+        center = self._cellKeys(points)
+        queries = (center[:,None]+_CELL_SPAN*np.arange(-1,2)[None,:]).ravel()
+        lo = np.searchsorted(self._keys,queries-1,side='left')
+        hi = np.searchsorted(self._keys,queries+1,side='right')
+
+        # Expand each range [lo,hi) into one pair per asteroid
+        counts = hi-lo
+        total = int(counts.sum())
+        if total == 0:
+            return (empty,empty)
+        starts = np.repeat(lo-np.cumsum(counts)+counts,counts)
+        slots = starts+np.arange(total)
+        owners = np.repeat(np.arange(len(points)).repeat(3),counts)
+        return (owners,self._order[slots])
+
+    # HIDDEN METHODS
+    def _cellKeys(self, points):
+        """
+        Returns the cell keys of the given points as an int64 array.
+
+        Parameter points: the points to convert
+        Precondition: points is a float array of shape (n,2)
+        """
+        cells = np.floor(points/self._size).astype(np.int64)
+        return cells[:,0]*_CELL_SPAN+(cells[:,1]+_CELL_OFFSET)
@@ -8,8 +8,8 @@ we separate the constants into their own module. This allows all modules to acce
 # YOUR NAME(S) AND NETID(S) HERE
 # DATE COMPLETED HERE
 """
-import introcs
 import sys
+import os
 
 ### WINDOW CONSTANTS (all coordinates are in pixels) ###
 
@@ -72,6 +72,18 @@ SMALL_RADIUS = 16
 # The speed of a small planetoid
 SMALL_SPEED  = 3
 
+# The most planetoids of each size made ahead of time for the splits of a wave
+ASTEROID_RESERVE = 256
+
+# The cell size of the collision grid. Two objects can only collide if they are
+# in the same or adjacent cells, so this must be at least LARGE_RADIUS+SHIP_RADIUS
+GRID_CELL_SIZE = 2*LARGE_RADIUS
+# The largest number of bullet-asteroid pairs to test without the collision grid
+COLLISION_BROADCAST_LIMIT = 4096
+
+# The points scored for shooting a planetoid, by size
+SCORE_POINTS = {LARGE_ASTEROID: 20, MEDIUM_ASTEROID: 50, SMALL_ASTEROID: 100}
+
 ### BULLET CONSTANTS ###
 
 # The radius of a bullet (width/2 and height/2)
@@ -83,6 +95,16 @@ BULLET_RATE   = 30
 # The color of a bullet
 BULLET_COLOR   = 'red'
 
+### SIMULATION CONSTANTS ###
+
+# The length of a simulation tick in seconds, or None for one tick per animation frame.
+# All speeds and rates above are per tick, so a fixed tick keeps the game speed the
+# same no matter how often the animation frames arrive.
+SIM_TIMESTEP = None
+# The most ticks to run in one animation frame. Time beyond this is dropped, so that
+# the game does not try to catch up forever after a stall.
+SIM_MAX_STEPS = 5
+
 ### GAME CONSTANTS ###
 
 # state before the game has started
@@ -114,10 +136,90 @@ MESSAGE_SIZE = 60
 # The y-offset for the message (the value to add to the center y value)
 MESSAGE_OFFSET = -70
 
+# The font choice for the score, lives and frame rate shown during play
+HUD_FONT = 'RetroGame.ttf'
+# The font size for the score, lives and frame rate
+HUD_SIZE = 24
+# The color of the score, lives and frame rate
+HUD_COLOR = 'black'
+# The distance of the score, lives and frame rate from the edges of the window
+HUD_MARGIN = 10
+# Whether to show the score, lives and frame rate during play
+SHOW_HUD = True
+
+### HEADLESS CONSTANTS ###
+
+# Whether to run the simulation without Kivy (set PLANETOIDS_HEADLESS=1 to enable)
+HEADLESS = os.environ.get('PLANETOIDS_HEADLESS','0') not in ('','0')
+
+### REPLAY CONSTANTS ###
+
+# The file to record the player input to (set PLANETOIDS_RECORD to enable)
+RECORD_FILE = os.environ.get('PLANETOIDS_RECORD') or None
+# The file to replay the player input from (set PLANETOIDS_REPLAY to enable)
+REPLAY_FILE = os.environ.get('PLANETOIDS_REPLAY') or None
+
+### DRAWING CONSTANTS ###
+
+# Whether to keep objects on screen between frames, instead of redrawing them all
+RETAINED_VIEW = True
+# Whether to draw all of the asteroids as a single batch (a GImageBatch)
+BATCH_ASTEROIDS = True
+# Whether to pack the Images folder into a shared texture atlas at startup
+USE_ATLAS = True
+# The largest width or height of an image in the atlas (larger images are scaled down)
+ATLAS_LIMIT = 512
+
+### SOUND CONSTANTS ###
+
+# Whether to play sound effects (set PLANETOIDS_MUTE=1 to turn them off)
+SOUND_ENABLED = os.environ.get('PLANETOIDS_MUTE','0') in ('','0')
+# The sound of a bullet being fired
+FIRE_SOUND = 'pew1.wav'
+# The sound of the ship being destroyed
+CRASH_SOUND = 'explosion.wav'
+# The sounds of a planetoid being destroyed, by size
+BLAST_SOUNDS = {LARGE_ASTEROID: 'blast1.wav', MEDIUM_ASTEROID: 'blast2.wav',
+                SMALL_ASTEROID: 'blast3.wav'}
+# Every sound effect of the game
+GAME_SOUNDS = [FIRE_SOUND, CRASH_SOUND]+list(BLAST_SOUNDS.values())
+# The number of copies of each sound loaded, so that it can overlap itself
+SOUND_VOICES = 4
+# The most sounds that can play at once
+SOUND_LIMIT = 8
+# The most memory (in bytes) for loaded sounds. The least recently played are unloaded.
+SOUND_BUDGET = 8 << 20
+
+### PRELOADING CONSTANTS ###
+
+# Whether to load the images, fonts and wave in the background while the title is up
+PRELOAD_ASSETS = True
+# The most time (in seconds) to spend each frame making textures of preloaded images
+PRELOAD_BUDGET = 0.002
+# The images to preload (every image used by the models)
+PRELOAD_IMAGES = [SHIP_IMAGE, SHIELD_IMAGE, LARGE_IMAGE, MEDIUM_IMAGE, SMALL_IMAGE]
+# The fonts to preload, as (font, size) pairs
+PRELOAD_FONTS = [(TITLE_FONT, TITLE_SIZE), (MESSAGE_FONT, MESSAGE_SIZE)]
+# The sounds to preload
+PRELOAD_SOUNDS = GAME_SOUNDS
+# The checks in the game2d setters are asserts.  To skip them, run the game with
+# python -O (or set PYTHONOPTIMIZE=1).  See bench/setters.py for what this saves.
+
+### PROFILING CONSTANTS ###
+
+# Whether to profile each animation frame (set PLANETOIDS_PROFILE=1 to enable)
+PROFILE = os.environ.get('PLANETOIDS_PROFILE','0') not in ('','0')
+# Whether to show the frame profile on screen (set PLANETOIDS_PROFILE=overlay)
+PROFILE_OVERLAY = os.environ.get('PLANETOIDS_PROFILE') == 'overlay'
+
 ### JSON FILES ###
 
 # The default wave
 DEFAULT_WAVE  = 'wave1.json'
+# Wave files larger than this many bytes are streamed in, rather than loaded at once
+STREAM_SIZE   = 1 << 20
+# The most asteroids to add from a streamed wave file in one animation frame
+STREAM_BATCH  = 500
 
 ### USE COMMAND LINE ARGUMENTS TO CHANGE DEFAULT LEVEL FILE
 """
@@ -128,11 +230,12 @@ everything after the word python. So if you start the game typing
 
 Python puts ['planetoids', 'default.json'] into sys.argv. Below, we take advantage of 
 this fact to change the constant DEFAULT_LEVEL. This is the level file to be used when 
-you start the game.  
+you start the game.  It may also be a compiled wave file (see wavefile.py), ending in
+'.wave'.
 """
 try:
     file = sys.argv[1]
-    if file[-5:].lower() == '.json':
+    if file[-5:].lower() in ('.json', '.wave'):
         DEFAULT_WAVE = file
     else:
         DEFAULT_WAVE = file+'.json'
@@ -0,0 +1,272 @@
+"""
+Asteroid field module for Planetoids
+
+This module contains an array-backed store for the asteroids in a wave.  Moving every
+Asteroid object one at a time is slow, because each step goes through the x and y
+properties of GObject.  With thousands of asteroids on screen, that per-object Python
+path is the bottleneck of the whole game.
+
+Instead, the class AsteroidField keeps the positions, velocities, radii and size tiers
+of all the asteroids in contiguous NumPy arrays (a struct of arrays).  Movement and
+wrap-around are then a single vectorized step per frame.  The Asteroid objects are
+only brought up to date when they are needed, such as when they are drawn.
+
+The field only holds numbers.  It uses consts.py and NumPy, and knows nothing of the
+Asteroid objects or of game2d, so it works the same headless.
+"""
+from consts import *
+import numpy as np
+
+# The size names of the asteroids, indexed by tier
+TIERS = (SMALL_ASTEROID, MEDIUM_ASTEROID, LARGE_ASTEROID)
+# The speeds of the asteroids, indexed by tier
+TIER_SPEEDS = np.array([SMALL_SPEED, MEDIUM_SPEED, LARGE_SPEED],dtype=float)
+# The radii of the asteroids, indexed by tier
+TIER_RADII = np.array([SMALL_RADIUS, MEDIUM_RADIUS, LARGE_RADIUS],dtype=float)
+
+
+def sizeTier(size):
+    """
+    Returns the tier (0, 1 or 2) of the given asteroid size name.
+
+    Parameter size: the size of the asteroid.
+    Precondition: size is a string; either 'small', 'medium', or 'large'.
+    """
+    return TIERS.index(size)
+
+
+class AsteroidField(object):
+    """
+    A class storing the state of all asteroids in a wave as NumPy arrays.
+
+    Row i of each array is the state of the i-th asteroid.  Wave keeps the rows in
+    the same order as its list of Asteroid objects, so that index i refers to the
+    same asteroid in both.  Rows are appended at the end and removed in place,
+    exactly like the list.
+
+    The arrays have a capacity that grows by doubling, so appending an asteroid does
+    not reallocate the arrays every time.  Only the first len(field) rows are valid.
+    """
+    # Attribute _pos: the asteroid centers, one (x,y) pair per row
+    # Invariant: _pos is a float64 array of shape (capacity,2)
+    #
+    # Attribute _vel: the asteroid velocities, one (x,y) pair per row
+    # Invariant: _vel is a float64 array of shape (capacity,2)
+    #
+    # Attribute _radius: the asteroid radii
+    # Invariant: _radius is a float64 array of shape (capacity,)
+    #
+    # Attribute _tier: the asteroid size tiers (indices into TIERS)
+    # Invariant: _tier is an int8 array of shape (capacity,)
+    #
+    # Attribute _count: the number of asteroids in the field
+    # Invariant: _count is an int, 0 <= _count <= capacity
+    #
+    # Attribute _reach: the squared collision distances, cached by other radius
+    # Invariant: _reach is a dict mapping a radius r to the array (radii+r)**2 of
+    # the current asteroids; it is emptied whenever an asteroid is added or removed
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getPositions(self):
+        """
+        Returns a view of the asteroid centers as an (n,2) array.
+
+        The array is a view, not a copy.  It becomes invalid as soon as an asteroid
+        is added or removed.
+        """
+        return self._pos[:self._count]
+
+    def getVelocities(self):
+        """
+        Returns a view of the asteroid velocities as an (n,2) array.
+        """
+        return self._vel[:self._count]
+
+    def getRadii(self):
+        """
+        Returns a view of the asteroid radii as an (n,) array.
+        """
+        return self._radius[:self._count]
+
+    def getTiers(self):
+        """
+        Returns a view of the asteroid size tiers as an (n,) array.
+        """
+        return self._tier[:self._count]
+
+    def getPosition(self, i):
+        """
+        Returns the center of the i-th asteroid as a pair of floats.
+
+        Parameter i: the asteroid index
+        Precondition: i is an int, 0 <= i < len(self)
+        """
+        return (float(self._pos[i,0]), float(self._pos[i,1]))
+
+    def getReach(self, radius):
+        """
+        Returns the squared collision distances for an object of the given radius.
+
+        Entry i of the result is the square of (radius of asteroid i + radius). An
+        object of the given radius collides with asteroid i if its squared distance
+        to the asteroid center is less than this value.  The result is computed
+        once and cached until an asteroid is added or removed.
+
+        Parameter radius: the radius of the other object (a bullet or the ship)
+        Precondition: radius is an int or float >= 0
+        """
+        if not radius in self._reach:
+            self._reach[radius] = (self._radius[:self._count]+radius)**2
+        return self._reach[radius]
+
+    def getRadius(self, i):
+        """
+        Returns the radius of the i-th asteroid as a float.
+
+        Parameter i: the asteroid index
+        Precondition: i is an int, 0 <= i < len(self)
+        """
+        return float(self._radius[i])
+
+    # INITIALIZER
+    def __init__(self, capacity=16):
+        """
+        Initializes a new, empty asteroid field.
+
+        Parameter capacity: the number of rows to allocate up front
+        Precondition: capacity is an int > 0
+        """
+        self._pos = np.zeros((capacity,2))
+        self._vel = np.zeros((capacity,2))
+        self._radius = np.zeros(capacity)
+        self._tier = np.zeros(capacity,dtype=np.int8)
+        self._count = 0
+        self._reach = {}
+
+    def __len__(self):
+        """
+        Returns the number of asteroids in the field.
+        """
+        return self._count
+
+    # ADDITIONAL METHODS (MOVEMENT, ETC)
+    def append(self, x, y, vx, vy, radius, size):
+        """
+        Adds an asteroid to the end of the field.
+
+        Parameter x: The horizontal coordinate of the asteroid center.
+        Precondition: x is an int or float.
+
+        Parameter y: The vertical coordinate of the asteroid center.
+        Precondition: y is an int or float.
+
+        Parameter vx: The horizontal component of the asteroid velocity.
+        Precondition: vx is an int or float.
+
+        Parameter vy: The vertical component of the asteroid velocity.
+        Precondition: vy is an int or float.
+
+        Parameter radius: The radius of the asteroid.
+        Precondition: radius is an int or float > 0.
+
+        Parameter size: the size of the asteroid.
+        Precondition: size is a string; either 'small', 'medium', or 'large'.
+        """
+        self.reserve(self._count+1)
+        n = self._count
+        self._pos[n,0] = x
+        self._pos[n,1] = y
+        self._vel[n,0] = vx
+        self._vel[n,1] = vy
+        self._radius[n] = radius
+        self._tier[n] = sizeTier(size)
+        self._count += 1
+        self._reach.clear()
+
+    def extend(self, positions, velocities, radii, tiers):
+        """
+        Adds many asteroids to the end of the field at once.
+
+        This is the bulk version of append, copying whole arrays into the field.
+
+        Parameter positions: the asteroid centers
+        Precondition: positions is an (n,2) array of numbers
+
+        Parameter velocities: the asteroid velocities
+        Precondition: velocities is an (n,2) array of numbers
+
+        Parameter radii: the asteroid radii
+        Precondition: radii is an (n,) array of numbers > 0
+
+        Parameter tiers: the asteroid size tiers (indices into TIERS)
+        Precondition: tiers is an (n,) array of ints 0..2
+        """
+        n = self._count
+        m = n+len(tiers)
+        self.reserve(m)
+        self._pos[n:m] = positions
+        self._vel[n:m] = velocities
+        self._radius[n:m] = radii
+        self._tier[n:m] = tiers
+        self._count = m
+        self._reach.clear()
+
+    def remove(self, i):
+        """
+        Removes the i-th asteroid, shifting the rows after it down by one.
+
+        This keeps the rows in the same order as a list after del list[i].
+
+        Parameter i: the asteroid index
+        Precondition: i is an int, 0 <= i < len(self)
+        """
+        n = self._count
+        self._pos[i:n-1] = self._pos[i+1:n]
+        self._vel[i:n-1] = self._vel[i+1:n]
+        self._radius[i:n-1] = self._radius[i+1:n]
+        self._tier[i:n-1] = self._tier[i+1:n]
+        self._count -= 1
+        self._reach.clear()
+
+    def reserve(self, capacity):
+        """
+        Grows the arrays (by doubling) so they hold at least capacity rows.
+
+        Parameter capacity: the number of rows required
+        Precondition: capacity is an int >= 0
+        """
+        size = len(self._radius)
+        if capacity <= size:
+            return
+        while size < capacity:
+            size *= 2
+        n = self._count
+        pos = np.zeros((size,2))
+        pos[:n] = self._pos[:n]
+        vel = np.zeros((size,2))
+        vel[:n] = self._vel[:n]
+        radius = np.zeros(size)
+        radius[:n] = self._radius[:n]
+        tier = np.zeros(size,dtype=np.int8)
+        tier[:n] = self._tier[:n]
+        self._pos = pos
+        self._vel = vel
+        self._radius = radius
+        self._tier = tier
+
+    def step(self):
+        """
+        Moves every asteroid by its velocity and wraps it across the game view.
+
+        This is the vectorized version of Asteroid.move followed by Wave._wrap. The
+        wrap uses the DEAD_ZONE constant, so that an asteroid only wraps once it is
+        completely off screen.
+        """
+        pos = self._pos[:self._count]
+        pos += self._vel[:self._count]
+        xs = pos[:,0]
+        ys = pos[:,1]
+        xs[xs > GAME_WIDTH+DEAD_ZONE] -= GAME_WIDTH+2*DEAD_ZONE
+        xs[xs < -DEAD_ZONE] += GAME_WIDTH+2*DEAD_ZONE
+        ys[ys > GAME_HEIGHT+DEAD_ZONE] -= GAME_HEIGHT+2*DEAD_ZONE
+        ys[ys < -DEAD_ZONE] += GAME_HEIGHT+2*DEAD_ZONE
@@ -4,13 +4,53 @@ A module to support simple 2D game development.
 This module is a simple wrapper around Kivy interfaces to make 2D game development
 simpler for students in CS 1110.
 
+The classes of this module are imported the first time that they are used, so that
+a game does not pay at startup for subsystems (such as sound) that it needs later or
+never.  Importing a class by name, as in ``from game2d import GImage``, loads only the
+submodules that class needs.  The statement ``from game2d import *`` still works, but
+it loads everything.
+
 Author: Walker M. White (wmw2)
 Date:   August 1, 2017 (Python 3 version)
 """
-from .gobject import GObject, GScene
-from .grectangle import GRectangle, GEllipse, GImage, GLabel
-from .gsprite import GSprite
-from .gpath import GPath, GTriangle, GPolygon
-from .gview import GInput, GView
-from .sound import Sound, SoundLibrary
-from .app import GameApp
\ No newline at end of file
+import importlib
+
+# The submodule defining each public class, in the order of ``__all__``
+_EXPORTS = {
+    'GObject': 'gobject', 'GScene': 'gobject',
+    'GRectangle': 'grectangle', 'GEllipse': 'grectangle', 'GImage': 'grectangle',
+    'GLabel': 'grectangle',
+    'GText': 'gtext', 'GlyphAtlas': 'gtext',
+    'GSprite': 'gsprite',
+    'GImageBatch': 'gbatch',
+    'GPath': 'gpath', 'GTriangle': 'gpath', 'GPolygon': 'gpath',
+    'GInput': 'gview', 'GView': 'gview',
+    'Sound': 'sound', 'SoundLibrary': 'sound',
+    'FrameProfiler': 'gprofile',
+    'AssetPreloader': 'gpreload',
+    'GameApp': 'app',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """
+    Returns the public class name, importing its submodule on first use.
+
+    :param name: The attribute name
+    :type name:  ``str``
+    """
+    if not name in _EXPORTS:
+        raise AttributeError('module %s has no attribute %s' % (repr(__name__),repr(name)))
+    module = importlib.import_module('.'+_EXPORTS[name],__name__)
+    value = getattr(module,name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """
+    Returns the names in this module, including the classes not yet imported.
+    """
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -19,14 +19,16 @@ from kivy.clock  import Clock
 from kivy.core.window import Window
 from kivy.logger import Logger
 
+from .gprofile import FrameProfiler
+from .gatlas import ATLAS_SIZE
+from .gpreload import PRELOAD_BUDGET
+
+from types import MappingProxyType
 import traceback
 import os.path
 import json
 import sys
 
-# Pull off the band aid
-import numpy as np
-
 class GameApp(kivy.app.App):
     """
     A controller class for a simple game application.
@@ -45,9 +47,14 @@ class GameApp(kivy.app.App):
     
     :meth:`draw`: This method draws all of the objects to the screen.  The only 
     thing you should have in this method are calls to ``self.view.draw()``.
+    
+    A game that opens files or other resources can also override :meth:`finish`, 
+    which is called once when the game stops.
     """
     # Class attribute for tracking textures (to reduce memory footprint)
     TEXTURE_CACHE = {}
+    # Class attribute for parsed JSON files, as (modification stamp, frozen data) by path
+    JSON_CACHE = {}
     
     
     # MUTABLE ATTRIBUTES
@@ -71,6 +78,8 @@ class GameApp(kivy.app.App):
         Clock.unschedule(self._refresh)
         self._fps = value
         Clock.schedule_interval(self._refresh,1.0/self._fps)
+        if not self._profiler is None:
+            self._profiler.target = 1.0/self._fps
     
     
     # IMMUTABLE PROPERTIES
@@ -116,6 +125,30 @@ class GameApp(kivy.app.App):
         """
         return self._input
     
+    @property
+    def profiler(self):
+        """
+        The frame profiler for this game, or None if profiling is disabled.
+        
+        Profiling is enabled with the keyword ``profile`` of the constructor.  See the
+        class :class:`FrameProfiler` for more information.
+        
+        **Invariant**: Must be instance of :class:`FrameProfiler` or None
+        """
+        return self._profiler
+    
+    @property
+    def preloader(self):
+        """
+        The background loader of the game assets, or None if nothing is preloaded.
+        
+        The preloader is created by the method :meth:`preload`.  See the class 
+        :class:`AssetPreloader` for more information.
+        
+        **Invariant**: Must be instance of :class:`AssetPreloader` or None
+        """
+        return self._preloader
+    
     # CLASS METHODS
     @classmethod
     def is_image(cls,name):
@@ -218,6 +251,35 @@ class GameApp(kivy.app.App):
         
         return texture
     
+    @classmethod
+    def load_atlas(cls,size=ATLAS_SIZE,limit=None):
+        """
+        Returns: The number of images that now use the atlas
+        
+        This method packs the images in the **Images** folder into one or a few atlas
+        textures (stored in the **Atlas** folder), unless an up-to-date atlas already
+        exists.  The atlas regions are added to the texture cache, so from then on
+        :meth:`load_texture` returns a region of a shared atlas texture instead of a
+        texture for each file.  This allows Kivy to batch drawing by texture.
+        
+        :param size: The width and height of an atlas page
+        :type size:  ``int`` > 0
+        
+        :param limit: The largest width or height of a packed image (None for no limit)
+        :type limit:  ``int`` > 0 or None
+        """
+        from .gatlas import build_atlas, load_atlas
+        try:
+            path = build_atlas(cls.images,os.path.join(cls.atlas,'images'),size,limit)
+            regions = load_atlas(path,cls.images)
+        except:
+            exc_type, exc_value, exc_tb = sys.exc_info()
+            items = traceback.format_exception(exc_type, exc_value, exc_tb)
+            Logger.info(items[-1].strip())
+            regions = {}
+        cls.TEXTURE_CACHE.update(regions)
+        return len(regions)
+    
     @classmethod
     def unload_texture(cls,name):
         """
@@ -246,15 +308,33 @@ class GameApp(kivy.app.App):
         The ``name`` must refer to the file in the **JSON** folder.  If the file is
         not there, it will return None.
         
+        Parsed files are kept in ``JSON_CACHE``, and are only read again if their
+        modification time or size changes.  So loading the same file twice costs a
+        single ``stat``.  As every call returns the same data, the data is read-only:
+        JSON objects are returned as read-only mappings (``MappingProxyType``) and
+        JSON arrays as tuples.  A caller that needs to modify the data must copy it.
+        
         :param name: The file name
         :type name:  ``str``
         """
-        if not cls.is_json(name):
+        if type(name) != str or name[-4:].lower() != 'json':
+            Logger.info('GameApp: No json file named %s.' % repr(name))
+            return None
+        
+        path = os.path.join(cls.json,name)
+        try:
+            stat  = os.stat(path)
+        except OSError:
+            cls.JSON_CACHE.pop(path,None)
             Logger.info('GameApp: No json file named %s.' % repr(name))
             return None
         
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if path in cls.JSON_CACHE and cls.JSON_CACHE[path][0] == stamp:
+            return cls.JSON_CACHE[path][1]
+        
         data = None
-        with open(os.path.join(cls.json,name)) as f: 
+        with open(path) as f: 
             data = f.read()
         
         if not data is None:
@@ -266,6 +346,30 @@ class GameApp(kivy.app.App):
                 items = traceback.format_exception(exc_type, exc_value, exc_tb)
                 Logger.info(items[-1].strip())
                 data = None
+        
+        if data is None:
+            cls.JSON_CACHE.pop(path,None)
+            return None
+        data = cls._freeze_json(data)
+        cls.JSON_CACHE[path] = (stamp, data)
+        return data
+    
+    @classmethod
+    def _freeze_json(cls,data):
+        """
+        Returns: A read-only version of the JSON value ``data``
+        
+        Dictionaries become read-only mappings and lists become tuples, so that the
+        cached data can be shared by every caller without being copied.  This is done
+        once, when the file is parsed.
+        
+        :param data: The JSON value to freeze
+        :type data:  any value returned by ``json.loads``
+        """
+        if type(data) == dict:
+            return MappingProxyType({key: cls._freeze_json(value) for key, value in data.items()})
+        elif type(data) == list:
+            return tuple([cls._freeze_json(value) for value in data])
         return data
     
     
@@ -281,6 +385,21 @@ class GameApp(kivy.app.App):
             
             GameApp(width=400,height=400)
         
+        To measure the time spent in each phase of an animation frame, add the keyword
+        ``profile=True``.  The results are available from the attribute ``profiler``.
+        The keyword ``profile_overlay=True`` also shows a summary on screen.
+        
+        The checks in the setters of the drawing classes are all asserts.  To skip them,
+        which makes the setters a little faster, run Python with the option ``-O`` (or
+        set the environment variable ``PYTHONOPTIMIZE=1``).
+        
+        The keyword ``atlas=True`` packs the images into a texture atlas at startup (see
+        :meth:`load_atlas`).  The keyword ``atlas_limit`` is the largest size of an image
+        in the atlas.
+        
+        The keyword ``retained=True`` puts the view in retained mode, so that it is not
+        cleared at the start of every frame.  See the class :class:`GView`.
+        
         The game window will not show until you start the game. To start the game, use 
         the method ``run()``.
         
@@ -325,6 +444,27 @@ class GameApp(kivy.app.App):
         if not y is None:
             Window.top = y+self.height
         
+        p = keywords.pop('profile', False)
+        o = keywords.pop('profile_overlay', False)
+        assert type(p) == bool, 'profile %s is not a bool' % repr(p)
+        assert type(o) == bool, 'profile_overlay %s is not a bool' % repr(o)
+        
+        r = keywords.pop('retained', False)
+        assert type(r) == bool, 'retained %s is not a bool' % repr(r)
+        self._retained = r
+        
+        a = keywords.pop('atlas', False)
+        l = keywords.pop('atlas_limit', None)
+        assert type(a) == bool, 'atlas %s is not a bool' % repr(a)
+        assert l is None or type(l) == int, 'atlas_limit %s is not an int' % repr(l)
+        self._atlas = a
+        self._atlaslimit = l
+        
+        self._profiler = FrameProfiler(target=1.0/f) if p or o else None
+        self._overlay = None
+        self._showoverlay = o
+        self._preloader = None
+        
         self._setpaths()
         
         # Tell Kivy to build the application
@@ -342,6 +482,7 @@ class GameApp(kivy.app.App):
         from .gview import GInput, GView
         self._view = GView()
         self._view.size_hint = (1,1)
+        self._view.retained = self._retained
         self._input = GInput()
         self._input._register(self._view)
         return self.view
@@ -367,6 +508,15 @@ class GameApp(kivy.app.App):
         kivy.app.App.stop(self)
         sys.exit(0)
     
+    def on_stop(self):
+        """
+        Cleans up the game as the window closes.
+        
+        This is a Kivy reserved method.  It is part of the Kivy application process.  
+        It should **never** be overridden.  Override :meth:`finish` instead.
+        """
+        self.finish()
+    
     def start(self):
         """
         Initializes the game state, creating a new game.
@@ -379,6 +529,38 @@ class GameApp(kivy.app.App):
         """
         pass
     
+    def preload(self,images=(),fonts=(),sounds=(),tasks=(),budget=PRELOAD_BUDGET):
+        """
+        Starts loading the given assets in the background.
+        
+        The files are decoded on a worker thread, and the textures are created a few at
+        a time at the start of each animation frame, taking at most ``budget`` seconds
+        per frame.  Call this method in :meth:`start` with the assets of the first 
+        level, so that they are ready by the time it is played.  To wait for all of the 
+        assets, use the method ``finish`` of the attribute ``preloader``.
+        
+        :param images: The image files to load
+        :type images:  ``list`` of ``str``
+        
+        :param fonts: The fonts to load, as (file name, size) pairs
+        :type fonts:  ``list`` of (``str``, ``int``)
+        
+        :param sounds: The sound files to load
+        :type sounds:  ``list`` of ``str``
+        
+        :param tasks: Functions (of no arguments) to call on the worker thread
+        :type tasks:  ``list`` of callables
+        
+        :param budget: The time (in seconds) to spend on uploads each frame
+        :type budget:  ``int`` or ``float`` > 0
+        
+        :return: The preloader for these assets
+        :rtype:  :class:`AssetPreloader`
+        """
+        from .gpreload import AssetPreloader
+        self._preloader = AssetPreloader(images,fonts,sounds,tasks,budget)
+        return self._preloader
+    
     def update(self,dt):
         """
         Updates the state of the game one animation frame.
@@ -405,6 +587,16 @@ class GameApp(kivy.app.App):
         """
         pass
     
+    def finish(self):
+        """
+        Cleans up the game state when the game stops.
+        
+        This method is called once, as the game window closes (whether by the player or
+        by a call to :meth:`stop`).  Override it to close any files the game has open,
+        so that everything written to them is saved.
+        """
+        pass
+    
     
     # HIDDEN METHODS
     def _bootstrap(self,dt):
@@ -418,6 +610,11 @@ class GameApp(kivy.app.App):
             Clock.schedule_interval(self._refresh,1.0/self.fps)
         else:
             Clock.schedule_interval(self._refresh,0)
+        if self._atlas:
+            GameApp.load_atlas(limit=self._atlaslimit)
+        if not self._profiler is None:
+            self._profiler.target = 1.0/self.fps
+            self._profiler.attach(Window)
         self.start()
     
     def _refresh(self,dt):
@@ -430,9 +627,44 @@ class GameApp(kivy.app.App):
         :param dt: time in seconds since last update
         :type dt:  ``int`` or ``float``
         """
-        self.view.clear()
+        if not self._preloader is None and self._preloader.pending:
+            self._preloader.step()
+        if self._profiler is None:
+            if not self.view.retained:
+                self.view.clear()
+            self.update(dt)
+            self.draw()
+            return
+        
+        profiler = self._profiler
+        profiler.begin(dt)
+        if not self.view.retained:
+            self.view.clear()
+        profiler.mark('clear')
         self.update(dt)
+        profiler.mark('update')
         self.draw()
+        profiler.mark('draw')
+        if self._showoverlay:
+            self._drawoverlay()
+    
+    def _drawoverlay(self):
+        """
+        Draws the profiler summary in the top left corner of the view.
+        
+        The text is only refreshed a few times a second, as changing the text of a
+        label is expensive.
+        """
+        from .grectangle import GLabel
+        if self._overlay is None:
+            self._overlay = GLabel(text=self._profiler.summary(),font_size=12,
+                                   halign='left',valign='top',left=4,top=self.height-4,
+                                   linecolor=(1,1,1,1),fillcolor=(0,0,0,0.5))
+        elif self._profiler.frames % 15 == 0:
+            self._overlay.text = self._profiler.summary()
+            self._overlay.left = 4
+            self._overlay.top = self.height-4
+        self._overlay.draw(self.view)
     
     def _setpaths(self):
         """
@@ -450,6 +682,7 @@ class GameApp(kivy.app.App):
         GameApp.fonts  = str(os.path.join(path, 'Fonts'))
         GameApp.sounds = str(os.path.join(path, 'Sounds'))
         GameApp.images = str(os.path.join(path, 'Images'))
+        GameApp.atlas  = str(os.path.join(path, 'Atlas'))
         
         import kivy.resources
         kivy.resources.resource_add_path(GameApp.fonts)
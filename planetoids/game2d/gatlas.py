@@ -0,0 +1,200 @@
+"""
+Texture atlases for 2D game support.
+
+Every image loaded by :class:`GameApp` is normally its own texture on the GPU.  Drawing
+a scene with many different images then switches textures constantly, which prevents
+Kivy from batching the draw calls.  This module packs all of the images in a folder
+into one (or a few) large atlas textures, so that the images become regions of a
+shared texture instead.
+
+Packing is done with the Kivy atlas tool, and requires the Python Imaging Library
+(Pillow).  The atlas is only packed again when the images in the folder change, so it
+can be built once ahead of time with the command::
+
+    python -m game2d.gatlas Images Atlas/images 2048 512
+
+Images larger than a given limit can be scaled down (by powers of two) before they
+are packed.  The image objects are always drawn at their own ``width`` and ``height``,
+so this only reduces the texture resolution.
+"""
+import os
+import os.path
+import json
+import shutil
+import tempfile
+
+# The default width and height of an atlas page
+ATLAS_SIZE = 2048
+# The image file types that can be packed
+ATLAS_TYPES = ('.png', '.jpg', '.jpeg')
+
+
+def build_atlas(folder,outname,size=ATLAS_SIZE,limit=None,padding=2):
+    """
+    Packs the images in folder into an atlas, and returns the atlas file name.
+
+    The atlas is written as ``outname.atlas`` along with the pages ``outname-0.png``,
+    ``outname-1.png``, and so on.  A manifest ``outname.json`` records the images and
+    settings used.  If the manifest shows the atlas is up to date, nothing is packed.
+
+    :param folder: The folder with the images to pack
+    :type folder:  ``str``
+
+    :param outname: The base name of the atlas files (the folder is created if needed)
+    :type outname:  ``str``
+
+    :param size: The width and height of an atlas page
+    :type size:  ``int`` > 0
+
+    :param limit: The largest width or height of a packed image (None for no limit)
+    :type limit:  ``int`` > 0 or None
+
+    :param padding: The padding around each image in the atlas
+    :type padding:  ``int`` >= 0
+
+    :return: The file name of the atlas
+    :rtype:  ``str``
+    """
+    assert type(size) == int and size > 0, 'size %s is not a positive int' % repr(size)
+    assert limit is None or (type(limit) == int and limit > 0), 'limit %s is not valid' % repr(limit)
+    path = outname+'.atlas'
+    manifest = _manifest(folder,size,limit,padding)
+    try:
+        with open(outname+'.json') as file:
+            current = json.load(file) == manifest and os.path.exists(path)
+    except (IOError, ValueError):
+        current = False
+    if current:
+        return path
+
+    from kivy.atlas import Atlas
+    from PIL import Image
+
+    parent = os.path.dirname(outname)
+    if parent and not os.path.isdir(parent):
+        os.makedirs(parent)
+
+    scratch = tempfile.mkdtemp()
+    try:
+        files = []
+        for name in sorted(manifest['images']):
+            source = os.path.join(folder,name)
+            target = os.path.join(scratch,name)
+            image = Image.open(source)
+            factor = 1
+            while not limit is None and max(image.size) > limit*factor:
+                factor *= 2
+            if factor > 1:
+                image = image.resize((image.size[0]//factor,image.size[1]//factor),
+                                     Image.LANCZOS)
+                image.save(target)
+            else:
+                shutil.copyfile(source,target)
+            files.append(target)
+        for old in _pages(outname):
+            os.remove(old)
+        Atlas.create(outname,files,size,padding)
+    finally:
+        shutil.rmtree(scratch,ignore_errors=True)
+
+    with open(outname+'.json','w') as file:
+        json.dump(manifest,file,indent=1,sort_keys=True)
+    return path
+
+
+def load_atlas(path,folder=None):
+    """
+    Returns a dictionary mapping image file names to their atlas regions.
+
+    The keys are the original file names (such as ``'ship.png'``), and the values are
+    Kivy texture regions.  If folder is given, only the images in that folder are
+    included; otherwise, the file names are assumed to be ``.png`` files.
+
+    :param path: The atlas file name, as returned by :func:`build_atlas`
+    :type path:  ``str``
+
+    :param folder: The folder of the original images
+    :type folder:  ``str`` or None
+
+    :return: The atlas regions by file name
+    :rtype:  ``dict``
+    """
+    from kivy.atlas import Atlas
+    atlas = Atlas(path)
+    if folder is None:
+        return dict((key+'.png',atlas[key]) for key in atlas.textures)
+
+    result = {}
+    for name in _images(folder):
+        key = os.path.splitext(name)[0]
+        if key in atlas.textures:
+            result[name] = atlas[key]
+    return result
+
+
+# HIDDEN FUNCTIONS
+def _images(folder):
+    """
+    Returns the sorted list of image file names in folder that can be packed.
+
+    :param folder: The folder to search
+    :type folder:  ``str``
+    """
+    result = []
+    for name in sorted(os.listdir(folder)):
+        if os.path.splitext(name)[1].lower() in ATLAS_TYPES:
+            if os.path.isfile(os.path.join(folder,name)):
+                result.append(name)
+    return result
+
+
+def _manifest(folder,size,limit,padding):
+    """
+    Returns the manifest describing an atlas of folder with the given settings.
+
+    :param folder: The folder with the images to pack
+    :type folder:  ``str``
+
+    :param size: The width and height of an atlas page
+    :type size:  ``int`` > 0
+
+    :param limit: The largest width or height of a packed image
+    :type limit:  ``int`` > 0 or None
+
+    :param padding: The padding around each image in the atlas
+    :type padding:  ``int`` >= 0
+    """
+    images = {}
+    for name in _images(folder):
+        stat = os.stat(os.path.join(folder,name))
+        images[name] = [stat.st_size,int(stat.st_mtime)]
+    return {'size': size, 'limit': limit, 'padding': padding, 'images': images}
+
+
+def _pages(outname):
+    """
+    Returns the existing files of the atlas with the given base name.
+
+    :param outname: The base name of the atlas files
+    :type outname:  ``str``
+    """
+    parent = os.path.dirname(outname) or '.'
+    if not os.path.isdir(parent):
+        return []
+    base = os.path.basename(outname)
+    result = []
+    for name in os.listdir(parent):
+        if name == base+'.atlas' or (name.startswith(base+'-') and name.endswith('.png')):
+            result.append(os.path.join(parent,name))
+    return result
+
+
+if __name__ == '__main__':
+    # Kivy claims any command line options, so the settings are positional
+    import sys
+    if len(sys.argv) < 3:
+        print('Usage: python -m game2d.gatlas folder outname [size [limit]]')
+        sys.exit(1)
+    size  = int(sys.argv[3]) if len(sys.argv) > 3 else ATLAS_SIZE
+    limit = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    print(build_atlas(sys.argv[1],sys.argv[2],size,limit))
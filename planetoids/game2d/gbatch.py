@@ -0,0 +1,223 @@
+"""
+Batched image drawing for 2D game support.
+
+A :class:`GImage` is drawn with its own group of Kivy instructions: a push of the
+matrix, the translate, rotate and scale transforms, a rectangle, and a pop.  Drawing a
+thousand images that way means thousands of instructions, and a draw call per image.
+
+The class :class:`GImageBatch` draws many (unrotated) images as the quads of a single
+Kivy ``Mesh``.  The vertex data is computed from arrays of centers and sizes with NumPy,
+so the number of instructions stays the same no matter how many images are drawn.
+For this to work, the images must share a texture.  That is the case for images in a
+texture atlas (see :meth:`GameApp.load_atlas`).  Otherwise, the batch uses one mesh
+for each distinct texture.
+"""
+from kivy.graphics import *
+from kivy.graphics.instructions import *
+from .gobject import GObject
+from .app import GameApp
+import numpy as np
+
+# The most quads in one mesh (Kivy meshes are limited to 65535 indices)
+BATCH_QUADS = 8192
+
+# The corners of a quad, counter-clockwise from the bottom left
+_CORNERS = np.array([[-0.5,-0.5],[0.5,-0.5],[0.5,0.5],[-0.5,0.5]],dtype=np.float32)
+# The two triangles of a quad, as indices of its corners
+_TRIANGLES = np.array([0,1,2,2,3,0],dtype=np.uint16)
+
+
+class GImageBatch(GObject):
+    """
+    A class representing a batch of images drawn as a single mesh.
+
+    The images in the batch are chosen from a list of ``sources``, which act like the
+    frames of a :class:`GSprite`.  Each frame, call the method :meth:`set_quads` with
+    the center, size and source index of every image to draw.  The images can move,
+    appear or disappear from one frame to the next, without adding any instructions.
+
+    The position and angle of the batch (inherited from :class:`GObject`) apply to all
+    of the images in it.  The images themselves cannot be rotated.
+    """
+
+    # MUTABLE PROPERTIES
+    @property
+    def sources(self):
+        """
+        The source files of the images in this batch.
+
+        The source index of a quad (see :meth:`set_quads`) is a position in this list.
+
+        **invariant**. Value be a nonempty list of strings refering to valid files.
+        """
+        return list(self._sources)
+
+    @sources.setter
+    def sources(self,value):
+        assert type(value) in [list,tuple] and len(value) > 0, '%s is not a nonempty list' % repr(value)
+        for item in value:
+            assert GameApp.is_image(item), '%s is not an image file' % repr(item)
+        self._sources = tuple(value)
+        if self._defined:
+            self._reset()
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def count(self):
+        """
+        The number of images drawn by this batch.
+
+        **Immutable**: This value is changed by the method :meth:`set_quads`.
+
+        **invariant**: Value is an ``int`` >= 0
+        """
+        return self._count
+
+    @property
+    def meshes(self):
+        """
+        The number of Kivy meshes used to draw this batch.
+
+        This is one mesh per distinct texture for every :data:`BATCH_QUADS` images.
+
+        **Immutable**: This value is changed by the method :meth:`set_quads`.
+
+        **invariant**: Value is an ``int`` >= 0
+        """
+        return len(self._meshes)
+
+    # BUILT-IN METHODS
+    def __init__(self,**keywords):
+        """
+        Creates a new, empty image batch.
+
+        To use the constructor for this class, you should provide it with a list of
+        keyword arguments that initialize various attributes.  For example, to batch
+        three sizes of asteroids, use the constructor::
+
+            GImageBatch(sources=['small.png','medium.png','large.png'])
+
+        This class supports the same keywords as :class:`GObject`, and the keyword
+        ``sources``.  The ``width`` and ``height`` of a batch are ignored.
+
+        :param keywords: dictionary of keyword arguments
+        :type keywords:  keys are attribute names
+        """
+        self._defined = False
+        self.sources = keywords['sources'] if 'sources' in keywords else None
+        self._count = 0
+        self._meshes = []
+        self._buffers = []
+        GObject.__init__(self,**keywords)
+        self._reset()
+        self._defined = True
+
+    # PUBLIC METHODS
+    def set_quads(self,centers,sizes,frames):
+        """
+        Sets the images drawn by this batch.
+
+        All three arrays have one entry per image.  The vertex data of the batch is
+        rebuilt from them, and the meshes are updated in place.
+
+        :param centers: The image centers
+        :type centers:  NumPy array of shape (n,2)
+
+        :param sizes: The image widths and heights (or a single size for both)
+        :type sizes:  NumPy array of shape (n,2) or (n,)
+
+        :param frames: The index in ``sources`` of each image
+        :type frames:  NumPy int array of shape (n,)
+        """
+        count = len(centers)
+        sizes = np.asarray(sizes,dtype=np.float32)
+        if sizes.ndim == 1:
+            sizes = sizes[:,None]
+        frames = np.asarray(frames,dtype=np.intp)
+
+        # The corners of every quad, then the texture coordinates of its source
+        vertices = np.empty((count,4,4),dtype=np.float32)
+        vertices[:,:,:2] = centers[:,None,:]+_CORNERS[None,:,:]*sizes[:,None,:]
+        vertices[:,:,2:] = self._coords[frames]
+
+        used = 0
+        if len(self._groups) == 1:
+            used = self._fill(vertices,self._groups[0],used)
+        else:
+            group = self._group[frames]
+            for pos in range(len(self._groups)):
+                used = self._fill(vertices[group == pos],self._groups[pos],used)
+        for pos in range(used,len(self._meshes)):
+            self._meshes[pos].indices = []
+        self._count = count
+
+    # HIDDEN METHODS
+    def _fill(self,vertices,texture,used):
+        """
+        Returns the number of meshes used after adding vertices to the batch.
+
+        The quads are split into chunks of at most BATCH_QUADS, each drawn by the next
+        unused mesh (new meshes are added to the drawing cache as needed).
+
+        :param vertices: The vertex data of the quads
+        :type vertices:  NumPy float32 array of shape (n,4,4)
+
+        :param texture: The texture shared by the quads
+        :type texture:  Kivy ``Texture``
+
+        :param used: The number of meshes already used this frame
+        :type used:  ``int`` >= 0
+        """
+        for start in range(0,len(vertices),BATCH_QUADS):
+            chunk = np.ascontiguousarray(vertices[start:start+BATCH_QUADS]).reshape(-1)
+            quads = len(chunk)//16
+            if used == len(self._meshes):
+                mesh = Mesh(mode='triangles',fmt=[(b'vPosition',2,'float'),(b'vTexCoords0',2,'float')])
+                self._meshes.append(mesh)
+                self._buffers.append(None)
+                self._batch.add(mesh)
+            mesh = self._meshes[used]
+            # Keep the buffer alive, as the mesh uses it in place
+            self._buffers[used] = chunk
+            mesh.texture = texture
+            mesh.vertices = chunk
+            mesh.indices = self._indices[:6*quads]
+            used += 1
+        return used
+
+    def _reset(self):
+        """
+        Resets the drawing cache.
+        """
+        GObject._reset(self)
+        textures = [GameApp.load_texture(name) for name in self._sources]
+
+        # Group the sources by the texture they are drawn from
+        self._groups = []
+        ids = []
+        group = []
+        for texture in textures:
+            key = None if texture is None else texture.id
+            if not key in ids:
+                ids.append(key)
+                self._groups.append(texture)
+            group.append(ids.index(key))
+        self._group = np.array(group,dtype=np.intp)
+
+        # The texture coordinates of each source, in the order of _CORNERS
+        coords = np.zeros((len(textures),4,2),dtype=np.float32)
+        for pos in range(len(textures)):
+            if not textures[pos] is None:
+                coords[pos] = np.array(textures[pos].tex_coords,dtype=np.float32).reshape(4,2)
+        self._coords = coords
+
+        quads = np.arange(BATCH_QUADS,dtype=np.uint16)
+        self._indices = (4*quads[:,None]+_TRIANGLES[None,:]).astype(np.uint16).reshape(-1)
+
+        self._meshes = []
+        self._buffers = []
+        self._count = 0
+        self._batch = InstructionGroup()
+        self._cache.add(Color(1,1,1))
+        self._cache.add(self._batch)
+        self._cache.add(PopMatrix())
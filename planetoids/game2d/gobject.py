@@ -12,6 +12,13 @@ from kivy.graphics import *
 from kivy.graphics.instructions import *
 from introcs.geom import Point2, Matrix
 import introcs
+import math
+
+# The types accepted as numbers by the validators
+_NUMBERS = (int, float)
+# The absolute and relative tolerance of is_close (those of numpy.allclose)
+_ATOL = 1e-8
+_RTOL = 1e-5
 
 def is_color(c):
     """
@@ -32,12 +39,35 @@ def is_color(c):
         return True
 
     if type(c) in [tuple, list] and 3 <= len(c) <= 4:
-        from functools import reduce
-        return reduce(lambda x, y: x and y, map(lambda z: type(z) in [int, float] and 0 <= z <= 1, c))
+        for z in c:
+            if not (type(z) in _NUMBERS and 0 <= z <= 1):
+                return False
+        return True
 
     return type(c) == str and (introcs.is_tkcolor(c) or introcs.is_webcolor(c))
 
 
+def is_close(a,b):
+    """
+    Checks whether two numbers are equal up to a small tolerance.
+
+    This uses the same tolerance as ``numpy.allclose``, but only for two scalars,
+    so it does not need to create any arrays.
+
+    :return: True if a and b are equal up to the tolerance
+    :rtype:  ``bool``
+
+    :param a: The first number
+    :type a:  ``int`` or ``float``
+
+    :param b: The second number
+    :type b:  ``int`` or ``float``
+    """
+    if a == b:
+        return True
+    return abs(a-b) <= _ATOL+_RTOL*abs(b) and math.isfinite(b)
+
+
 def is_num_tuple(t,size):
     """
     Checks whether a value is a sequence of numbers.
@@ -54,8 +84,12 @@ def is_num_tuple(t,size):
     :type size:  ``int`` >= 0
     """
     try:
-        from functools import reduce
-        return len(t) == size and reduce(lambda x, y: x and y, map(lambda z: type(z) in [int, float], t))
+        if len(t) != size or len(t) == 0:
+            return False
+        for z in t:
+            if not type(z) in _NUMBERS:
+                return False
+        return True
     except:
         return False
 
@@ -71,8 +105,10 @@ def is_gobject_list(g):
     :type g:  any
     """
     try:
-        from functools import reduce
-        return len(g) >= 0 and reduce(lambda x, y: x and y, map(lambda z: isinstance(z,GObject), g))
+        for z in g:
+            if not isinstance(z,GObject):
+                return False
+        return len(g) > 0
     except:
         return False
 
@@ -90,6 +126,8 @@ class GObject(object):
     subclasses: :class:`GRectangle`, :class:`GEllipse`, :class:`GImage`, :class:`GLabel`,
     :class:`GTriangle`, :class:`GPolygon`, or :class:`GPath`.
     """
+    # The retained view showing this object (None if not drawn in retained mode)
+    _view = None
 
     # MUTABLE PROPERTIES
     @property
@@ -203,11 +241,12 @@ class GObject(object):
 
     @angle.setter
     def angle(self,value):
-        import numpy as np
         assert type(value) in [int,float], '%s is not a number' % repr(value)
-        diff = np.allclose([self._rotate.angle],[value])
+        old = self._rotate.angle
+        if old == value:
+            return
         self._rotate.angle = float(value)
-        if not diff:
+        if not is_close(old,value):
             self._mtrue = False
 
     @property
@@ -625,17 +664,39 @@ class GObject(object):
             view.draw(self._cache)
         except:
             raise IOError('Cannot draw %s since it was not initialized properly' % repr(self))
+        if view.retained:
+            self._view = view
+
+    def erase(self, view):
+        """
+        Erases this shape from the provided view.
+
+        This is only needed if the view is in retained mode, where a shape stays on
+        screen until it is erased.  Nothing happens if the shape is not in the view.
+
+        :param view: view to erase from
+        :type view:  :class:`GView`
+        """
+        view.erase(self._cache)
+        if self._view is view:
+            self._view = None
 
     # HIDDEN METHODS
     def _reset(self):
         """
         Resets the drawing cache.
+
+        If this shape is on screen in a retained view, the new cache replaces the
+        old one in that view.
         """
+        old = self._cache if not self._view is None else None
         self._cache = InstructionGroup()
         self._cache.add(PushMatrix())
         self._cache.add(self._trans)
         self._cache.add(self._rotate)
         self._cache.add(self._scale)
+        if not old is None:
+            self._view._replace(old,self._cache)
 
     def _build_matrix(self):
         """
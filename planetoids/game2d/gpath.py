@@ -75,9 +75,12 @@ def is_point_tuple(t,minsize):
     :rtype:  ``bool``
     """
     try:
-        from functools import reduce
-        return len(t) % 2 == 0 and len(t) >= 2*minsize and \
-            reduce(lambda x, y: x and y, map(lambda z: type(z) in [int, float], t))
+        if len(t) % 2 != 0 or len(t) < 2*minsize or len(t) == 0:
+            return False
+        for z in t:
+            if not type(z) in (int, float):
+                return False
+        return True
     except:
         return False
 
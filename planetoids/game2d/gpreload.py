@@ -0,0 +1,243 @@
+"""
+Background asset loading for 2D game support.
+
+The first time an image is drawn, :class:`GameApp` decodes the file and uploads it to
+the GPU as a texture.  Labels do the same for their fonts.  If this happens as a game
+level starts, the first frame of play stutters.  This module loads these assets ahead
+of time, while the game is showing something that does not need them (such as a title
+screen).
+
+The work is split in two.  Decoding the files happens on a worker thread.  OpenGL can
+only be used from the main thread, so the textures are created there, a few at a time
+per animation frame, staying inside a time budget so that the frame rate is kept.  See
+the method ``preload`` of :class:`GameApp`.
+"""
+from kivy.logger import Logger
+
+import traceback
+import threading
+import os.path
+import time
+import sys
+
+# The default time (in seconds) to spend on uploads each animation frame
+PRELOAD_BUDGET = 0.002
+# The text rendered to warm up a font
+_SAMPLE = 'Aa0'
+
+
+class AssetPreloader(object):
+    """
+    A class that loads images, fonts and sounds in the background.
+
+    The assets are given by file name, relative to the **Images**, **Fonts** and
+    **Sounds** folders of :class:`GameApp`.  The worker thread starts as soon as the
+    preloader is created.  It decodes each image into memory, and reads the fonts and
+    sounds from disk, so that they are in the file cache of the operating system.  It
+    then calls the functions in ``tasks``, which can do any other loading that does not
+    need OpenGL (such as importing modules or parsing level files).
+
+    The decoded images are turned into textures by :meth:`step`, which must be called
+    from the main thread once per animation frame.  Each texture is added to the texture
+    cache of :class:`GameApp`, so that :meth:`GameApp.load_texture` finds it there.  Fonts
+    are warmed up by rendering a short text at each requested size.  Images that are
+    already in the texture cache (for example, in a texture atlas) are skipped.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def done(self):
+        """
+        Whether every asset has been loaded and uploaded.
+
+        **Invariant**: Must be a ``bool``.
+        """
+        return not self._queue and not self._uploads
+
+    @property
+    def pending(self):
+        """
+        The number of assets that are not yet ready to use.
+
+        This counts the assets still being decoded by the worker thread, as well as the
+        ones waiting to be uploaded.
+
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return len(self._queue)+len(self._uploads)
+
+    @property
+    def budget(self):
+        """
+        The time (in seconds) to spend on uploads in each call to :meth:`step`.
+
+        **Invariant**: Must be an ``int`` or ``float`` > 0.
+        """
+        return self._budget
+
+    @property
+    def failures(self):
+        """
+        The assets that could not be loaded, as they were given to the initializer.
+
+        These assets are loaded again (and fail again) when the game uses them.
+
+        **Invariant**: Must be a list of file names, (file name, size) pairs or tasks.
+        """
+        return list(self._failures)
+
+    # BUILT-IN METHODS
+    def __init__(self,images=(),fonts=(),sounds=(),tasks=(),budget=PRELOAD_BUDGET):
+        """
+        Creates a preloader and starts its worker thread.
+
+        The fonts are given as pairs of a font file and a point size, since a font is
+        loaded separately for each size.
+
+        :param images: The image files to load
+        :type images:  ``list`` of ``str``
+
+        :param fonts: The fonts to load, as (file name, size) pairs
+        :type fonts:  ``list`` of (``str``, ``int``)
+
+        :param sounds: The sound files to load
+        :type sounds:  ``list`` of ``str``
+
+        :param tasks: Functions (of no arguments) to call on the worker thread
+        :type tasks:  ``list`` of callables
+
+        :param budget: The time (in seconds) to spend on uploads each frame
+        :type budget:  ``int`` or ``float`` > 0
+        """
+        from .app import GameApp
+        assert type(budget) in [int,float], 'budget %s is not a number' % repr(budget)
+        assert budget > 0, 'budget %s is not positive' % repr(budget)
+        for name in images:
+            assert GameApp.is_image(name), '%s is not an image file' % repr(name)
+        for name, size in fonts:
+            assert GameApp.is_font(name), '%s is not a font file' % repr(name)
+            assert type(size) in [int,float], 'size %s is not a number' % repr(size)
+        for name in sounds:
+            assert GameApp.is_sound(name), '%s is not a sound file' % repr(name)
+        assert all(callable(task) for task in tasks), '%s are not all callable' % repr(tasks)
+
+        self._budget = budget
+        self._uploads = []
+        self._failures = []
+        # The work for the worker thread, as (kind, name, path) in order
+        self._queue = []
+        for name in dict.fromkeys(images):
+            if not name in GameApp.TEXTURE_CACHE:
+                self._queue.append(('image',name,os.path.join(GameApp.images,name)))
+        for item in fonts:
+            self._queue.append(('font',item,os.path.join(GameApp.fonts,item[0])))
+        for name in sounds:
+            self._queue.append(('sound',name,os.path.join(GameApp.sounds,name)))
+        for task in tasks:
+            self._queue.append(('task',task,None))
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._work,name='AssetPreloader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    # PUBLIC METHODS
+    def step(self,budget=None):
+        """
+        Uploads the decoded assets until the time budget is spent.
+
+        At least one asset is uploaded if any is ready, so that the loading always
+        makes progress.  This method must be called from the main thread.
+
+        :param budget: The time (in seconds) to spend, or None for the default budget
+        :type budget:  ``int`` or ``float`` > 0, or None
+
+        :return: True if every asset is now loaded; False otherwise
+        :rtype:  ``bool``
+        """
+        if budget is None:
+            budget = self._budget
+        deadline = time.perf_counter()+budget
+        while True:
+            with self._lock:
+                if not self._uploads:
+                    break
+                item = self._uploads.pop(0)
+            self._upload(*item)
+            if time.perf_counter() >= deadline:
+                break
+        return self.done
+
+    def finish(self):
+        """
+        Waits for the worker thread and uploads every remaining asset.
+
+        Call this when the assets are needed right away.  This method must be called
+        from the main thread.
+        """
+        self._thread.join()
+        while not self.step(sys.float_info.max):
+            pass
+
+    # HIDDEN METHODS
+    def _work(self):
+        """
+        Decodes the assets in the queue, in order.
+
+        This method is the body of the worker thread.  It cannot use OpenGL.
+        """
+        from kivy.core.image import ImageLoader
+        while self._queue:
+            kind, name, path = self._queue[0]
+            try:
+                if kind == 'image':
+                    data = ImageLoader.load(path,keep_data=True)
+                elif kind == 'task':
+                    data = name()
+                else:
+                    with open(path,'rb') as f:
+                        data = len(f.read())
+                if kind in ('image','font'):
+                    with self._lock:
+                        self._uploads.append((kind,name,data))
+            except:
+                self._fail(name)
+            # Only leave the queue once it is ready to upload, so that done is exact
+            with self._lock:
+                self._queue.pop(0)
+
+    def _upload(self,kind,name,data):
+        """
+        Makes the asset usable by the game, using OpenGL.
+
+        :param kind: The kind of asset ('image' or 'font')
+        :type kind:  ``str``
+
+        :param name: The image file, or the (file name, size) of a font
+        :type name:  ``str`` or (``str``, ``int``)
+
+        :param data: The image decoded by the worker thread (ignored for fonts)
+        :type data:  ``ImageLoaderBase`` or ``int``
+        """
+        from .app import GameApp
+        try:
+            if kind == 'image':
+                if not name in GameApp.TEXTURE_CACHE:
+                    from kivy.core.image import Image
+                    GameApp.TEXTURE_CACHE[name] = Image(data).texture
+            else:
+                from kivy.core.text import Label
+                Label(text=_SAMPLE,font_name=name[0],font_size=name[1]).refresh()
+        except:
+            self._fail(name)
+
+    def _fail(self,name):
+        """
+        Records that the asset name could not be loaded, and logs the reason.
+
+        :param name: The asset that failed
+        :type name:  ``str`` or (``str``, ``int``)
+        """
+        exc_type, exc_value, exc_tb = sys.exc_info()
+        items = traceback.format_exception(exc_type, exc_value, exc_tb)
+        Logger.info('AssetPreloader: %s: %s' % (repr(name),items[-1].strip()))
+        self._failures.append(name)
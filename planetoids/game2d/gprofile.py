@@ -0,0 +1,285 @@
+"""
+Frame profiling for 2D game support.
+
+This module contains a simple profiler for the animation loop of a :class:`GameApp`.
+Each frame, the application clears the view, updates the game and draws it.  Kivy then
+renders the window canvas (submitting the drawing instructions to the GPU) and flips
+the display.  The profiler records the wall time of each of these phases, as well as
+the ``dt`` that the Kivy ``Clock`` passed to the frame, so that a slow frame can be
+traced back to the simulation, to building drawing instructions, or to rendering.
+
+The profiler keeps the last few hundred frames in a rolling window, and can summarize
+them as statistics or as a histogram.  Profiling is opt-in: pass ``profile=True`` to
+the :class:`GameApp` constructor, and use its ``profiler`` attribute.
+"""
+import time
+
+
+class FrameProfiler(object):
+    """
+    A class that records the time spent in each phase of an animation frame.
+
+    The phases are the names in :attr:`PHASES`.  A frame starts with a call to
+    :meth:`begin`, and each call to :meth:`mark` ends a phase, recording the time since
+    the previous call.  All times are reported in milliseconds.
+
+    The ``render`` phase is measured by Kivy events that are not part of the animation
+    frame.  It is the time between the window ``on_draw`` and ``on_flip`` events, which
+    is when Kivy issues the OpenGL calls for the canvas.  Time blocked on the buffer
+    swap (vsync) is not part of any phase, but shows up as ``dt`` jitter.
+    """
+    # The phases of a frame, in order
+    PHASES = ('clear', 'update', 'draw', 'render')
+    # The default upper edges (in ms) of the histogram buckets.  The last is open.
+    EDGES = (1.0, 2.0, 4.0, 8.0, 16.7, 33.3, 66.7)
+
+    # MUTABLE PROPERTIES
+    @property
+    def target(self):
+        """
+        The expected time between frames, in seconds.
+
+        The ``dt`` jitter is measured relative to this value.
+
+        **Invariant**: Must be an int or float > 0.
+        """
+        return self._target
+
+    @target.setter
+    def target(self,value):
+        assert type(value) in [int,float], 'value %s is not a number' % repr(value)
+        assert value > 0, 'value %s is not positive' % repr(value)
+        self._target = value
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def window(self):
+        """
+        The number of frames kept for the statistics.
+
+        **Immutable**: This value cannot be changed after the profiler is created.
+
+        **Invariant**: Must be an int > 0.
+        """
+        return self._window
+
+    @property
+    def frames(self):
+        """
+        The total number of frames profiled since the last :meth:`reset`.
+
+        **Immutable**: This value is changed by the method :meth:`begin`.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._frames
+
+    def __init__(self,window=240,target=1/60.0):
+        """
+        Creates a new frame profiler.
+
+        :param window: The number of frames to keep for the statistics
+        :type window:  ``int`` > 0
+
+        :param target: The expected time between frames, in seconds
+        :type target:  ``int`` or ``float`` > 0
+        """
+        assert type(window) == int and window > 0, 'window %s is not a positive int' % repr(window)
+        self._window = window
+        self.target = target
+        self.reset()
+
+    # PUBLIC METHODS
+    def reset(self):
+        """
+        Discards all of the recorded frames.
+        """
+        self._frames = 0
+        self._samples = {}
+        for phase in self.PHASES:
+            self._samples[phase] = []
+        self._dts = []
+        self._mark = None
+        self._render = None
+
+    def begin(self,dt):
+        """
+        Starts a new frame.
+
+        :param dt: The time in seconds since the last frame, as given by the Clock
+        :type dt:  ``int`` or ``float``
+        """
+        self._frames += 1
+        self._push(self._dts,dt)
+        self._mark = time.perf_counter()
+
+    def mark(self,phase):
+        """
+        Ends the given phase of the current frame.
+
+        The time of the phase is the time since the last call to :meth:`begin` or
+        :meth:`mark`.
+
+        :param phase: The phase that just ended
+        :type phase:  one of the names in :attr:`PHASES`
+        """
+        assert phase in self._samples, 'phase %s is not valid' % repr(phase)
+        now = time.perf_counter()
+        if not self._mark is None:
+            self._push(self._samples[phase],1000*(now-self._mark))
+        self._mark = now
+
+    def attach(self,window):
+        """
+        Measures the ``render`` phase from the events of the given Kivy window.
+
+        :param window: The Kivy window to profile
+        :type window:  ``kivy.core.window.Window``
+        """
+        window.bind(on_draw=self._startRender,on_flip=self._endRender)
+
+    def detach(self,window):
+        """
+        Stops measuring the ``render`` phase from the given Kivy window.
+
+        :param window: The Kivy window previously given to :meth:`attach`
+        :type window:  ``kivy.core.window.Window``
+        """
+        window.unbind(on_draw=self._startRender,on_flip=self._endRender)
+
+    def samples(self,phase):
+        """
+        Returns the recorded times of the given phase, in milliseconds.
+
+        The list has (at most) one entry for each frame in the rolling window, oldest
+        first.
+
+        :param phase: The phase to get
+        :type phase:  one of the names in :attr:`PHASES`
+        """
+        assert phase in self._samples, 'phase %s is not valid' % repr(phase)
+        return list(self._samples[phase])
+
+    def stats(self,phase):
+        """
+        Returns a dictionary of statistics for the given phase.
+
+        The keys are ``'mean'``, ``'p95'``, ``'p99'`` and ``'max'``, all in milliseconds.
+        They are all 0 if no frames were recorded.
+
+        :param phase: The phase to summarize
+        :type phase:  one of the names in :attr:`PHASES`
+        """
+        return self._summarize(self.samples(phase))
+
+    def histogram(self,phase,edges=None):
+        """
+        Returns the histogram of the given phase as a list of counts.
+
+        Bucket i counts the frames with a time t (in ms) where edges[i-1] <= t < edges[i].
+        The first bucket starts at 0, and there is one more bucket than edges for the
+        times past the last edge.
+
+        :param phase: The phase to summarize
+        :type phase:  one of the names in :attr:`PHASES`
+
+        :param edges: The upper edges of the buckets (default :attr:`EDGES`)
+        :type edges:  increasing list of ``int`` or ``float``
+        """
+        if edges is None:
+            edges = self.EDGES
+        counts = [0]*(len(edges)+1)
+        for value in self.samples(phase):
+            pos = 0
+            while pos < len(edges) and value >= edges[pos]:
+                pos += 1
+            counts[pos] += 1
+        return counts
+
+    def jitter(self):
+        """
+        Returns a dictionary of statistics for the ``dt`` of each frame.
+
+        The keys are ``'mean'``, ``'p95'``, ``'p99'`` and ``'max'`` for ``dt``, and
+        ``'jitter'``, the mean distance of ``dt`` from :attr:`target`.  All values are in
+        milliseconds.
+        """
+        values = [1000*dt for dt in self._dts]
+        result = self._summarize(values)
+        if values:
+            target = 1000*self._target
+            result['jitter'] = sum(abs(dt-target) for dt in values)/len(values)
+        else:
+            result['jitter'] = 0.0
+        return result
+
+    def report(self):
+        """
+        Returns a dictionary with the statistics of every phase and of ``dt``.
+
+        The keys are the phase names, plus ``'dt'`` and ``'frames'``.  Each phase maps
+        to the result of :meth:`stats` with an added ``'histogram'`` entry.
+        """
+        result = {'frames': self._frames, 'dt': self.jitter()}
+        for phase in self.PHASES:
+            result[phase] = self.stats(phase)
+            result[phase]['histogram'] = self.histogram(phase)
+        return result
+
+    def summary(self):
+        """
+        Returns a short multi-line text summary, suitable for an on-screen overlay.
+        """
+        lines = []
+        for phase in self.PHASES:
+            data = self.stats(phase)
+            lines.append('%-6s %5.2f %5.2f ms' % (phase,data['mean'],data['p99']))
+        data = self.jitter()
+        lines.append('dt     %5.2f %5.2f ms' % (data['mean'],data['jitter']))
+        return '\n'.join(lines)
+
+    # HIDDEN METHODS
+    def _push(self,values,value):
+        """
+        Adds value to the end of the rolling list values.
+
+        :param values: The samples of a phase (or of dt)
+        :type values:  ``list``
+
+        :param value: The new sample
+        :type value:  ``int`` or ``float``
+        """
+        values.append(value)
+        if len(values) > self._window:
+            del values[0]
+
+    def _summarize(self,values):
+        """
+        Returns the mean, p95, p99 and max of values as a dictionary.
+
+        :param values: The samples to summarize
+        :type values:  ``list`` of ``int`` or ``float``
+        """
+        if not values:
+            return {'mean': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        ordered = sorted(values)
+        last = len(ordered)-1
+        return {'mean': sum(ordered)/len(ordered),
+                'p95': ordered[int(round(0.95*last))],
+                'p99': ordered[int(round(0.99*last))],
+                'max': ordered[last]}
+
+    def _startRender(self,*args):
+        """
+        Starts the timer of the ``render`` phase (on the window ``on_draw`` event).
+        """
+        self._render = time.perf_counter()
+
+    def _endRender(self,*args):
+        """
+        Stops the timer of the ``render`` phase (on the window ``on_flip`` event).
+        """
+        if not self._render is None:
+            elapsed = time.perf_counter()-self._render
+            self._push(self._samples['render'],1000*elapsed)
+            self._render = None
@@ -10,10 +10,9 @@ Date:   August 1, 2017 (Python 3 version)
 """
 from kivy.graphics import *
 from kivy.graphics.instructions import *
-from kivy.uix.label import Label
-from kivy.uix.image import Image
 from .gobject import GObject
 from .app import GameApp
+from collections import OrderedDict
 
 class GRectangle(GObject):
     """
@@ -296,7 +295,32 @@ class GLabel(GRectangle):
     to the font by filename, including the .ttf. If you give no name, it will use the 
     default Kivy font.  The `bold` attribute only works for the default Kivy font; for 
     other fonts you will need the .ttf file for the bold version of that font.  See the
-    provided `ComicSans.ttf` and `ComicSansBold.ttf` for an example."""
+    provided `ComicSans.ttf` and `ComicSansBold.ttf` for an example.
+    
+    Drawing text requires rendering it to a texture first, which is slow.  So the
+    rendered textures are kept in the class attribute `TEXTURE_CACHE`, keyed by the
+    text, the font name, the point size, whether it is bold, and the horizontal
+    alignment.  Any label with the same text and font shares the texture, and setting
+    the text back to an earlier value does not render it again.  The text is rendered
+    in white and drawn tinted by `linecolor`, so changing the color never renders the
+    text either.  The cache keeps the `CACHE_SIZE` most recently used textures.
+    
+    The constructor also accepts the other text options of Kivy labels, listed in 
+    `OPTIONS` (such as `italic`, `markup`, `padding` and `text_size`).  They are passed
+    to the text renderer, and are part of the cache key.  They cannot be changed after
+    the label is created.  As the text is tinted, any colors in markup are multiplied
+    by `linecolor`; use a white `linecolor` to show them as they are."""
+    # Class attribute for the rendered text, as textures by (text, font, size, bold, halign, options)
+    TEXTURE_CACHE = OrderedDict()
+    # Class attribute for the most textures to keep in TEXTURE_CACHE
+    CACHE_SIZE = 64
+    # Class attribute for the Kivy text options that the constructor passes to the renderer
+    OPTIONS = ('italic','underline','strikethrough','markup','padding','text_size',
+               'line_height','max_lines','shorten','shorten_from','split_str','strip',
+               'strip_reflow','outline_width','outline_color','font_family','font_context',
+               'font_features','font_hinting','font_kerning','font_blended','mipmap',
+               'base_direction','font_direction','font_script_name','text_language',
+               'unicode_errors','limit_render_to_text_bbox')
     
     # MUTABLE PROPERTIES
     @property
@@ -311,8 +335,8 @@ class GLabel(GRectangle):
     def font_size(self,value):
         assert type(value) in [int,float], 'value %s is not a number' % repr(value)
         self._fsize = value
-        self._label.font_size = value
-        self._label.texture_update()
+        if self._defined:
+            self._render()
     
     @property
     def font_name(self):
@@ -320,14 +344,15 @@ class GLabel(GRectangle):
         The file name for the .ttf file to use as a font
         
         **Invariant**: Must be a string referring to a .ttf file in folder Fonts"""
-        return self._label.font_name
+        return self._fname
     
     @font_name.setter
     def font_name(self,value):
         from .app import GameApp
         assert GameApp.is_font(value), 'value %s is not a font name' % repr(value)
-        self._label.font_name = value
-        self._label.texture_update()
+        self._fname = value
+        if self._defined:
+            self._render()
     
     @property
     def bold(self):
@@ -339,13 +364,14 @@ class GLabel(GRectangle):
         `ComicSans.ttf` and `ComicSansBold.ttf` for an example.
         
         **Invariant**: Must be a boolean"""
-        return self._label.bold
+        return self._bold
 
     @bold.setter
     def bold(self,value):
         assert type(value) == bool, repr(value)+' is not a bool'
-        self._label.bold = value
-        self._label.texture_update()
+        self._bold = value
+        if self._defined:
+            self._render()
 
     @property
     def text(self):
@@ -357,13 +383,14 @@ class GLabel(GRectangle):
         this label will grow to ensure that the text will fit in the rectangle.
         
         **Invariant**: Must be a string"""
-        return self._label.text
+        return self._text
     
     @text.setter
     def text(self,value):
         assert type(value) == str, 'value %s is not a string' % repr(value)
-        self._label.text = value
-        self._label.texture_update()
+        self._text = value
+        if self._defined:
+            self._render()
     
     @property
     def halign(self):
@@ -385,9 +412,8 @@ class GLabel(GRectangle):
     def halign(self,value):
         assert value in ('left','right','center'), 'value %s is not a valid horizontal alignment' % repr(value)
         self._halign = value
-        self._label.halign = value
         if self._defined:
-            self._reset()
+            self._render()
     
     @property
     def valign(self):
@@ -409,7 +435,6 @@ class GLabel(GRectangle):
     def valign(self,value):
         assert value in ('top','middle','bottom'), 'value %s is not a valid vertical alignment' % repr(value)
         self._valign = value
-        self._label.valign = value
         if self._defined:
             self._reset()
     
@@ -588,20 +613,26 @@ class GLabel(GRectangle):
             GLabel(text='Hello')
         
         This class supports the all same keywords as :class:`GRectangle`, as well as 
-        additional attributes for the text properties (e.g. font size and name).
+        additional attributes for the text properties (e.g. font size and name), and 
+        the Kivy text options in `OPTIONS`.
         """
         self._defined = False
         self._hanchor = 'center'
         self._vanchor = 'center'
+        self._texture = None
         
-        sanitized = {}
-        excludes  = ['linewidth','linecolor','fillcolor','halign','valign','left','bottom']
-        for key in keywords:
-            if not key in excludes:
-                sanitized[key] = keywords[key]
+        self._options = {}
+        for key in GLabel.OPTIONS:
+            if key in keywords:
+                self._options[key] = keywords[key]
+        self._optkey = tuple((key,self._hashable(self._options[key])) for key in sorted(self._options))
         
-        self._label = Label(**sanitized)
-        self._label.size_hint = (None,None)
+        self.text = keywords['text'] if 'text' in keywords else ''
+        self.font_size = keywords['font_size'] if 'font_size' in keywords else 15
+        self.bold = keywords['bold'] if 'bold' in keywords else False
+        self._fname = 'Roboto'
+        if 'font_name' in keywords:
+            self.font_name = keywords['font_name']
         
         self.linewidth = keywords['linewidth'] if 'linewidth' in keywords else 0.0
         self.halign = keywords['halign'] if 'halign' in keywords else 'center'
@@ -610,9 +641,9 @@ class GLabel(GRectangle):
         GObject.__init__(self,**keywords)
         if not self.linecolor:
             self.linecolor = (0,0,0,1)
+        self._texture = self._rasterize()
         self._reset()
         self._defined = True
-        self._label.bind(texture_size=self._callback)
     
     def __str__(self):
         """
@@ -627,27 +658,77 @@ class GLabel(GRectangle):
                 % (s,repr(self.text),repr(self.x),repr(self.y),repr(self.angle))
     
     # HIDDEN METHODS
-    def _callback(self,instance=None,value=None):
+    def _render(self):
         """
-        A workaround to deal with parameter requirements for callbacks
+        Updates the texture of this label after a change to its text or font.
+        
+        The drawing cache is only reset if the texture changed.
         """
-        if self._defined:
+        texture = self._rasterize()
+        if not texture is self._texture:
+            self._texture = texture
             self._reset()
     
+    def _rasterize(self):
+        """
+        Returns the texture of the text of this label, or None if the text is empty.
+        
+        The texture comes from `TEXTURE_CACHE` if possible.  Otherwise the text is 
+        rendered and the texture is added to the cache, removing the least recently 
+        used texture if the cache is full.
+        """
+        if self._text == '':
+            return None
+        
+        key = (self._text,self._fname,self._fsize,self._bold,self._halign,self._optkey)
+        cache = GLabel.TEXTURE_CACHE
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        
+        if self._options.get('markup'):
+            from kivy.core.text.markup import MarkupLabel as Label
+        else:
+            from kivy.core.text import Label
+        label = Label(text=self._text,font_name=self._fname,font_size=self._fsize,
+                      bold=self._bold,halign=self._halign,**self._options)
+        # Some options (such as max_lines) are not read by the initializer
+        for option in self._options:
+            if not option in label.options:
+                label.options[option] = self._options[option]
+        label.refresh()
+        cache[key] = label.texture
+        while len(cache) > GLabel.CACHE_SIZE:
+            cache.popitem(last=False)
+        return label.texture
+    
+    @classmethod
+    def _hashable(cls,value):
+        """
+        Returns: A version of the text option ``value`` that can be part of a cache key
+        
+        Lists (such as a padding or a color) become tuples.
+        
+        :param value: The value of a text option
+        :type value:  any
+        """
+        if type(value) in [list,tuple]:
+            return tuple(cls._hashable(item) for item in value)
+        return value
+    
     def _reset(self):
         """
         Resets the drawing cache.
         """
-        # Set up the label at the center.
-        self._label.size = self._label.texture_size
-        self._label.center = (0,0)
-        if self.linecolor:
-            self._label.color = self.linecolor
+        # Set up the text at the center.
+        tw, th = (0,0) if self._texture is None else self._texture.size
+        tx = -tw/2.0
+        ty = -th/2.0
         
         # Resize the outside if necessary
         self._defined = False
-        self.width  = max(self.width, self._label.width)
-        self.height = max(self.height,self._label.height)
+        self.width  = max(self.width, tw)
+        self.height = max(self.height,th)
         self._defined = True
         
         # Reset the absolute anchor
@@ -662,17 +743,17 @@ class GLabel(GRectangle):
         elif self._vanchor == 'bottom':
             self._trans.y = self._hv+self.height/2.0
         
-        # Reset the label anchor.
+        # Reset the text anchor.
         if self.halign == 'left':
-            self._label.x = -self.width/2.0
+            tx = -self.width/2.0
         elif self.halign == 'right':
-            self._label.right = self.width/2.0
+            tx = self.width/2.0-tw
         
-        # Reset the label anchor.
+        # Reset the text anchor.
         if self.valign == 'top':
-            self._label.top = self.height/2.0
+            ty = self.height/2.0-th
         elif self.valign == 'bottom':
-            self._label.bottom = -self.height/2.0
+            ty = -self.height/2.0
         
         GObject._reset(self)
         x = -self.width/2.0
@@ -683,7 +764,9 @@ class GLabel(GRectangle):
             self._cache.add(self._fillcolor)
             self._cache.add(fill)
         
-        self._cache.add(self._label.canvas)
+        if not self._texture is None:
+            self._cache.add(Color(*self.linecolor))
+            self._cache.add(Rectangle(texture=self._texture,pos=(tx,ty),size=(tw,th)))
         
         if self._linewidth > 0:
             line = Line(rectangle=(x,y,self.width,self.height),joint='miter',close=True,width=self.linewidth)
@@ -0,0 +1,353 @@
+"""
+Glyph atlas text for 2D game support.
+
+A :class:`GLabel` renders its whole text to a texture, so changing the text (as a score
+or a frame rate does every frame) renders it again.  This module renders each character
+of a font only once, into a shared texture called a *glyph atlas*.  A :class:`GText`
+draws its text as a mesh with one quad per character, taken from the atlas.  Changing
+the text then only changes the vertices of the mesh.
+
+The atlas holds the printable ASCII characters, and is made the first time a font is
+used at a given size.  Other characters are drawn as a question mark.  Characters are
+placed by their advance width, without kerning, which suits the fixed width fonts used
+for game text (such as ``Arcade.ttf`` and ``RetroGame.ttf``).
+"""
+from kivy.graphics import *
+from kivy.graphics.instructions import *
+from .gobject import GObject
+from .app import GameApp
+
+# The characters in a glyph atlas (the printable ASCII characters)
+GLYPHS = ''.join(chr(code) for code in range(32,127))
+# The character drawn for a character that is not in the atlas
+MISSING = '?'
+# The number of characters in each row of an atlas
+_ROW = 32
+# The two triangles of a quad, as indices of its corners
+_TRIANGLES = (0,1,2,2,3,0)
+
+
+class GlyphAtlas(object):
+    """
+    A class representing the characters of a font, rendered to a single texture.
+
+    Atlases should be made with the class method :meth:`get`, which makes each atlas
+    only once.  The method :meth:`layout` returns the mesh vertices to draw a string.
+    """
+    # Class attribute for the atlases made so far, by (font name, font size)
+    CACHE = {}
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def font_name(self):
+        """
+        The font file of this atlas, or None for the default Kivy font.
+
+        **Invariant**: Must be a string referring to a .ttf file in folder Fonts, or None
+        """
+        return self._fname
+
+    @property
+    def font_size(self):
+        """
+        The size of the font in points.
+
+        **Invariant**: Must be a positive number (int or float)
+        """
+        return self._fsize
+
+    @property
+    def texture(self):
+        """
+        The texture with the rendered characters.
+
+        **Invariant**: Must be a Kivy ``Texture``
+        """
+        return self._texture
+
+    @property
+    def line_height(self):
+        """
+        The height of a line of text, in pixels.
+
+        **Invariant**: Must be a ``float`` > 0
+        """
+        return self._lheight
+
+    # CLASS METHODS
+    @classmethod
+    def get(cls,font_name,font_size):
+        """
+        Returns the atlas for the given font and size, making it if necessary.
+
+        :param font_name: The font file, or None for the default Kivy font
+        :type font_name:  ``str`` or None
+
+        :param font_size: The size of the font in points
+        :type font_size:  ``int`` or ``float`` > 0
+        """
+        key = (font_name,font_size)
+        if not key in cls.CACHE:
+            cls.CACHE[key] = cls(font_name,font_size)
+        return cls.CACHE[key]
+
+    # BUILT-IN METHODS
+    def __init__(self,font_name,font_size):
+        """
+        Creates a new atlas, rendering the characters of the font.
+
+        The characters are rendered in white, a row at a time, with a space between
+        them so that a character never spills into its neighbor.
+
+        :param font_name: The font file, or None for the default Kivy font
+        :type font_name:  ``str`` or None
+
+        :param font_size: The size of the font in points
+        :type font_size:  ``int`` or ``float`` > 0
+        """
+        from kivy.core.text import Label
+        assert font_name is None or GameApp.is_font(font_name), \
+            'font_name %s is not a font name' % repr(font_name)
+        assert type(font_size) in [int,float] and font_size > 0, \
+            'font_size %s is not a positive number' % repr(font_size)
+        self._fname = font_name
+        self._fsize = font_size
+
+        rows = [' '.join(GLYPHS[pos:pos+_ROW]) for pos in range(0,len(GLYPHS),_ROW)]
+        options = {'font_size': font_size, 'halign': 'left'}
+        if not font_name is None:
+            options['font_name'] = font_name
+        label = Label(text='\n'.join(rows),**options)
+        label.refresh()
+        self._texture = label.texture
+        width, height = self._texture.size
+        self._lheight = float(height)/len(rows)
+
+        # Map a point of the atlas (from the bottom left) to texture coordinates
+        coords = self._texture.tex_coords
+        def uv(px,py):
+            fx = float(px)/width
+            fy = float(py)/height
+            return (coords[0]+fx*(coords[2]-coords[0]),coords[1]+fy*(coords[7]-coords[1]))
+
+        # The advance and texture coordinates of each character
+        self._glyphs = {}
+        for row in range(len(rows)):
+            top = height-row*self._lheight
+            bottom = top-self._lheight
+            for pos in range(0,len(rows[row]),2):
+                left = label.get_extents(rows[row][:pos])[0]
+                right = label.get_extents(rows[row][:pos+1])[0]
+                u0, v0 = uv(left,bottom)
+                u1, v1 = uv(right,top)
+                self._glyphs[rows[row][pos]] = (float(right-left),u0,v0,u1,v1)
+
+    # PUBLIC METHODS
+    def measure(self,text):
+        """
+        Returns the width of text in pixels.
+
+        :param text: The text to measure
+        :type text:  ``str``
+        """
+        glyphs = self._glyphs
+        missing = glyphs[MISSING]
+        return sum(glyphs.get(char,missing)[0] for char in text)
+
+    def layout(self,text,x,y):
+        """
+        Returns the mesh vertices to draw text with its bottom left corner at (x,y).
+
+        Each character is a quad of four vertices, counter-clockwise from the bottom
+        left.  A vertex is a position followed by its texture coordinates.
+
+        :param text: The text to draw
+        :type text:  ``str``
+
+        :param x: The left edge of the text
+        :type x:  ``int`` or ``float``
+
+        :param y: The bottom edge of the text
+        :type y:  ``int`` or ``float``
+
+        :return: The vertices, as a flat list of four floats per vertex
+        :rtype:  ``list`` of ``float``
+        """
+        glyphs = self._glyphs
+        missing = glyphs[MISSING]
+        top = y+self._lheight
+        result = []
+        for char in text:
+            advance, u0, v0, u1, v1 = glyphs.get(char,missing)
+            right = x+advance
+            result.extend((x,y,u0,v0, right,y,u1,v0, right,top,u1,v1, x,top,u0,v1))
+            x = right
+        return result
+
+
+class GText(GObject):
+    """
+    A class representing a line of text drawn from a glyph atlas.
+
+    This object is like a :class:`GLabel` with a single line of text and no background
+    or border.  The text color is the ``linecolor``, which is white by default (and
+    None hides the text).  Unlike
+    a label, changing the ``text`` is cheap, so this class is meant for text that changes
+    often, such as a score or a frame rate.  The font and size are best left alone, as
+    changing them makes (or finds) a new atlas.
+
+    The ``width`` and ``height`` are the size of the text, and change with it.  The
+    attribute ``halign`` decides which edge of the text stays in place when the text
+    changes width: the left edge, the right edge, or the center.
+    """
+
+    # MUTABLE PROPERTIES
+    @property
+    def text(self):
+        """
+        The text of this object.
+
+        **Invariant**: Must be a string with no line breaks
+        """
+        return self._text
+
+    @text.setter
+    def text(self,value):
+        assert type(value) == str, 'value %s is not a string' % repr(value)
+        if value == self._text:
+            return
+        self._text = value
+        if self._defined:
+            self._layout()
+
+    @property
+    def font_name(self):
+        """
+        The file name for the .ttf file to use as a font, or None for the default font
+
+        **Invariant**: Must be a string referring to a .ttf file in folder Fonts, or None
+        """
+        return self._fname
+
+    @font_name.setter
+    def font_name(self,value):
+        assert value is None or GameApp.is_font(value), 'value %s is not a font name' % repr(value)
+        self._fname = value
+        if self._defined:
+            self._reset()
+
+    @property
+    def font_size(self):
+        """
+        The size of the text font in points.
+
+        **Invariant**: Must be a positive number (int or float)
+        """
+        return self._fsize
+
+    @font_size.setter
+    def font_size(self,value):
+        assert type(value) in [int,float] and value > 0, 'value %s is not a positive number' % repr(value)
+        self._fsize = value
+        if self._defined:
+            self._reset()
+
+    @property
+    def halign(self):
+        """
+        The edge of the text that stays in place when the text changes width.
+
+        **Invariant**: Must be one of 'left', 'right', or 'center'
+        """
+        return self._halign
+
+    @halign.setter
+    def halign(self,value):
+        assert value in ('left','right','center'), 'value %s is not a valid horizontal alignment' % repr(value)
+        self._halign = value
+
+    # BUILT-IN METHODS
+    def __init__(self,**keywords):
+        """
+        Creates a new line of text.
+
+        To use the constructor for this class, you should provide it with a list of
+        keyword arguments that initialize various attributes.  For example, to show
+        a score in the top left corner, use the constructor call::
+
+            GText(text='0',font_name='Arcade.ttf',font_size=24,halign='left',left=10,top=690)
+
+        This class supports the same keywords as :class:`GObject`, as well as ``text``,
+        ``font_name``, ``font_size`` and ``halign``.  The ``width`` and ``height`` are
+        ignored, as they are the size of the text.
+
+        :param keywords: dictionary of keyword arguments
+        :type keywords:  keys are attribute names
+        """
+        self._defined = False
+        self._text = ''
+        self.text = keywords['text'] if 'text' in keywords else ''
+        self.font_name = keywords['font_name'] if 'font_name' in keywords else None
+        self.font_size = keywords['font_size'] if 'font_size' in keywords else 15
+        self.halign = keywords['halign'] if 'halign' in keywords else 'center'
+
+        # The size of the text decides the position, so find it first
+        self._atlas = GlyphAtlas.get(self._fname,self._fsize)
+        keywords = dict(keywords)
+        keywords['width'] = max(self._atlas.measure(self._text),1.0)
+        keywords['height'] = self._atlas.line_height
+        GObject.__init__(self,**keywords)
+        if not self.linecolor:
+            self.linecolor = (1,1,1,1)
+        self._reset()
+        self._defined = True
+
+    def __str__(self):
+        """
+        :return: A readable string representation of this object.
+        :rtype:  ``str``
+        """
+        if self.name is None:
+            s = '['
+        else:
+            s = '[name=%s,' % self.name
+        return '%s,text=%s,center=(%s,%s),angle=%s]' \
+                % (s,repr(self.text),repr(self.x),repr(self.y),repr(self.angle))
+
+    # HIDDEN METHODS
+    def _layout(self):
+        """
+        Updates the mesh vertices (and the size) after a change to the text.
+
+        The edge given by ``halign`` stays in place.
+        """
+        width = max(self._atlas.measure(self._text),1.0)
+        if width != self._width:
+            if self._halign == 'left':
+                self._trans.x += (width-self._width)/2.0
+            elif self._halign == 'right':
+                self._trans.x -= (width-self._width)/2.0
+            self._width = width
+            self._mtrue = False
+
+        vertices = self._atlas.layout(self._text,-width/2.0,-self._height/2.0)
+        count = len(self._text)
+        if len(self._indices) < 6*count:
+            self._indices = [4*quad+corner for quad in range(2*count) for corner in _TRIANGLES]
+        self._mesh.vertices = vertices
+        self._mesh.indices = self._indices[:6*count]
+
+    def _reset(self):
+        """
+        Resets the drawing cache.
+        """
+        self._atlas = GlyphAtlas.get(self._fname,self._fsize)
+        self._height = self._atlas.line_height
+        GObject._reset(self)
+        self._mesh = Mesh(mode='triangles',texture=self._atlas.texture,
+                          fmt=[(b'vPosition',2,'float'),(b'vTexCoords0',2,'float')])
+        self._indices = []
+        self._cache.add(Color(*(self.linecolor or (1,1,1,0))))
+        self._cache.add(self._mesh)
+        self._cache.add(PopMatrix())
+        self._layout()
@@ -319,12 +319,50 @@ class GView(FloatLayout):
     :class:`GObject` instances to the :meth:`draw` method.  You must do this every
     animation frame, as the game is constantly clearing the window.
 
+    Alternatively, the view can be put in retained mode (see the attribute
+    :attr:`retained`).  Then the game does not clear the window each frame.  An
+    object only needs to be drawn once, and stays on screen until it is erased with
+    the method :meth:`erase` in :class:`GObject`.  Moving or rotating an object that
+    is on screen does not require drawing it again.
+
     **You should never construct an object of this class**.  Creating a new instance
     of this class will not properly display it on the screen.  Instead, you should
     only use the one provided in the `view` attribute of :class:`GameApp`.
     See the documentation of that class for more information.
     """
 
+    # MUTABLE ATTRIBUTES
+    @property
+    def retained(self):
+        """
+        Whether this view is in retained mode.
+
+        In retained mode, the game does not clear the view at the start of each
+        animation frame.  Changing this value clears the view.
+
+        **Invariant**: Must be a bool.
+        """
+        return self._retained
+
+    @retained.setter
+    def retained(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._retained = value
+        self.clear()
+
+    # IMMUTABLE ATTRIBUTES
+    @property
+    def generation(self):
+        """
+        The number of times this view has been cleared.
+
+        In retained mode, an object that compares this value to the one when it was
+        drawn knows whether it must be drawn again.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return self._generation
+
     # BUILT-IN METHODS
     def __init__(self):
         """
@@ -341,6 +379,8 @@ class GView(FloatLayout):
         self.bind(size=self._reset)
         self._reset()
         self._contents = set()
+        self._retained = False
+        self._generation = 0
 
 
     # PUBLIC METHODS
@@ -367,8 +407,43 @@ class GView(FloatLayout):
         """
         self._frame.clear()
         self._contents.clear()
+        self._generation += 1
+
+    def erase(self,cmd):
+        """
+        Erases the given Kivy graphics command from this view.
+
+        You should never call this method, since you do not understand raw Kivy graphics
+        commands.  Instead, you should use the `erase` method in :class:`GObject` instead.
+        Nothing happens if the command is not in the view.
+
+        :param cmd: the command to erase
+        :type cmd:  A Kivy graphics command
+        """
+        if cmd in self._contents:
+            self._frame.remove(cmd)
+            self._contents.remove(cmd)
 
     # HIDDEN METHODS
+    def _replace(self,old,new):
+        """
+        Replaces the Kivy graphics command old with new, keeping its drawing order.
+
+        Nothing happens if old is not in the view.
+
+        :param old: the command to replace
+        :type old:  A Kivy graphics command
+
+        :param new: the replacement command
+        :type new:  A Kivy graphics command
+        """
+        if old in self._contents:
+            pos = self._frame.indexof(old)
+            self._frame.remove(old)
+            self._contents.remove(old)
+            self._frame.insert(pos,new)
+            self._contents.add(new)
+
     def _reset(self,obj=None,value=None):
         """
         Resets the view canvas in response to a resizing event
@@ -6,8 +6,9 @@ This classes wrap the Kivy audio interface, making it simpler for students to us
 Author: Walker M. White (wmw2)
 Date:   August 1, 2017 (Python 3 version)
 """
-from kivy.core.audio import SoundLoader
 from .app import GameApp
+from collections import OrderedDict
+import os.path
 
 
 class Sound(object):
@@ -76,6 +77,8 @@ class Sound(object):
         :type source:  ``str``
         """
         from .app import GameApp
+        # The audio providers are slow to import, so wait for the first sound
+        from kivy.core.audio import SoundLoader
         assert GameApp.is_sound(source), 'source %s is not a sound file' % repr(source)
         self._source = source
         self._sound  = SoundLoader.load(source)
@@ -101,6 +104,15 @@ class Sound(object):
         This will stop the sound immediately, even if it is looping.
         """
         self._sound.stop()
+    
+    def unload(self):
+        """
+        Frees the audio data of this sound.
+        
+        The sound is stopped, and cannot be played again.
+        """
+        self._sound.stop()
+        self._sound.unload()
 
 
 # #mark -
@@ -118,44 +130,255 @@ class SoundLibrary(object):
     To play the sound, we access it as follows::
         
         soundlib['soundname'].play()
+    
+    A :class:`Sound` cannot be played again until it finishes, so a sound effect
+    that is played in rapid succession (such as a shot) is cut off or dropped.  To
+    avoid this, a library can load several copies, or *voices*, of each sound, and
+    play them with the method :meth:`play`::
+        
+        soundlib = SoundLibrary(voices=4,limit=8)
+        soundlib['pew'] = 'pew1.wav'
+        soundlib.play('pew')
+    
+    This plays a voice of the sound that is not already playing.  If they all are,
+    the voice that started first is stopped and started again (it is *stolen*).  The
+    attribute ``limit`` caps the number of voices playing at once in the whole
+    library, again by stealing the oldest voice.  Finally, a sound is started at most
+    once per animation frame, so that a burst of events (such as many explosions at
+    once) costs no more than a single one.
+    
+    A library made with ``lazy=True`` does not load a sound when it is assigned.
+    It only checks that the file exists, and loads the sound the first time it is 
+    used.  A library with a ``budget`` keeps the memory of its loaded sounds (as 
+    estimated from their file sizes) under that many bytes.  When loading a sound 
+    goes over budget, the sounds that were used least recently are unloaded, and are 
+    loaded again the next time they are used.  Sounds that are playing are never 
+    unloaded.  The attributes ``hits``, ``misses`` and ``evictions`` count how well
+    this works.
+    
+    A sound that cannot be loaded (for example, because there is no audio device)
+    is marked as unavailable and listed in ``failures``.  It is not loaded again
+    until it is assigned a file again, and playing it does nothing.
     """
     
-    def __init__(self):
+    # MUTABLE PROPERTIES
+    @property
+    def limit(self):
+        """
+        The most voices that :meth:`play` lets play at once, or None for no limit.
+        
+        **Invariant**: Must be an ``int`` > 0 or None.
+        """
+        return self._limit
+    
+    @limit.setter
+    def limit(self,value):
+        assert value is None or (type(value) == int and value > 0), \
+            'value %s is not a valid voice limit' % repr(value)
+        self._limit = value
+    
+    @property
+    def budget(self):
+        """
+        The most memory (in bytes) for the loaded sounds, or None for no limit.
+        
+        The memory of a sound is estimated as the size of its file, for each voice.
+        Lowering the budget unloads sounds right away.
+        
+        **Invariant**: Must be an ``int`` > 0 or None.
+        """
+        return self._budget
+    
+    @budget.setter
+    def budget(self,value):
+        assert value is None or (type(value) == int and value > 0), \
+            'value %s is not a valid memory budget' % repr(value)
+        self._budget = value
+        self._evict()
+    
+    # IMMUTABLE PROPERTIES
+    @property
+    def voices(self):
+        """
+        The number of voices loaded for each sound.
+        
+        **Immutable**: This value cannot be changed after the library is created.
+        
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._voices
+    
+    @property
+    def lazy(self):
+        """
+        Whether sounds are loaded when they are first used, rather than when assigned.
+        
+        **Immutable**: This value cannot be changed after the library is created.
+        
+        **Invariant**: Must be a ``bool``.
+        """
+        return self._lazy
+    
+    @property
+    def playing(self):
+        """
+        The number of voices started by :meth:`play` that are still playing.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        self._prune()
+        return len(self._active)
+    
+    @property
+    def loaded(self):
+        """
+        The number of sounds currently loaded.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return len(self._data)
+    
+    @property
+    def failures(self):
+        """
+        The keys of the sounds that could not be loaded.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be a list of keys in this library.
+        """
+        return list(self._failures)
+    
+    @property
+    def memory(self):
+        """
+        The estimated memory (in bytes) of the sounds currently loaded.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return self._memory
+    
+    @property
+    def hits(self):
+        """
+        The number of times a sound was used while it was loaded.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return self._hits
+    
+    @property
+    def misses(self):
+        """
+        The number of times a sound had to be loaded when it was used.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return self._misses
+    
+    @property
+    def evictions(self):
+        """
+        The number of times a sound was unloaded to stay within the budget.
+        
+        **Immutable**: This value cannot be changed.
+        
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return self._evictions
+    
+    def __init__(self,voices=1,limit=None,lazy=False,budget=None):
         """
         Creates a new, empty sound library.
+        
+        :param voices: The number of voices to load for each sound
+        :type voices:  ``int`` > 0
+        
+        :param limit: The most voices to play at once, or None for no limit
+        :type limit:  ``int`` > 0 or None
+        
+        :param lazy: Whether to load each sound when it is first used
+        :type lazy:  ``bool``
+        
+        :param budget: The most memory (in bytes) for loaded sounds, or None for no limit
+        :type budget:  ``int`` > 0 or None
         """
-        self._data = {}
+        assert type(voices) == int and voices > 0, \
+            'voices %s is not a valid number of voices' % repr(voices)
+        assert type(lazy) == bool, 'lazy %s is not a bool' % repr(lazy)
+        # The file of every sound, by key
+        self._files = {}
+        # The voices of the loaded sounds, by key, least recently used first
+        self._data = OrderedDict()
+        # The keys of the sounds that could not be loaded
+        self._failures = set()
+        self._voices = voices
+        self._lazy = lazy
+        self._memory = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # The voices started by play, oldest first
+        self._active = []
+        # The animation frame each sound was last started in, by key
+        self._started = {}
+        self.limit = limit
+        self.budget = budget
     
     def __len__(self):
         """
         :return: The number of sounds in this library.
         :rtype:  ``int`` >= 0
         """
-        return len(self._data)
+        return len(self._files)
     
     def __getitem__(self, key):
         """
         Accesses the sound object for the given name.
         
+        If the library has several voices for each sound, this is the first one.
+        The sound is loaded if it is not already.
+        
         :param key: The key identifying a sound object
         :type key:   ``str``
         
-        :return: The object for the given sound name.
-        :rtype:  :class:`Sound`
+        :return: The object for the given sound name, or None if it cannot be loaded.
+        :rtype:  :class:`Sound` or None
         """
-        return self._data[key]
+        voices = self._load(key)
+        return None if voices is None else voices[0]
     
     def __setitem__(self, key, filename):
         """
         Creates a sound object from the file filename and assigns it the given name.
         
+        If the name is already assigned to the same file, the sound is not loaded 
+        again.  If the library is lazy, the sound is not loaded until it is used.
+        
         :param key: The key identifying a sound object
         :type key:  ``str``
         
         :param filename: The name of the file containing the sound source
         :type filename:  ``str``
         """
-        self._data[key] = Sound(filename)
+        assert GameApp.is_sound(filename), 'filename %s is not a sound file' % repr(filename)
+        if self._files.get(key) == filename:
+            return
+        if key in self._files:
+            del self[key]
+        self._files[key] = filename
+        if not self._lazy:
+            self._load(key,False)
     
     def __delitem__(self, key):
         """
@@ -164,18 +387,171 @@ class SoundLibrary(object):
         :param key: The key identifying a sound object
         :type key:  ``str``
         """
-        del self._data[key]
+        if key in self._data:
+            self._unload(key)
+        del self._files[key]
+        self._failures.discard(key)
+        self._started.pop(key,None)
     
     def __iter__(self):
         """
         :return: The iterator for this sound dictionary.
         :rtype:  ``iterable``
         """
-        return iter(self._data.keys())
+        return iter(self._files.keys())
     
     def keys(self):
         """
         :return: The keys for this sound dictionary.
         :rtype:  ``iterable``
         """
-        return self._data.keys()
+        return self._files.keys()
+    
+    def play(self, key, volume=None):
+        """
+        Plays a voice of the sound for the given name, and returns it.
+        
+        The voice is one that is not playing, or else the one of this sound that 
+        started first.  If ``limit`` voices are already playing, the voice that 
+        started first in the library is stopped to make room.  If this sound was 
+        already started this animation frame, or cannot be loaded, nothing is played
+        and this method returns None.  The sound is loaded if it is not already.
+        
+        :param key: The key identifying a sound object
+        :type key:  ``str``
+        
+        :param volume: The volume to play at, or None to keep the current volume
+        :type volume:  ``float`` in 0..1 or None
+        
+        :return: The voice that was played, or None if nothing was played
+        :rtype:  :class:`Sound` or None
+        """
+        from kivy.clock import Clock
+        if not key in self._files:
+            raise KeyError(key)
+        if self._started.get(key) == Clock.frames:
+            return None
+        self._started[key] = Clock.frames
+        voices = self._load(key)
+        if voices is None:
+            return None
+        self._prune()
+        
+        voice = None
+        for item in voices:
+            if not item in self._active:
+                voice = item
+                break
+        if voice is None:
+            voice = min(voices,key=self._active.index)
+        if voice in self._active:
+            voice.stop()
+            self._active.remove(voice)
+        elif not self._limit is None and len(self._active) >= self._limit:
+            self._active.pop(0).stop()
+        
+        if not volume is None:
+            voice.volume = volume
+        voice.play()
+        self._active.append(voice)
+        return voice
+    
+    def stop(self, key=None):
+        """
+        Stops every voice of the sound for the given name.
+        
+        :param key: The key identifying a sound object, or None for every sound
+        :type key:  ``str`` or None
+        """
+        if not key is None and not key in self._files:
+            raise KeyError(key)
+        keys = list(self._data.keys()) if key is None else [key]
+        for name in keys:
+            for voice in self._data.get(name,[]):
+                voice.stop()
+                if voice in self._active:
+                    self._active.remove(voice)
+    
+    def _load(self, key, count=True):
+        """
+        Returns the voices of the sound for the given name, loading it if necessary.
+        
+        The sound becomes the most recently used one.  If loading it goes over the 
+        budget, the least recently used sounds are unloaded.  If the sound cannot be
+        loaded, it is added to the failures, and this method returns None.
+        
+        :param key: The key identifying a sound object
+        :type key:  ``str``
+        
+        :param count: Whether to count this as a hit or a miss
+        :type count:  ``bool``
+        """
+        if key in self._data:
+            self._data.move_to_end(key)
+            if count:
+                self._hits += 1
+            return self._data[key]
+        
+        if key in self._failures:
+            return None
+        
+        filename = self._files[key]
+        try:
+            voices = [Sound(filename) for voice in range(self._voices)]
+        except IOError as e:
+            from kivy.logger import Logger
+            Logger.info('SoundLibrary: %s is unavailable: %s' % (repr(key),e))
+            self._failures.add(key)
+            return None
+        self._data[key] = voices
+        self._memory += self._size(key)
+        if count:
+            self._misses += 1
+        self._evict()
+        return voices
+    
+    def _unload(self, key):
+        """
+        Unloads the sound for the given name, keeping its file.
+        
+        :param key: The key identifying a loaded sound
+        :type key:  ``str``
+        """
+        for voice in self._data.pop(key):
+            if voice in self._active:
+                self._active.remove(voice)
+            voice.unload()
+        self._memory -= self._size(key)
+    
+    def _evict(self):
+        """
+        Unloads the least recently used sounds until the memory is within budget.
+        
+        The most recently used sound, and sounds that are playing, are kept even 
+        if that leaves the library over budget.
+        """
+        if self._budget is None or self._memory <= self._budget:
+            return
+        self._prune()
+        keys = list(self._data.keys())[:-1]
+        for key in keys:
+            if self._memory <= self._budget:
+                return
+            if not any(voice.playing for voice in self._data[key]):
+                self._unload(key)
+                self._evictions += 1
+    
+    def _size(self, key):
+        """
+        Returns the estimated memory (in bytes) of the sound for the given name.
+        
+        :param key: The key identifying a sound object
+        :type key:  ``str``
+        """
+        return self._voices*os.path.getsize(os.path.join(GameApp.sounds,self._files[key]))
+    
+    def _prune(self):
+        """
+        Removes the voices that have finished playing from the active voices.
+        """
+        self._active = [voice for voice in self._active if voice.playing]
@@ -0,0 +1,249 @@
+"""
+Headless support module for Planetoids
+
+This module allows a Wave to be stepped without a Kivy window.  Normally the models
+in models.py subclass GImage and GEllipse, and those classes build Kivy graphics
+instructions as soon as they are created.  That is fine when playing the game, but it
+means that the simulation cannot run on a machine without a display, and it can never
+run faster than the 60 frames a second scheduled by GameApp.
+
+To run headless, set the environment variable PLANETOIDS_HEADLESS to 1 BEFORE the
+models are imported.  The models then subclass the plain state classes in this module
+instead of the game2d drawables.  These classes have the same attributes as a GObject
+(x, y, width, height, angle and so on), but they are ordinary Python attributes and
+the draw method does nothing.  Drawing is therefore a layer on top of the simulation,
+and the simulation runs as fast as Python can step it.
+
+This module may NOT import game2d (or anything else that imports Kivy).
+"""
+from wavefile import isWaveFile, loadWave
+import os.path
+import json
+
+
+class HeadlessObject(object):
+    """
+    A class representing the state of a graphics object, without the graphics.
+
+    This class is a stand-in for GObject when the game runs headless.  It supports
+    the same keywords in the constructor, and it has the same position and size
+    attributes, but nothing is ever drawn.  There is no validation of attribute
+    values, as the simulation code has already been tested with the real GObject.
+    """
+    # Attribute x: The horizontal coordinate of the object center
+    # Invariant: x is an int or float
+    #
+    # Attribute y: The vertical coordinate of the object center
+    # Invariant: y is an int or float
+    #
+    # Attribute width: The horizontal width of this object
+    # Invariant: width is an int or float > 0
+    #
+    # Attribute height: The vertical height of this object
+    # Invariant: height is an int or float > 0
+    #
+    # Attribute angle: The angle of rotation about the center, in degrees
+    # Invariant: angle is an int or float
+    #
+    # Attribute fillcolor: The object fill color (unused)
+    # Invariant: fillcolor is None or any color value accepted by GObject
+    #
+    # Attribute linecolor: The object line color (unused)
+    # Invariant: linecolor is None or any color value accepted by GObject
+    #
+    # Attribute source: The source file for the image (unused)
+    # Invariant: source is None or a string
+    #
+    # Attribute name: The name of this object, for debugging
+    # Invariant: name is None or a string
+
+    def __init__(self,**keywords):
+        """
+        Creates a new headless object.
+
+        This constructor accepts the same keywords as GObject.  Relative positioning
+        keywords (left, right, top, bottom) are converted to a center position.
+
+        Parameter keywords: dictionary of keyword arguments
+        Precondition: keys are attribute names
+        """
+        self.width  = keywords['width']  if 'width'  in keywords else 1
+        self.height = keywords['height'] if 'height' in keywords else 1
+        self.angle  = keywords['angle']  if 'angle'  in keywords else 0
+
+        if 'x' in keywords:
+            self.x = keywords['x']
+        elif 'left' in keywords:
+            self.x = keywords['left']+self.width/2.0
+        elif 'right' in keywords:
+            self.x = keywords['right']-self.width/2.0
+        else:
+            self.x = 0
+
+        if 'y' in keywords:
+            self.y = keywords['y']
+        elif 'bottom' in keywords:
+            self.y = keywords['bottom']+self.height/2.0
+        elif 'top' in keywords:
+            self.y = keywords['top']-self.height/2.0
+        else:
+            self.y = 0
+
+        self.fillcolor = keywords['fillcolor'] if 'fillcolor' in keywords else None
+        self.linecolor = keywords['linecolor'] if 'linecolor' in keywords else None
+        self.source = keywords['source'] if 'source' in keywords else None
+        self.name = keywords['name'] if 'name' in keywords else None
+
+    def __repr__(self):
+        """
+        Returns an unambiguous string representation of this object.
+        """
+        return '%s[center=(%s,%s),width=%s,height=%s,angle=%s]' % \
+            (self.__class__.__name__,repr(self.x),repr(self.y),\
+            repr(self.width),repr(self.height),repr(self.angle))
+
+    def draw(self, view):
+        """
+        Does nothing, as headless objects are never drawn.
+
+        Parameter view: the game view (ignored)
+        Precondition: view is an instance of GView or None
+        """
+        pass
+
+    def erase(self, view):
+        """
+        Does nothing, as headless objects are never drawn.
+
+        Parameter view: the game view (ignored)
+        Precondition: view is an instance of GView or None
+        """
+        pass
+
+
+# The headless replacements for the game2d classes used by models.py
+GImage   = HeadlessObject
+GEllipse = HeadlessObject
+
+
+class HeadlessInput(object):
+    """
+    A class representing a scripted input handler.
+
+    This class is a stand-in for GInput when the game runs headless.  It supports
+    the method is_key_down and the attribute key_count, which are all that Wave and
+    Planetoids use.  The keys are pressed and released in code with the methods
+    press and release.
+    """
+    # Attribute _keys: The keys currently held down
+    # Invariant: _keys is a set of strings
+
+    @property
+    def key_count(self):
+        """
+        The number of keys currently held down.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        return len(self._keys)
+
+    @property
+    def keys(self):
+        """
+        The list of keys that are currently held down.
+
+        **Invariant**: Must be a tuple of strings (possibly empty)
+        """
+        return tuple(self._keys)
+
+    def __init__(self, *keys):
+        """
+        Creates a new input handler with the given keys held down.
+
+        Parameter keys: The keys to start held down
+        Precondition: keys are strings
+        """
+        self._keys = set(keys)
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is currently held down.
+
+        Parameter key: the key to test
+        Precondition: key is a string
+        """
+        return key in self._keys
+
+    def is_touch_down(self):
+        """
+        Returns False, as there is no mouse when running headless.
+        """
+        return False
+
+    def press(self, key):
+        """
+        Holds down the given key.
+
+        Parameter key: the key to press
+        Precondition: key is a string
+        """
+        self._keys.add(key)
+
+    def release(self, key):
+        """
+        Releases the given key (if it is held down).
+
+        Parameter key: the key to release
+        Precondition: key is a string
+        """
+        self._keys.discard(key)
+
+
+def load_wave(name):
+    """
+    Returns the wave dictionary for the given file name, or None if it does not exist
+
+    This is the headless version of GameApp.load_json.  The name must refer to a file
+    in the Data folder next to this module.  If it is a wave file (see wavefile.py),
+    the result is a PackedWave instead of a dictionary.
+
+    Parameter name: The file name
+    Precondition: name is a string
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),'Data',name)
+    if not os.path.exists(path):
+        return None
+    if isWaveFile(name):
+        return loadWave(path)
+    with open(path) as f:
+        return json.load(f)
+
+
+def simulate(wave, frames, input=None, dt=1/60):
+    """
+    Returns the number of frames that wave was stepped.
+
+    This function calls wave.update as fast as possible, up to frames times.  It stops
+    early if the ship is destroyed or all of the asteroids are destroyed, as there is
+    nothing left to simulate in either case.
+
+    Parameter wave: The wave to simulate
+    Precondition: wave is a Wave object
+
+    Parameter frames: The maximum number of frames to simulate
+    Precondition: frames is an int >= 0
+
+    Parameter input: The (scripted) input to pass to the wave
+    Precondition: input is None or an object with the GInput methods is_key_down
+    and key_count (such as a HeadlessInput)
+
+    Parameter dt: The time in seconds to report for each frame
+    Precondition: dt is a number (int or float) > 0
+    """
+    if input is None:
+        input = HeadlessInput()
+    count = 0
+    while count < frames and not wave.shipDied() and not wave.getAllDestroyed():
+        wave.update(dt, input)
+        count += 1
+    return count
@@ -18,8 +18,12 @@ Aaron Baruch Ilan Klimberg
 12/7/2022
 """
 from consts import *
-from game2d import *
+if HEADLESS:
+    from headless import GImage, GEllipse
+else:
+    from game2d import GImage, GEllipse
 from introcs import *
+import introcs
 import math
 
 # PRIMARY RULE: Models are not allowed to access anything in any module other than
@@ -41,6 +45,46 @@ def degToRad(deg):
     return math.pi*deg/180
 
 
+def _makeFacings():
+    """
+    Returns the list of unit facing vectors, one per quantized heading.
+
+    The ship only turns SHIP_TURN_RATE degrees at a time, so entry k is the
+    facing for the heading k*SHIP_TURN_RATE. The list is empty if a full turn
+    is not a whole number of steps, in which case there is nothing to share.
+    """
+    steps = 360/SHIP_TURN_RATE
+    if steps != int(steps):
+        return []
+    result = []
+    for k in range(int(steps)):
+        rad = degToRad(k*SHIP_TURN_RATE)
+        result.append(introcs.Vector2(x=math.cos(rad),y=math.sin(rad)))
+    return result
+
+
+# The unit facing vectors of the quantized headings (see facingVector)
+FACINGS = _makeFacings()
+
+
+def facingVector(angle):
+    """
+    Returns the unit vector pointing in the direction angle.
+
+    If angle is a multiple of SHIP_TURN_RATE, the vector comes from the shared
+    table FACINGS, and no trig or allocation is needed. Otherwise it is computed.
+    The result may be shared, so it must not be modified.
+
+    Parameter angle: The direction in degrees, counter-clockwise.
+    Precondition: angle is an int or float.
+    """
+    step = angle/SHIP_TURN_RATE
+    if len(FACINGS) > 0 and step == int(step):
+        return FACINGS[int(step) % len(FACINGS)]
+    rad = degToRad(angle)
+    return introcs.Vector2(x=math.cos(rad),y=math.sin(rad))
+
+
 class Bullet(GEllipse):
     """
     A class representing a bullet from the ship
@@ -119,6 +163,26 @@ class Bullet(GEllipse):
         self._velocity = facing * BULLET_SPEED
     
     # ADDITIONAL METHODS (MOVEMENT, COLLISIONS, ETC)
+    def reset(self, x, y, facing):
+        """
+        Re-initializes a recycled bullet at a new position and facing.
+
+        The size and color of the bullet do not change, so the drawing cache
+        built by GEllipse is kept.
+
+        Parameter x: The horizontal coordinate of the bullet's center.
+        Precondition: x is an int or float.
+
+        Parameter y: The vertical coordinate of the bullet's center.
+        Precondition: y is an int or float.
+
+        Parameter facing: the ship's facing, converted to a unit vector.
+        Precondition: facing is a Vector2 object.
+        """
+        self.x = x
+        self.y = y
+        self._velocity = facing * BULLET_SPEED
+
     def move(self):
         """
         Moves the bullets by updating the position of the bullets based
@@ -173,7 +237,8 @@ class Ship(GImage):
     # Invariant: _velocity is a Vector2 object
     #
     # Attribute _facing: The direction the ship is facing
-    # Invariant: _facing is a Vector2 object
+    # Invariant: _facing is a unit Vector2 object, possibly shared with FACINGS
+    # (so it is never modified in place)
     
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
     def getVelocity(self):
@@ -216,8 +281,7 @@ class Ship(GImage):
         super().__init__(x=x,y=y,angle=angle,source=source,width=width,\
             height=height)
         self._velocity = introcs.Vector2(0,0)
-        rad = degToRad(self.angle)
-        self._facing = introcs.Vector2(x=math.cos(rad),y=math.sin(rad))
+        self._facing = facingVector(self.angle)
     
     # ADDITIONAL METHODS (MOVEMENT, COLLISIONS, ETC)
     def turn(self, angle):
@@ -227,8 +291,7 @@ class Ship(GImage):
         Parameter angle: the angle of the ship's facing in degrees.
         Precondition: angle must be a float.
         """
-        rad = degToRad(angle)
-        self._facing = introcs.Vector2(x=math.cos(rad),y=math.sin(rad))
+        self._facing = facingVector(angle)
 
     def thrust(self, input):
         """
@@ -294,6 +357,12 @@ class Asteroid(GImage):
         """
         return self._size
 
+    def getVelocity(self):
+        """
+        Returns the asteroid's velocity.
+        """
+        return self._velocity
+
     def getDel(self):
         """
         Returns _delete attribute that indicates whether the asteroid should
@@ -312,7 +381,7 @@ class Asteroid(GImage):
     
     # INITIALIZER TO CREATE A NEW ASTEROID
     def __init__(self, x, y, source,width, height, size, \
-        direction, delete=False):
+        direction, delete=False, velocity=None):
         """
         Initializes a new Asteroid object with the given GImage attributes, and
         sets the size and velocity of the asteroid based on the "size" and 
@@ -339,26 +408,49 @@ class Asteroid(GImage):
 
         Parameter direction: The velocity direction of the asteroid.
         represented as a list of the x and y attributes of a Vector2 object.
-        Precondition: direction is a two-element list of ints or floats.
+        Precondition: direction is a two-element list or tuple of ints or floats.
 
         Parameter delete: Delete is a boolean stating if we need
         to delete the asteroid.
         Precondition: delete is a boolean.
+
+        Parameter velocity: the velocity already computed from direction and 
+        size, or None to compute it here.
+        Precondition: velocity is a two-element list or tuple of floats, or None.
         """
         super().__init__(x=x,y=y,source=source,width=width,height=height)
         self._size = size
-        vector = introcs.Vector2(x=direction[0],y=direction[1])
-        if direction == [0,0]:
-            self._velocity = introcs.Vector2(0,0)
-        elif size == SMALL_ASTEROID:
-            self._velocity = vector.normal()*SMALL_SPEED
-        elif size == MEDIUM_ASTEROID:
-            self._velocity = vector.normal()*MEDIUM_SPEED
-        elif size == LARGE_ASTEROID:
-            self._velocity = vector.normal()*LARGE_SPEED
+        self._setVelocity(direction, velocity)
         self.setDel(delete)
     
     # ADDITIONAL METHODS (MOVEMENT, COLLISIONS, ETC)
+    def reset(self, x, y, direction, velocity=None):
+        """
+        Re-initializes a recycled asteroid at a new position and direction.
+
+        The size (and so the image) of the asteroid does not change, so the 
+        drawing cache built by GImage is kept. The asteroid is no longer 
+        marked for deletion.
+
+        Parameter x: The horizontal coordinate of the asteroid's center.
+        Precondition: x is an int or float.
+
+        Parameter y: The vertical coordinate of the asteroid's center.
+        Precondition: y is an int or float.
+
+        Parameter direction: The velocity direction of the asteroid.
+        represented as a list of the x and y attributes of a Vector2 object.
+        Precondition: direction is a two-element list or tuple of ints or floats.
+
+        Parameter velocity: the velocity already computed from direction and 
+        size, or None to compute it here.
+        Precondition: velocity is a two-element list or tuple of floats, or None.
+        """
+        self.x = x
+        self.y = y
+        self._setVelocity(direction, velocity)
+        self.setDel(False)
+
     def move(self):
         """
         Moves the asteroids by updating the position of the asteroid based
@@ -367,4 +459,33 @@ class Asteroid(GImage):
         self.x += self._velocity.x
         self.y += self._velocity.y 
 
+    def _setVelocity(self, direction, velocity=None):
+        """
+        Sets the velocity of the asteroid from its size and the given direction.
+
+        If velocity is given, it is used as is. Wave computes the velocities
+        of a whole packed wave at once, which is much faster than normalizing 
+        each direction here.
+
+        Parameter direction: The velocity direction of the asteroid.
+        represented as a list of the x and y attributes of a Vector2 object.
+        Precondition: direction is a two-element list or tuple of ints or floats.
+
+        Parameter velocity: the velocity already computed from direction and 
+        size, or None to compute it here.
+        Precondition: velocity is a two-element list or tuple of floats, or None.
+        """
+        if not velocity is None:
+            self._velocity = introcs.Vector2(velocity[0],velocity[1])
+            return
+        vector = introcs.Vector2(x=direction[0],y=direction[1])
+        if direction[0] == 0 and direction[1] == 0:
+            self._velocity = introcs.Vector2(0,0)
+        elif self._size == SMALL_ASTEROID:
+            self._velocity = vector.normal()*SMALL_SPEED
+        elif self._size == MEDIUM_ASTEROID:
+            self._velocity = vector.normal()*MEDIUM_SPEED
+        elif self._size == LARGE_ASTEROID:
+            self._velocity = vector.normal()*LARGE_SPEED
+
 # IF YOU NEED ADDITIONAL MODEL CLASSES, THEY GO HERE
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Object pool module for Planetoids
+
+This module contains a simple recycling pool for model objects.  Creating a Bullet or
+an Asteroid is expensive, because the game2d initializer parses its keywords, builds
+three Kivy transforms and a new InstructionGroup.  When many of these objects are
+created and thrown away every second, the allocations show up as frame-time jitter.
+
+An ObjectPool keeps the objects that are no longer in use, and hands them out again
+instead of creating new ones.  A recycled object is re-initialized with its reset
+method, which only changes its position and velocity and keeps its drawing cache.
+"""
+
+
+class ObjectPool(object):
+    """
+    A class representing a pool of reusable objects.
+
+    The objects are created with the factory given to the initializer, and are
+    recycled with their reset method.  Both are called with the same arguments, so
+    an object in the pool must have a method reset that accepts the same arguments
+    as the factory.
+
+    The pool keeps statistics on how often it can recycle an object (a hit), and how
+    often it must create a new one (a miss).
+    """
+    # Attribute _factory: the function to create a new object
+    # Invariant: _factory is a callable returning a new object
+    #
+    # Attribute _free: the objects available for reuse
+    # Invariant: _free is a list of objects, possibly empty
+    #
+    # Attribute _hits: the number of acquires that reused an object
+    # Invariant: _hits is an int >= 0
+    #
+    # Attribute _misses: the number of acquires that created a new object
+    # Invariant: _misses is an int >= 0
+    #
+    # Attribute _releases: the number of objects returned to the pool
+    # Invariant: _releases is an int >= 0
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getHits(self):
+        """
+        Returns the number of acquires that reused a pooled object.
+        """
+        return self._hits
+
+    def getMisses(self):
+        """
+        Returns the number of acquires that had to create a new object.
+        """
+        return self._misses
+
+    def getStats(self):
+        """
+        Returns a dictionary of the pool statistics.
+
+        The keys are 'hits', 'misses', 'releases' and 'free' (the number of objects
+        currently waiting in the pool).
+        """
+        return {'hits': self._hits, 'misses': self._misses,
+                'releases': self._releases, 'free': len(self._free)}
+
+    # INITIALIZER
+    def __init__(self, factory):
+        """
+        Initializes a new, empty object pool.
+
+        Parameter factory: the function to create a new object
+        Precondition: factory is a callable returning a new object with a reset
+        method that takes the same arguments as factory
+        """
+        self._factory = factory
+        self._free = []
+        self._hits = 0
+        self._misses = 0
+        self._releases = 0
+
+    def __len__(self):
+        """
+        Returns the number of objects currently waiting in the pool.
+        """
+        return len(self._free)
+
+    # ADDITIONAL METHODS
+    def acquire(self, *args):
+        """
+        Returns an object initialized with the given arguments.
+
+        If the pool has a free object, it is reset with the arguments and returned.
+        Otherwise, a new object is created with the factory.
+
+        Parameter args: the arguments for the factory or reset method
+        Precondition: args are valid arguments for the factory
+        """
+        if self._free:
+            self._hits += 1
+            result = self._free.pop()
+            result.reset(*args)
+            return result
+        self._misses += 1
+        return self._factory(*args)
+
+    def release(self, obj):
+        """
+        Returns an object to the pool so that it can be reused.
+
+        The object must no longer be used (or drawn) by the caller.
+
+        Parameter obj: the object to recycle
+        Precondition: obj was created by this pool's factory
+        """
+        self._releases += 1
+        self._free.append(obj)
+
+    def reserve(self, count, *args):
+        """
+        Pre-warms the pool so that it has at least count free objects.
+
+        New objects are created with the factory and the given arguments.  This
+        does not count as a miss.
+
+        Parameter count: the number of free objects required
+        Precondition: count is an int >= 0
+
+        Parameter args: the arguments for the factory
+        Precondition: args are valid arguments for the factory
+        """
+        while len(self._free) < count:
+            self._free.append(self._factory(*args))
@@ -0,0 +1,285 @@
+"""
+Input recording and replay module for Planetoids
+
+This module records the keyboard state of a game session, one animation frame at a
+time, and plays it back later without a keyboard.  Replaying the same recording
+against two builds of the game runs both of them on an identical workload, which is
+what we need to compare their frame times.
+
+The class InputRecorder captures the keys held down each frame (as reported by the
+keys attribute of GInput), the key_count, and the frame time dt.  It writes them to a
+compact binary file as the game runs, through a buffer that is written out when the
+recorder is closed.  The class ReplayInput reads such a file back.
+It has the same is_key_down method and key_count attribute as GInput, so it can be
+passed to Wave.update, or used as the input of Planetoids.
+
+The replay file starts with the 4-byte magic number REPLAY_MAGIC and a version byte.
+After that is a sequence of records, each starting with a tag byte:
+
+    KEY record:   the key name as a length byte and UTF-8 bytes.  The key gets the
+                  next free bit in the key mask (in order of appearance).
+    FRAME record: dt (float64), the mask of keys held down (uint64) and key_count
+                  (uint8), all little-endian.
+
+The dt is kept at full precision, as a fixed timestep (SIM_TIMESTEP) runs a number of
+ticks that depends on the exact sum of the frame times.  Version 1 files stored dt as
+a float32; they can still be read, but may not replay a fixed timestep exactly.
+
+This module may NOT import game2d (or anything else that imports Kivy), so that
+recordings can be replayed headless.
+"""
+import struct
+
+# The magic number at the start of every replay file
+REPLAY_MAGIC = b'PLRP'
+# The version of the replay file format
+REPLAY_VERSION = 2
+
+# The record tags
+_TAG_KEY   = 1
+_TAG_FRAME = 2
+
+# The format of a frame record (after the tag), by file version
+_FRAMES = {1: struct.Struct('<fQB'), 2: struct.Struct('<dQB')}
+# The format of a frame record written by this module
+_FRAME = _FRAMES[REPLAY_VERSION]
+# The most keys that a replay file can track
+_MAX_KEYS = 64
+
+
+class InputRecorder(object):
+    """
+    A class that records the key state of an input handler to a replay file.
+
+    Call the method capture once per animation frame, before the frame uses the
+    input.  Each call appends a frame record to the file.  The file is buffered, so
+    the method close must be called when the game stops, or the last frames are lost.
+    """
+    # Attribute _input: the input handler being recorded
+    # Invariant: _input has the GInput attributes keys and key_count
+    #
+    # Attribute _file: the open replay file, or None if it is closed
+    # Invariant: _file is a binary file object or None
+    #
+    # Attribute _keys: the bit index of each key seen so far
+    # Invariant: _keys is a dict mapping key names to ints 0.._MAX_KEYS-1
+    #
+    # Attribute _frames: the number of frames recorded
+    # Invariant: _frames is an int >= 0
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getFrames(self):
+        """
+        Returns the number of frames recorded so far.
+        """
+        return self._frames
+
+    # INITIALIZER
+    def __init__(self, input, path):
+        """
+        Initializes a new recorder writing to the file at path.
+
+        Any existing file at path is replaced.
+
+        Parameter input: the input handler to record
+        Precondition: input has the GInput attributes keys and key_count
+
+        Parameter path: the file name of the recording
+        Precondition: path is a string
+        """
+        self._input = input
+        self._keys = {}
+        self._frames = 0
+        self._file = open(path,'wb')
+        self._file.write(REPLAY_MAGIC+bytes([REPLAY_VERSION]))
+
+    # ADDITIONAL METHODS
+    def capture(self, dt):
+        """
+        Records the current key state of the input handler as one frame.
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float)
+        """
+        mask = 0
+        for key in self._input.keys:
+            if not key in self._keys:
+                self._addKey(key)
+            mask |= 1 << self._keys[key]
+        count = min(max(self._input.key_count,0),255)
+        self._file.write(bytes([_TAG_FRAME])+_FRAME.pack(dt,mask,count))
+        self._frames += 1
+
+    def close(self):
+        """
+        Closes the replay file, writing out any buffered frames.  No more frames 
+        can be captured.
+        """
+        if not self._file is None:
+            self._file.close()
+            self._file = None
+
+    # HIDDEN METHODS
+    def _addKey(self, key):
+        """
+        Assigns the next free bit to key, and writes a key record for it.
+
+        Parameter key: the name of the key
+        Precondition: key is a string not yet in _keys
+
+        This method raises a ValueError if all of the bits are already taken.
+        """
+        if len(self._keys) >= _MAX_KEYS:
+            raise ValueError('too many keys to record %s' % repr(key))
+        name = key.encode('utf-8')
+        self._keys[key] = len(self._keys)
+        self._file.write(bytes([_TAG_KEY,len(name)])+name)
+
+
+class ReplayInput(object):
+    """
+    A class representing an input handler that plays back a replay file.
+
+    This class has the same is_key_down method and key_count attribute as GInput.
+    Before each frame, call the method advance to move to the next recorded frame.
+    It returns the recorded dt of that frame, or None once the recording is over.
+    """
+    # Attribute _frames: the recorded frames, in order
+    # Invariant: _frames is a list of (dt, keys, key_count) tuples, where keys is a
+    # frozenset of key names
+    #
+    # Attribute _index: the index of the current frame, or -1 before the first one
+    # Invariant: _index is an int, -1 <= _index <= len(_frames)
+
+    # IMMUTABLE ATTRIBUTES
+    @property
+    def key_count(self):
+        """
+        The number of keys held down in the current frame.
+
+        **Invariant**: Must be an int >= 0.
+        """
+        if 0 <= self._index < len(self._frames):
+            return self._frames[self._index][2]
+        return 0
+
+    @property
+    def keys(self):
+        """
+        The keys held down in the current frame.
+
+        **Invariant**: Must be a tuple of strings (possibly empty)
+        """
+        if 0 <= self._index < len(self._frames):
+            return tuple(self._frames[self._index][1])
+        return ()
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getFrame(self):
+        """
+        Returns the index of the current frame (-1 before the first advance).
+        """
+        return self._index
+
+    # INITIALIZER
+    def __init__(self, path):
+        """
+        Initializes a new replay from the file at path.
+
+        Parameter path: the file name of the recording
+        Precondition: path is a string naming a replay file
+
+        This method raises an IOError if the file is not a replay of a known version,
+        or if it is corrupt.
+        """
+        with open(path,'rb') as f:
+            data = f.read()
+        if len(data) < 5 or data[:4] != REPLAY_MAGIC:
+            raise IOError('%s is not a replay file' % repr(path))
+        if data[4] not in _FRAMES:
+            raise IOError('%s has an unknown version' % repr(path))
+        frame = _FRAMES[data[4]]
+
+        names = []
+        self._frames = []
+        pos = 5
+        while pos < len(data):
+            tag = data[pos]
+            if tag == _TAG_KEY and pos+1 < len(data) and pos+2+data[pos+1] <= len(data):
+                size = data[pos+1]
+                names.append(data[pos+2:pos+2+size].decode('utf-8'))
+                pos += 2+size
+            elif tag == _TAG_FRAME and pos+1+frame.size <= len(data):
+                dt, mask, count = frame.unpack_from(data,pos+1)
+                keys = frozenset(names[i] for i in range(len(names)) if mask >> i & 1)
+                self._frames.append((dt,keys,count))
+                pos += 1+frame.size
+            else:
+                raise IOError('%s is corrupt at byte %d' % (repr(path),pos))
+        self._index = -1
+
+    def __len__(self):
+        """
+        Returns the number of frames in the recording.
+        """
+        return len(self._frames)
+
+    # PUBLIC METHODS
+    def advance(self):
+        """
+        Returns the recorded dt of the next frame, or None if there are no more.
+
+        This method moves the replay to the next frame, changing the keys that are
+        held down.
+        """
+        if self._index < len(self._frames):
+            self._index += 1
+        if self._index < len(self._frames):
+            return self._frames[self._index][0]
+        return None
+
+    def rewind(self):
+        """
+        Moves the replay back to before the first frame.
+        """
+        self._index = -1
+
+    def is_key_down(self, key):
+        """
+        Returns True if key is held down in the current frame.
+
+        Parameter key: the key to test
+        Precondition: key is a string
+        """
+        if 0 <= self._index < len(self._frames):
+            return key in self._frames[self._index][1]
+        return False
+
+    def is_touch_down(self):
+        """
+        Returns False, as the mouse is not recorded.
+        """
+        return False
+
+
+def replayWave(wave, replay):
+    """
+    Returns the number of frames of replay fed to wave.
+
+    This function calls wave.update once for each recorded frame, with the recorded
+    dt and keys.  It stops early if the ship is destroyed or all of the asteroids are
+    destroyed, as the recording cannot continue the game from there.
+
+    Parameter wave: The wave to drive
+    Precondition: wave is a Wave object
+
+    Parameter replay: The recording to play back
+    Precondition: replay is a ReplayInput object
+    """
+    count = 0
+    dt = replay.advance()
+    while not dt is None and not wave.shipDied() and not wave.getAllDestroyed():
+        wave.update(dt, replay)
+        count += 1
+        dt = replay.advance()
+    return count
@@ -16,9 +16,17 @@ issue.  If you do not know, ask on Ed Discussions and we will answer.
 Aaron Baruch Ilan Klimberg
 12/7/2022
 """
-from game2d import *
 from consts import *
+if not HEADLESS:
+    from game2d import GImageBatch
 from models import *
+from field import *
+from broadphase import *
+from pool import *
+from wavefile import *
+import numpy as np
+import introcs
+import functools
 import random
 import datetime
 
@@ -55,26 +63,73 @@ class Wave(object):
     # LIST ANY ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
     # THE ATTRIBUTES LISTED ARE SUGGESTIONS ONLY AND CAN BE CHANGED AS YOU SEE FIT
     # Attribute _data: The data from the wave JSON, for reloading 
-    # Invariant: _data is a dict loaded from a JSON file
+    # Invariant: _data is a dict loaded from a JSON file, a PackedWave, or a
+    # WaveStream
+    #
+    # Attribute _stream: the stream the remaining asteroids are read from
+    # Invariant: _stream is a WaveStream that is not done, or None if every 
+    # asteroid of the wave has been added
     #
     # Attribute _ship: The player ship to control 
     # Invariant: _ship is a Ship object
     #
     # Attribute _asteroids: the asteroids on screen 
-    # Invariant: _asteroids is a list of Asteroid, possibly empty
+    # Invariant: _asteroids is a list of Asteroid, possibly empty. The positions of
+    # these objects are only up to date after a call to _syncAsteroids.
+    #
+    # Attribute _field: the array-backed state of the asteroids on screen
+    # Invariant: _field is an AsteroidField whose row i is the state of _asteroids[i]
+    #
+    # Attribute _grid: the broadphase grid over the asteroids, rebuilt in any frame
+    # with too many bullet-asteroid pairs to test them all
+    # Invariant: _grid is a SpatialGrid
     #
     # Attribute _bullets: the bullets currently on screen 
     # Invariant: _bullets is a list of Bullet, possibly empty
     #
+    # Attribute _bulletPool: the bullets that have left the screen, for reuse
+    # Invariant: _bulletPool is an ObjectPool of Bullet, sharing none with _bullets
+    #
+    # Attribute _asteroidPools: the destroyed asteroids, for reuse, by size
+    # Invariant: _asteroidPools is a dict mapping each size name to an ObjectPool 
+    # of Asteroid of that size, sharing none with _asteroids. A Wave continuing 
+    # this one is given the same pools.
+    #
     # Attribute _lives: the number of lives left 
     # Invariant: _lives is an int >= 0
     #
-    # Attribute _firerate: the number of frames until the player can fire again 
+    # Attribute _firerate: the number of ticks until the player can fire again 
     # Invariant: _firerate is an int >= 0
     #
+    # Attribute _timestep: the length of a simulation tick in seconds
+    # Invariant: _timestep is a float > 0, or None for one tick per update
+    #
+    # Attribute _accumulator: the time in seconds not yet simulated
+    # Invariant: _accumulator is a float >= 0
+    #
     # Attribute _allDestroyed: True if all of the asteroids have been destroyed,
     # False otherwise
-    # Invariant: _allDestroyed is a bool True or False
+    # Invariant: _allDestroyed is a bool True or False. It is never True while
+    # _stream is not None.
+    #
+    # Attribute _batch: the batch drawing all of the asteroids at once
+    # Invariant: _batch is a GImageBatch, or None to draw each Asteroid object
+    #
+    # Attribute _view: the retained view the ship, asteroids and bullets are on
+    # Invariant: _view is a GView in retained mode, or None if the wave has not been
+    # drawn to one. Any object added to the wave is drawn to _view, and any object
+    # removed from the wave is erased from it (except asteroids drawn by _batch).
+    #
+    # Attribute _generation: the generation of _view when it was last drawn to
+    # Invariant: _generation is an int >= 0
+    #
+    # Attribute _score: the points scored by the player, including those 
+    # scored before this wave was continued
+    # Invariant: _score is an int >= 0
+    #
+    # Attribute _sounds: the sound effects of the wave, by file name
+    # Invariant: _sounds is a SoundLibrary with the keys FIRE_SOUND, CRASH_SOUND 
+    # and the values of BLAST_SOUNDS, or None to play no sound
     
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
    
@@ -88,16 +143,82 @@ class Wave(object):
         """
         Returns asteroids list.
         """
+        self._syncAsteroids()
         return self._asteroids
     
+    def getScore(self):
+        """
+        Returns the points scored by the player.
+
+        A planetoid destroyed by a bullet is worth SCORE_POINTS of its size.
+        """
+        return self._score
+
     def getAllDestroyed(self):
         """
         Returns bool declaring if all asteroids have been destroyed.
         """
         return self._allDestroyed
+
+    def getData(self):
+        """
+        Returns the wave data this wave was created from.
+
+        This is the data to pass to a new Wave continuing this one. If the 
+        wave is still streaming its asteroids, the new Wave picks up the 
+        stream where this one left off.
+        """
+        return self._data
+
+    def isStreaming(self):
+        """
+        Returns True if asteroids are still being read from a WaveStream.
+        """
+        return not self._stream is None
+
+    def getTimestep(self):
+        """
+        Returns the length of a simulation tick in seconds, or None if the 
+        wave runs one tick per update.
+        """
+        return self._timestep
+
+    def setTimestep(self, value):
+        """
+        Sets the length of a simulation tick, and clears any unsimulated time.
+
+        Parameter value: the length of a simulation tick in seconds, or None to
+        run exactly one tick per update.
+        Precondition: value is None or a number (int or float) > 0.
+        """
+        self._timestep = value
+        self._accumulator = 0.0
+
+    def getAsteroidPools(self):
+        """
+        Returns the asteroid pools of this wave, by size.
+
+        These are the pools to pass to a new Wave continuing this one, so that 
+        the destroyed asteroids are still recycled after the player dies.
+        """
+        return self._asteroidPools
+
+    def getPoolStats(self):
+        """
+        Returns a dictionary of the object pool statistics for this wave.
+
+        The key 'bullets' maps to the statistics of the bullet pool, as returned 
+        by ObjectPool.getStats. The keys 'large', 'medium' and 'small' map to
+        the statistics of the asteroid pools of that size.
+        """
+        result = {'bullets': self._bulletPool.getStats()}
+        for size in self._asteroidPools:
+            result[size] = self._asteroidPools[size].getStats()
+        return result
     
     # INITIALIZER (standard form) TO CREATE SHIP AND ASTEROIDS
-    def __init__(self, json, lives, start, asteroids=None):
+    def __init__(self, json, lives, start, asteroids=None, sounds=None, \
+        score=0, pools=None):
         """
         Initializes a new Wave with the given JSON dictionary containing 
         all of the information about the ship. Sets initial asteroids
@@ -105,9 +226,15 @@ class Wave(object):
         game continues after the player has died), bullets, firereate, 
         lives, and allDestroyed bool.
 
+        If json is a WaveStream, only the first STREAM_BATCH asteroids are 
+        added when the wave starts. The rest are added STREAM_BATCH at a time 
+        by update. A Wave continuing a streaming wave (start is False) must be 
+        given the same stream, and adds the asteroids still left in it.
+
         Parameter json: the json file containing all of the information 
         about the wave.
-        Precondition: json is a dict loaded from a JSON file.
+        Precondition: json is a dict loaded from a JSON file, a PackedWave 
+        loaded from a wave file, or a WaveStream.
 
         Parameter lives: current value of lives left in the wave.
         Precondition: lives is an int.
@@ -120,25 +247,92 @@ class Wave(object):
         player has died.
         Precondition: asteroids is a list of Asteroid objects, possibly 
         empty
+
+        Parameter sounds: the sound effects to play
+        Precondition: sounds is a SoundLibrary with the keys FIRE_SOUND, 
+        CRASH_SOUND and the values of BLAST_SOUNDS, or None for no sound
+
+        Parameter score: the points scored before this wave
+        Precondition: score is an int >= 0
+
+        Parameter pools: the asteroid pools of the wave this one continues
+        Precondition: pools is a dict returned by getAsteroidPools, or None 
+        to make new pools
         """
+        self._sounds = sounds
+        self._score = score
         self._makeShip(json)
+        self._stream = None
+        if isinstance(json, WaveStream) and not json.isDone():
+            self._stream = json
         self._bullets = []
+        self._bulletPool = ObjectPool(self._makeBullet)
         self._firerate = 0
+        self.setTimestep(SIM_TIMESTEP)
         self._lives = lives
         self._allDestroyed = False
-        if start:
-            self._asteroids = self._addAsteroids()
+        self._asteroids = []
+        self._field = AsteroidField()
+        self._grid = SpatialGrid()
+        self._asteroidPools = pools
+        if pools is None:
+            self._asteroidPools = {}
+            for size in (LARGE_ASTEROID, MEDIUM_ASTEROID, SMALL_ASTEROID):
+                self._asteroidPools[size] = \
+                    ObjectPool(functools.partial(self._makeAsteroid,size))
+        self._view = None
+        self._generation = 0
+        self._batch = None
+        if BATCH_ASTEROIDS and not HEADLESS:
+            self._batch = GImageBatch(sources=[SMALL_IMAGE,MEDIUM_IMAGE,LARGE_IMAGE])
+        if start and isinstance(self._data, PackedWave):
+            self._addPackedAsteroids()
         else:
-            self._asteroids = asteroids
+            if start:
+                asteroids = self._addAsteroids()
+            for asteroid in asteroids:
+                self._spawnAsteroid(asteroid)
+        if self._stream is None:
+            self._reserveAsteroids()
 
     # UPDATE METHOD TO MOVE THE SHIP, ASTEROIDS, AND BULLETS
     def update(self, dt, input):
         """
         Animates the ship, asteroids, and bullets.
 
+        If the wave has no timestep, this runs exactly one simulation tick. 
+        Otherwise, dt is added to the unsimulated time, and a tick is run for 
+        each whole timestep of it (possibly none). At most SIM_MAX_STEPS ticks 
+        are run, and any whole timesteps left after that are dropped.
+
+        If the wave is streaming, up to STREAM_BATCH more asteroids are added
+        first.
+
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
 
+        Parameter input: the user input, used to control the ship and 
+        change state.
+        Precondition: input is an instance of GInput.
+        """
+        if not self._stream is None:
+            self._ingest()
+        if self._timestep is None:
+            self._tick(input)
+            return
+        self._accumulator += dt
+        steps = 0
+        while self._accumulator >= self._timestep and steps < SIM_MAX_STEPS:
+            self._tick(input)
+            self._accumulator -= self._timestep
+            steps += 1
+        if self._accumulator >= self._timestep:
+            self._accumulator %= self._timestep
+
+    def _tick(self, input):
+        """
+        Animates the ship, asteroids, and bullets by a single simulation tick.
+
         Parameter input: the user input, used to control the ship and 
         change state.
         Precondition: input is an instance of GInput.
@@ -154,16 +348,14 @@ class Wave(object):
                 self._addBullets()
             self._ship.thrust(input)
             self._wrap(self._ship)
-            for asteroid in self._asteroids:
-                asteroid.move()
-                self._wrap(asteroid)
+            self._field.step()
             self._firerate += 1
             for bullet in self._bullets:
                 bullet.move()
             i = 0
             while i < len(self._bullets):
                 if self._bullets[i].isOut():
-                    del self._bullets[i]
+                    self._removeBullet(i)
                 else:
                     i += 1
             self._collisions()
@@ -174,13 +366,36 @@ class Wave(object):
         Draws the ship, asteroids, and bullets objects to the game view 
         provided.
 
+        If the view is in retained mode, the objects are only drawn the first
+        time (or after the view was cleared). After that, the wave draws and 
+        erases objects as they are added and removed, and this method only 
+        moves the asteroids.
+
+        If the wave has a _batch, the asteroids are drawn by it as one mesh 
+        built from the _field, and the Asteroid objects are not drawn at all.
+
         Parameter view: the game view
         Precondition: view is an instance of GView
         """
+        if self._batch is None:
+            self._syncAsteroids()
+        else:
+            self._batch.set_quads(self._field.getPositions(),\
+                2*self._field.getRadii(),self._field.getTiers())
+        if view.retained:
+            if self._view is view and self._generation == view.generation:
+                return
+            self._view = view
+            self._generation = view.generation
+        else:
+            self._view = None
         if not self._ship is None:
             self._ship.draw(view)
-        for asteroid in self._asteroids:
-            asteroid.draw(view)
+        if self._batch is None:
+            for asteroid in self._asteroids:
+                asteroid.draw(view)
+        else:
+            self._batch.draw(view)
         for bullet in self._bullets:
             bullet.draw(view)
 
@@ -206,12 +421,17 @@ class Wave(object):
 
         Parameter json: the json file containing all of the information 
         about the wave.
-        Precondition: json is a dict loaded from a JSON file.
+        Precondition: json is a dict loaded from a JSON file, or a 
+        PackedWave loaded from a wave file.
         """
         self._data = json
-        self._ship = Ship(x=self._data["ship"]["position"][0],\
-            y=self._data["ship"]["position"][1],\
-            angle=self._data["ship"]["angle"],source=SHIP_IMAGE,\
+        if isinstance(self._data, (PackedWave, WaveStream)):
+            x, y, angle = self._data.getShip()
+        else:
+            x = self._data["ship"]["position"][0]
+            y = self._data["ship"]["position"][1]
+            angle = self._data["ship"]["angle"]
+        self._ship = Ship(x=x,y=y,angle=angle,source=SHIP_IMAGE,\
             width=(2*SHIP_RADIUS),height=(2*SHIP_RADIUS))
 
     def _wrap(self, value):
@@ -232,6 +452,49 @@ class Wave(object):
         if value.y < -DEAD_ZONE:
             value.y = value.y + (GAME_HEIGHT+2*DEAD_ZONE)
 
+    def _spawnAsteroid(self, asteroid):
+        """
+        Adds the given asteroid to the end of the _asteroids list, adds its
+        state to the end of the _field, and draws it to the _view.
+
+        Parameter asteroid: the asteroid to add
+        Precondition: asteroid is an Asteroid object
+        """
+        velocity = asteroid.getVelocity()
+        self._asteroids.append(asteroid)
+        if not self._view is None and self._batch is None:
+            asteroid.draw(self._view)
+        self._field.append(asteroid.x,asteroid.y,velocity.x,velocity.y,\
+            asteroid.width/2,asteroid.getSize())
+
+    def _removeAsteroid(self, i):
+        """
+        Removes the asteroid at index i from the _asteroids list, the _field and
+        the _view.
+
+        Parameter i: the index of the asteroid to remove
+        Precondition: i is an int, 0 <= i < len(self._asteroids)
+        """
+        asteroid = self._asteroids[i]
+        if not self._view is None and self._batch is None:
+            asteroid.erase(self._view)
+        self._asteroidPools[asteroid.getSize()].release(asteroid)
+        del self._asteroids[i]
+        self._field.remove(i)
+
+    def _syncAsteroids(self):
+        """
+        Copies the asteroid positions in the _field to the Asteroid objects.
+
+        The _field is the authority on where the asteroids are.  The Asteroid
+        objects only need their positions when they are drawn or handed to
+        another Wave, so they are brought up to date here rather than every step.
+        """
+        positions = self._field.getPositions().tolist()
+        for i in range(len(self._asteroids)):
+            self._asteroids[i].x = positions[i][0]
+            self._asteroids[i].y = positions[i][1]
+
     def _addAsteroids(self):
         """
         Returns a list of the Asteroid objects to be added to
@@ -239,33 +502,133 @@ class Wave(object):
         through the _data dictionary in the "asteroids" key.
 
         Obtains the necessary attributes from the dictionary to assign to the 
-        Asteroid objects being added to the list.
+        Asteroid objects being added to the list.  If _data is a WaveStream, 
+        they are read from the stream instead.
         """
+        if isinstance(self._data, WaveStream):
+            return self._readStream()
         result = []
         for i in range(len(self._data["asteroids"])):
-            if self._data["asteroids"][i]["size"] == SMALL_ASTEROID:
-                result.append(Asteroid(\
-                    x=self._data["asteroids"][i]["position"][0],\
-                    y=self._data["asteroids"][i]["position"][1],\
-                    source=SMALL_IMAGE,width=(2*SMALL_RADIUS),\
-                    height=(2*SMALL_RADIUS),size=SMALL_ASTEROID,\
-                    direction=self._data["asteroids"][i]["direction"]))
-            elif self._data["asteroids"][i]["size"] == MEDIUM_ASTEROID:
-                result.append(Asteroid(\
-                    x=self._data["asteroids"][i]["position"][0],\
-                    y=self._data["asteroids"][i]["position"][1],\
-                    source=MEDIUM_IMAGE,width=(2*MEDIUM_RADIUS),\
-                    height=(2*MEDIUM_RADIUS),size=MEDIUM_ASTEROID,\
-                    direction=self._data["asteroids"][i]["direction"]))
-            elif self._data["asteroids"][i]["size"] == LARGE_ASTEROID:
-                result.append(Asteroid(\
-                    x=self._data["asteroids"][i]["position"][0],\
-                    y=self._data["asteroids"][i]["position"][1],\
-                    source=LARGE_IMAGE,width=(2*LARGE_RADIUS),\
-                    height=(2*LARGE_RADIUS),size=LARGE_ASTEROID,\
-                    direction=self._data["asteroids"][i]["direction"]))
+            size = self._data["asteroids"][i]["size"]
+            if size in self._asteroidPools:
+                result.append(self._asteroidPools[size].acquire(\
+                    self._data["asteroids"][i]["position"][0],\
+                    self._data["asteroids"][i]["position"][1],\
+                    self._data["asteroids"][i]["direction"]))
         return result
 
+    def _addPackedAsteroids(self):
+        """
+        Adds the asteroids of the PackedWave _data to the wave in bulk.
+
+        The velocities are computed from the directions for every asteroid at
+        once, and the arrays of the wave are copied straight into the _field. 
+        Only the Asteroid objects are still made one at a time, and they are 
+        given their velocities rather than normalizing their directions.
+        """
+        tiers = self._data.getTiers()
+        positions = self._data.getPositions()
+        directions = self._data.getDirections()
+        velocities = np.zeros(directions.shape)
+        lengths = np.sqrt(directions[:,0]*directions[:,0]+\
+            directions[:,1]*directions[:,1])
+        moving = (directions[:,0] != 0) | (directions[:,1] != 0)
+        velocities[moving] = directions[moving]/lengths[moving,np.newaxis]*\
+            TIER_SPEEDS[tiers[moving],np.newaxis]
+        self._field.extend(positions,velocities,TIER_RADII[tiers],tiers)
+
+        tiers = tiers.tolist()
+        positions = positions.tolist()
+        directions = directions.tolist()
+        velocities = velocities.tolist()
+        for i in range(len(tiers)):
+            self._asteroids.append(self._asteroidPools[TIERS[tiers[i]]].acquire(\
+                positions[i][0],positions[i][1],directions[i],velocities[i]))
+
+    def _readStream(self):
+        """
+        Returns a list of up to STREAM_BATCH Asteroid objects read from the 
+        _stream, and sets _stream to None once it is done.
+        """
+        result = []
+        for (size, x, y, direction) in self._stream.readAsteroids(STREAM_BATCH):
+            if size in self._asteroidPools:
+                result.append(self._asteroidPools[size].acquire(x,y,direction))
+        if self._stream.isDone():
+            self._stream = None
+        return result
+
+    def _ingest(self):
+        """
+        Adds the next asteroids of the _stream to the wave.
+
+        The asteroids are spawned like any other, so they are drawn to the
+        retained _view (if any) right away.
+        """
+        for asteroid in self._readStream():
+            self._spawnAsteroid(asteroid)
+
+    def _makeAsteroid(self, size, x, y, direction, velocity=None):
+        """
+        Returns a new Asteroid object of the given size, position and direction.
+
+        This is the factory for the _asteroidPools. It is only called when 
+        there are no asteroids of that size to recycle.
+
+        Parameter size: the size of the asteroid.
+        Precondition: size is a string; either 'small', 'medium', or 'large'.
+
+        Parameter x: The horizontal coordinate of the asteroid's center.
+        Precondition: x is an int or float.
+
+        Parameter y: The vertical coordinate of the asteroid's center.
+        Precondition: y is an int or float.
+
+        Parameter direction: The velocity direction of the asteroid.
+        Precondition: direction is a two-element list or tuple of ints or floats.
+
+        Parameter velocity: the velocity already computed from direction and 
+        size, or None to compute it from them.
+        Precondition: velocity is a two-element list or tuple of floats, or None.
+        """
+        if size == SMALL_ASTEROID:
+            source = SMALL_IMAGE
+            radius = SMALL_RADIUS
+        elif size == MEDIUM_ASTEROID:
+            source = MEDIUM_IMAGE
+            radius = MEDIUM_RADIUS
+        else:
+            source = LARGE_IMAGE
+            radius = LARGE_RADIUS
+        return Asteroid(x=x,y=y,source=source,width=(2*radius),\
+            height=(2*radius),size=size,direction=direction,velocity=velocity)
+
+    def _reserveAsteroids(self):
+        """
+        Pre-warms the _asteroidPools for the worst case of splits in this wave.
+
+        If every asteroid is destroyed, each large asteroid becomes three 
+        medium asteroids, and each medium asteroid becomes three small ones. 
+        The pools are filled with that many asteroids up front (at most 
+        ASTEROID_RESERVE of each size), so that a split rarely has to create 
+        a new Asteroid object. Only the shortfall is made, so a Wave given the 
+        pools of the wave it continues makes few or none.
+
+        This is done even when the asteroids are drawn by a _batch, as every 
+        Asteroid is still a GImage, and making one mid-wave is what hitches.
+        """
+        large = 0
+        medium = 0
+        for asteroid in self._asteroids:
+            if asteroid.getSize() == LARGE_ASTEROID:
+                large += 1
+            elif asteroid.getSize() == MEDIUM_ASTEROID:
+                medium += 1
+        self._asteroidPools[MEDIUM_ASTEROID].reserve(\
+            min(3*large,ASTEROID_RESERVE),0,0,[0,0])
+        self._asteroidPools[SMALL_ASTEROID].reserve(\
+            min(3*(medium+3*large),ASTEROID_RESERVE),0,0,[0,0])
+
     def _addBullets(self):
         """
         Adds the Bullet objects to the _bullets attribute (list) by 
@@ -274,30 +637,60 @@ class Wave(object):
 
         Sets bullet _firerate to 0.
         """
-        shipPos = introcs.Vector2(self._ship.x,self._ship.y)
-        tip = (self._ship.getFacing().normal() * SHIP_RADIUS) + shipPos
-        self._bullets.append(Bullet(x=tip.x,y=tip.y,\
-            fillcolor=BULLET_COLOR,width=2*BULLET_RADIUS,\
-            height=2*BULLET_RADIUS,\
-            facing=self._ship.getFacing().normal()))
+        facing = self._ship.getFacing()
+        x = self._ship.x+facing.x*SHIP_RADIUS
+        y = self._ship.y+facing.y*SHIP_RADIUS
+        self._bullets.append(self._bulletPool.acquire(x,y,facing))
+        if not self._view is None:
+            self._bullets[-1].draw(self._view)
         self._firerate = 0
+        self._playSound(FIRE_SOUND)
 
-    def _doesCollide(self, asteroid, other):
+    def _makeBullet(self, x, y, facing):
         """
-        Returns True if the distance between the positions of two objects
-        is less than the sum of their radii, meaning that they collide.
+        Returns a new Bullet object at the given position and facing.
 
-        Parameter asteroid: the asteroid to that is being checked for collision
-        Precondition: asteroid is an Asteroid object
+        This is the factory for the _bulletPool. It is only called when there
+        are no bullets to recycle.
 
-        Parameter other: the object (ship or bullet) being checked for collision
-        Precondition: other is either a Ship or Bullet object
+        Parameter x: The horizontal coordinate of the bullet's center.
+        Precondition: x is an int or float.
+
+        Parameter y: The vertical coordinate of the bullet's center.
+        Precondition: y is an int or float.
+
+        Parameter facing: the ship's facing, converted to a unit vector.
+        Precondition: facing is a Vector2 object.
         """
-        distance = ((asteroid.x - other.x)**2 + (asteroid.y - other.y)**2)**0.5
-        if distance < (asteroid.width/2 + other.width/2):
-            return True
-        else:
-            return False
+        return Bullet(x=x,y=y,fillcolor=BULLET_COLOR,\
+            width=2*BULLET_RADIUS,height=2*BULLET_RADIUS,facing=facing)
+
+    def _removeBullet(self, i):
+        """
+        Removes the bullet at index i from the _bullets list (and _view), and 
+        returns it to the _bulletPool.
+
+        Parameter i: the index of the bullet to remove
+        Precondition: i is an int, 0 <= i < len(self._bullets)
+        """
+        if not self._view is None:
+            self._bullets[i].erase(self._view)
+        self._bulletPool.release(self._bullets[i])
+        del self._bullets[i]
+
+    def _playSound(self, name):
+        """
+        Plays the sound effect name, if the wave has sounds.
+
+        The SoundLibrary plays each effect at most once per animation frame, 
+        and caps the number playing at once, so that a burst of explosions 
+        costs no more than one.
+
+        Parameter name: the file name of the sound
+        Precondition: name is a key of _sounds
+        """
+        if not self._sounds is None:
+            self._sounds.play(name)
 
     def _collisions(self):
         """
@@ -315,7 +708,7 @@ class Wave(object):
         oldX = 0
         oldY = 0
         data=self._collisionData\
-            (mediumDeleted, largeDeleted, collisionVector, oldX, oldY, i=0)
+            (mediumDeleted, largeDeleted, collisionVector, oldX, oldY)
         mediumDeleted = data[0]
         largeDeleted = data[1]
         collisionVector = data[2]
@@ -330,21 +723,27 @@ class Wave(object):
             self._splitMediumAsteroid\
                 (mediumDeleted, oldX, oldY,\
                 collisionVector, resultantVector1, resultantVector2)
-        if len(self._asteroids) == 0:
+        if len(self._asteroids) == 0 and self._stream is None:
             self._allDestroyed = True 
 
     def _collisionData(self, mediumDeleted,\
-        largeDeleted, collisionVector, oldX, oldY, i):
+        largeDeleted, collisionVector, oldX, oldY):
         """
         Returns a list of mediumDeleted, largeDeleted, collisionVector, oldX, 
-        oldY, and i for _collisions() function.
+        and oldY for _collisions() function.
+
+        Finds the bullets and asteroids that have collided. If they collide then 
+        the bullet and asteroid that collided are deleted. Each bullet destroys 
+        at most one asteroid, and each asteroid is destroyed by at most one bullet.
 
-        Iterates through asteroids and bullets to see if the two have collided. 
-        If they collide then the bullet and asteroid that collided are deleted.
+        Checks the asteroids near the ship to see if one collides with the ship. 
+        If so then the asteroid and the ship are deleted, the ship being set to 
+        None.
 
-        Iterates through asteroids again to see if the asteroid
-        collides with ship. If so then the asteroid and the ship are 
-        deleted, the ship being set to None.
+        All collision tests are done in batches by the function collide. If 
+        there are more than COLLISION_BROADCAST_LIMIT bullet-asteroid pairs, 
+        the _grid is rebuilt, and only the asteroids in the grid cells around a 
+        bullet or the ship are tested.
 
         When collisions occur, a collisionVector is calculated and the
         center position of the deleted asteroid is saved so they can be used in 
@@ -370,39 +769,101 @@ class Wave(object):
 
         Parameter oldY: the y position of the colliding Asteroid's center.
         Precondition: oldY is an int or float.
-
-        Parameter i: the variable used to iterate through the while loop.
-        Precondition i: i is an int 0.
-        """
-        while i<len(self._asteroids):
-            n=0
-            while n<len(self._bullets) and self._asteroids[i].getDel()==False:
-                if self._doesCollide(self._asteroids[i],self._bullets[n]):
-                    collisionVector=self._bullets[n].getVelocity().normal()
-                    oldX=self._asteroids[i].x; oldY = self._asteroids[i].y
-                    del self._bullets[n]
-                    self._asteroids[i].setDel(True)
-                else: n+=1
-            if self._asteroids[i].getDel()==True:
-                if self._asteroids[i].getSize()=='large': largeDeleted+=1 
-                elif self._asteroids[i].getSize()=='medium': mediumDeleted+=1
-                del self._asteroids[i]
-            else: i+=1
-        i=0
-        while i<len(self._asteroids) and not self._ship is None:
-            if not (self._asteroids[i].getDel()==True):
-                if self._doesCollide(self._asteroids[i],self._ship):
-                    if self._ship.getVelocity()==introcs.Vector2(0,0):
-                        collisionVector=self._ship.getFacing()
-                        oldX=self._asteroids[i].x; oldY=self._asteroids[i].y
-                    else:
-                        collisionVector=self._ship.getVelocity().normal()
-                        oldX=self._asteroids[i].x; oldY=self._asteroids[i].y
-                    self._shipColSplit(mediumDeleted,\
-                        largeDeleted, collisionVector, i, oldX, oldY)
-                else: i+=1
+        """
+        useGrid = len(self._bullets)*len(self._field) > COLLISION_BROADCAST_LIMIT
+        if useGrid:
+            self._grid.rebuild(self._field.getPositions())
+        hits = self._bulletHits(useGrid)
+        for (i, n) in hits:
+            collisionVector=self._bullets[n].getVelocity().normal()
+            oldX, oldY = self._field.getPosition(i)
+            self._asteroids[i].setDel(True)
+        crash = self._shipHit(useGrid)
+        for n in sorted([hit[1] for hit in hits], reverse=True):
+            self._removeBullet(n)
+        for (i, n) in reversed(hits):
+            if self._asteroids[i].getSize()=='large': largeDeleted+=1 
+            elif self._asteroids[i].getSize()=='medium': mediumDeleted+=1
+            self._playSound(BLAST_SOUNDS[self._asteroids[i].getSize()])
+            self._score += SCORE_POINTS[self._asteroids[i].getSize()]
+            self._removeAsteroid(i)
+        if not crash is None:
+            self._playSound(CRASH_SOUND)
+            i = crash - len([hit for hit in hits if hit[0] < crash])
+            if self._ship.getVelocity()==introcs.Vector2(0,0):
+                collisionVector=self._ship.getFacing()
+            else:
+                collisionVector=self._ship.getVelocity().normal()
+            oldX, oldY = self._field.getPosition(i)
+            self._shipColSplit(mediumDeleted,\
+                largeDeleted, collisionVector, i, oldX, oldY)
         return [mediumDeleted, largeDeleted, collisionVector, oldX, oldY]  
 
+    def _bulletHits(self, useGrid):
+        """
+        Returns a list of (asteroid index, bullet index) pairs for the bullets 
+        that hit an asteroid this frame, sorted by asteroid index.
+
+        Each asteroid is hit by the first bullet (in the _bullets list) that 
+        collides with it, and a bullet that has hit an asteroid is used up and 
+        cannot hit another one.
+
+        Parameter useGrid: whether to only test the pairs found by the _grid 
+        (which must be up to date), instead of every bullet-asteroid pair.
+        Precondition: useGrid is a bool True or False.
+        """
+        positions = np.array([[bullet.x, bullet.y] for bullet in self._bullets],\
+            dtype=float).reshape(-1,2)
+        points, candidates = self._collide(positions, BULLET_RADIUS, useGrid)
+        result = []
+        used = set()
+        last = -1
+        for n, i in zip(points.tolist(), candidates.tolist()):
+            if i != last and not n in used:
+                used.add(n)
+                result.append((i,n))
+                last = i
+        return result
+
+    def _shipHit(self, useGrid):
+        """
+        Returns the index of the first asteroid that collides with the ship, or 
+        None if there is no such asteroid (or no ship).
+
+        Asteroids that are already marked for deletion are ignored.
+
+        Parameter useGrid: whether to only test the asteroids near the ship 
+        found by the _grid (which must be up to date).
+        Precondition: useGrid is a bool True or False.
+        """
+        if self._ship is None:
+            return None
+        position = np.array([[self._ship.x, self._ship.y]],dtype=float)
+        points, candidates = self._collide(position, SHIP_RADIUS, useGrid)
+        for i in candidates.tolist():
+            if not self._asteroids[i].getDel():
+                return i
+        return None
+
+    def _collide(self, points, radius, useGrid):
+        """
+        Returns the pairs (p, a) of points and asteroids that collide, as int 
+        arrays sorted by asteroid and then by point.
+
+        Parameter points: the centers of the objects (bullets or the ship)
+        Precondition: points is a float array of shape (m,2)
+
+        Parameter radius: the radius of the objects
+        Precondition: radius is an int or float > 0
+
+        Parameter useGrid: whether to only test the pairs found by the _grid 
+        (which must be up to date), instead of every pair.
+        Precondition: useGrid is a bool True or False.
+        """
+        pairs = self._grid.pairs(points) if useGrid else None
+        return collide(points,self._field.getPositions(),\
+            self._field.getReach(radius),pairs)
+
     def _shipColSplit(self, mediumDeleted, largeDeleted, \
         collisionVector, i, oldX, oldY):
         """
@@ -448,7 +909,9 @@ class Wave(object):
             mediumDeleted += 1
             self._splitMediumAsteroid(mediumDeleted, oldX, oldY,\
         collisionVector, resultantVector1, resultantVector2)
-        del self._asteroids[i]
+        self._removeAsteroid(i)
+        if not self._view is None:
+            self._ship.erase(self._view)
         self._ship=None 
     
     def _makeResultantVector1(self,collisionVector):
@@ -464,12 +927,10 @@ class Wave(object):
         or from the collision of a ship and an asteroid.
         Precondition: collisionVector is a Vector2 object.
         """
-        rad = degToRad(120.0)
+        turn = facingVector(120.0)
         resultantVector1 = introcs.Vector2\
-            ((collisionVector.x * math.cos(rad) - \
-            collisionVector.y * math.sin(rad)),\
-            (collisionVector.x * math.sin(rad) + \
-            collisionVector.y * math.cos(rad)))
+            ((collisionVector.x * turn.x - collisionVector.y * turn.y),\
+            (collisionVector.x * turn.y + collisionVector.y * turn.x))
         resultantVector1.normal()
         return resultantVector1
 
@@ -487,12 +948,10 @@ class Wave(object):
         or from the collision of a ship and an asteroid.
         Precondition: collisionVector is a Vector2 object.
         """
-        rad = degToRad(-120.0)
+        turn = facingVector(-120.0)
         resultantVector2 = introcs.Vector2\
-            ((collisionVector.x * math.cos(rad) - \
-            collisionVector.y * math.sin(rad)),\
-            (collisionVector.x * math.sin(rad) + \
-            collisionVector.y * math.cos(rad)))
+            ((collisionVector.x * turn.x - collisionVector.y * turn.y),\
+            (collisionVector.x * turn.y + collisionVector.y * turn.x))
         resultantVector2.normal()
         return resultantVector2
 
@@ -528,22 +987,16 @@ class Wave(object):
         for i in range(largeDeleted):
             center = MEDIUM_RADIUS*collisionVector
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=MEDIUM_IMAGE,width=(2*MEDIUM_RADIUS),\
-                    height=(2*MEDIUM_RADIUS),size=MEDIUM_ASTEROID,\
-                        direction=[collisionVector.x, collisionVector.y]))
+            self._spawnAsteroid(self._asteroidPools[MEDIUM_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[collisionVector.x, collisionVector.y]))
             center = MEDIUM_RADIUS*resultantVector1
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=MEDIUM_IMAGE,width=(2*MEDIUM_RADIUS),\
-                    height=(2*MEDIUM_RADIUS),size=MEDIUM_ASTEROID,\
-                        direction=[resultantVector1.x, resultantVector1.y]))  
+            self._spawnAsteroid(self._asteroidPools[MEDIUM_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[resultantVector1.x, resultantVector1.y]))  
             center = MEDIUM_RADIUS*resultantVector2
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=MEDIUM_IMAGE,width=(2*MEDIUM_RADIUS),\
-                    height=(2*MEDIUM_RADIUS),size=MEDIUM_ASTEROID,\
-                        direction=[resultantVector2.x, resultantVector2.y]))   
+            self._spawnAsteroid(self._asteroidPools[MEDIUM_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[resultantVector2.x, resultantVector2.y]))   
 
     def _splitMediumAsteroid(self, mediumDeleted, oldX, oldY,\
         collisionVector, resultantVector1, resultantVector2):
@@ -577,19 +1030,13 @@ class Wave(object):
         for i in range(mediumDeleted):
             center = SMALL_RADIUS*collisionVector
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=SMALL_IMAGE,width=(2*SMALL_RADIUS),\
-                    height=(2*SMALL_RADIUS),size=SMALL_ASTEROID,\
-                        direction=[collisionVector.x, collisionVector.y]))
+            self._spawnAsteroid(self._asteroidPools[SMALL_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[collisionVector.x, collisionVector.y]))
             center = SMALL_RADIUS*resultantVector1
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=SMALL_IMAGE,width=(2*SMALL_RADIUS),\
-                    height=(2*SMALL_RADIUS),size=SMALL_ASTEROID,\
-                        direction=[resultantVector1.x, resultantVector1.y]))  
+            self._spawnAsteroid(self._asteroidPools[SMALL_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[resultantVector1.x, resultantVector1.y]))  
             center = SMALL_RADIUS*resultantVector2
             xandyList = [oldX+center.x, oldY+center.y]
-            self._asteroids.append(Asteroid(x=xandyList[0],y=xandyList[1],\
-                source=SMALL_IMAGE,width=(2*SMALL_RADIUS),\
-                    height=(2*SMALL_RADIUS),size=SMALL_ASTEROID,\
-                        direction=[resultantVector2.x, resultantVector2.y]))  
\ No newline at end of file
+            self._spawnAsteroid(self._asteroidPools[SMALL_ASTEROID].acquire(\
+                xandyList[0],xandyList[1],[resultantVector2.x, resultantVector2.y]))  
\ No newline at end of file
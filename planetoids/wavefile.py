@@ -0,0 +1,515 @@
+"""
+Binary wave file module for Planetoids
+
+The waves in the Data folder are JSON files, with one dictionary per asteroid.  That
+is easy to write by hand, but slow for the stress and campaign waves with tens of
+thousands of asteroids: the whole file has to be parsed by json.loads, and Wave then
+walks the asteroids dictionary by dictionary.
+
+This module compiles a wave JSON into a packed binary file, and loads it back as
+NumPy arrays with no parsing at all.  The class PackedWave is the loaded wave.  It can
+be passed to Wave in place of the JSON dictionary.
+
+For waves too large to load at once, the class WaveStream reads a wave (in either
+format) a few asteroids at a time, holding only a small buffer of the file in memory.
+It can also be passed to Wave, which then starts play as soon as the ship is read,
+and adds the rest of the asteroids over the following frames.
+
+The wave file starts with a header: the 4-byte magic number WAVE_MAGIC, a version
+byte, three bytes of padding, the ship position and angle (three float64) and the
+number of asteroids (uint32, followed by four bytes of padding).  After that is one
+fixed-width record per asteroid:
+
+    tier      (uint8)      the size of the asteroid, as an index into field.TIERS
+    padding   (7 bytes)
+    position  (2 float64)  the asteroid center
+    direction (2 float64)  the velocity direction of the asteroid
+
+All values are little-endian.  As the records are 8-byte aligned, the loader reads
+them straight into a NumPy structured array, either with numpy.frombuffer or by
+memory mapping the file.
+
+To compile a wave from the planetoids folder:
+
+    python wavefile.py Data/wave1.json Data/wave1.wave
+
+This module may NOT import game2d (or anything else that imports Kivy), so that
+wave files can be loaded headless.
+"""
+from field import TIERS, sizeTier
+import numpy as np
+import struct
+import os.path
+import json
+import sys
+
+# The magic number at the start of every wave file
+WAVE_MAGIC = b'PLWV'
+# The version of the wave file format
+WAVE_VERSION = 1
+# The file extension of wave files
+WAVE_SUFFIX = '.wave'
+
+# The format of the header: magic, version, ship x, ship y, ship angle, count
+_HEADER = struct.Struct('<4sB3xdddI4x')
+# The format of an asteroid record
+_RECORD = np.dtype({'names': ['tier','position','direction'],
+                    'formats': ['u1',('<f8',(2,)),('<f8',(2,))],
+                    'offsets': [0,8,24], 'itemsize': 40})
+
+# The number of characters (or records) that a WaveStream reads at a time
+STREAM_CHUNK = 1 << 16
+
+# The loaded wave files, as (modification stamp, PackedWave) by path
+_cache = {}
+
+
+def isWaveFile(name):
+    """
+    Returns True if name has the extension of a wave file.
+
+    Parameter name: The file name
+    Precondition: name is a string
+    """
+    return name[-len(WAVE_SUFFIX):].lower() == WAVE_SUFFIX
+
+
+def compileWave(data, path):
+    """
+    Writes the wave JSON dictionary data to a wave file at path.
+
+    Any existing file at path is replaced.  The keys of data other than "ship" and
+    "asteroids" (such as "comment") are not stored.
+
+    Parameter data: the wave to compile
+    Precondition: data is a dict loaded from a wave JSON file. Every asteroid has
+    a size of 'small', 'medium' or 'large'.
+
+    Parameter path: the file name of the wave file
+    Precondition: path is a string
+    """
+    asteroids = data["asteroids"]
+    records = np.zeros(len(asteroids),dtype=_RECORD)
+    records['tier'] = [sizeTier(item["size"]) for item in asteroids]
+    if len(asteroids) > 0:
+        records['position'] = [item["position"] for item in asteroids]
+        records['direction'] = [item["direction"] for item in asteroids]
+
+    ship = data["ship"]
+    header = _HEADER.pack(WAVE_MAGIC,WAVE_VERSION,ship["position"][0],\
+        ship["position"][1],ship["angle"],len(asteroids))
+    with open(path,'wb') as f:
+        f.write(header)
+        f.write(records.tobytes())
+
+
+def loadWave(path, mapped=False):
+    """
+    Returns the PackedWave stored in the wave file at path.
+
+    The wave is read in a single call, or memory mapped if mapped is True (which
+    is better for a wave too large to read at once).  Loaded waves are cached, and
+    the file is only loaded again if its modification time or size changes.  As
+    a PackedWave cannot be modified, the same object can be shared.
+
+    Parameter path: the file name of the wave file
+    Precondition: path is a string naming a wave file
+
+    Parameter mapped: whether to memory map the file
+    Precondition: mapped is a bool
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if path in _cache and _cache[path][0] == stamp:
+        return _cache[path][1]
+
+    if mapped:
+        with open(path,'rb') as f:
+            header = f.read(_HEADER.size)
+    else:
+        with open(path,'rb') as f:
+            data = f.read()
+        header = data[:_HEADER.size]
+    x, y, angle, count = _readHeader(header,path,stat.st_size)
+
+    if mapped and count > 0:
+        records = np.memmap(path,dtype=_RECORD,mode='r',offset=_HEADER.size,\
+            shape=(count,))
+    elif mapped:
+        records = np.zeros(0,dtype=_RECORD)
+    else:
+        records = np.frombuffer(data,dtype=_RECORD,count=count,offset=_HEADER.size)
+    result = PackedWave(x, y, angle, records)
+    _cache[path] = (stamp, result)
+    return result
+
+
+def _readHeader(header, path, size):
+    """
+    Returns the tuple (x, y, angle, count) stored in the header of a wave file.
+
+    This function raises an IOError if the header is not valid, or the file size
+    does not match the number of asteroids.
+
+    Parameter header: the first bytes of the file
+    Precondition: header is a bytes object
+
+    Parameter path: the file name, for error messages
+    Precondition: path is a string
+
+    Parameter size: the size of the file in bytes
+    Precondition: size is an int >= 0
+    """
+    if len(header) < _HEADER.size:
+        raise IOError('%s is not a wave file' % repr(path))
+    magic, version, x, y, angle, count = _HEADER.unpack(header[:_HEADER.size])
+    if magic != WAVE_MAGIC:
+        raise IOError('%s is not a wave file' % repr(path))
+    if version != WAVE_VERSION:
+        raise IOError('%s has an unknown version' % repr(path))
+    if size != _HEADER.size+count*_RECORD.itemsize:
+        raise IOError('%s is truncated' % repr(path))
+    return (x, y, angle, count)
+
+
+class PackedWave(object):
+    """
+    A class representing a wave loaded from a wave file.
+
+    A PackedWave has the same information as the "ship" and "asteroids" of a wave
+    JSON dictionary, but the asteroids are stored as NumPy arrays.  It can be passed
+    to Wave in place of the JSON dictionary.
+
+    The arrays are read-only, so a PackedWave never changes once it is loaded.
+    """
+    # Attribute _ship: the ship position and angle
+    # Invariant: _ship is a tuple (x, y, angle) of floats
+    #
+    # Attribute _records: the asteroid records, in the format _RECORD
+    # Invariant: _records is a read-only NumPy structured array
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getShip(self):
+        """
+        Returns the ship position and angle as a tuple (x, y, angle).
+        """
+        return self._ship
+
+    def getTiers(self):
+        """
+        Returns the asteroid size tiers (indices into field.TIERS) as an (n,) array.
+        """
+        return self._records['tier']
+
+    def getPositions(self):
+        """
+        Returns the asteroid centers as an (n,2) array.
+        """
+        return self._records['position']
+
+    def getDirections(self):
+        """
+        Returns the asteroid velocity directions as an (n,2) array.
+        """
+        return self._records['direction']
+
+    # INITIALIZER
+    def __init__(self, x, y, angle, records):
+        """
+        Initializes a new packed wave.
+
+        Parameter x: The horizontal coordinate of the ship's center.
+        Precondition: x is a float.
+
+        Parameter y: The vertical coordinate of the ship's center.
+        Precondition: y is a float.
+
+        Parameter angle: The angle of the ship in degrees.
+        Precondition: angle is a float.
+
+        Parameter records: the asteroid records
+        Precondition: records is a NumPy array with dtype _RECORD
+        """
+        self._ship = (x, y, angle)
+        if records.flags.writeable:
+            records = records.view()
+            records.flags.writeable = False
+        self._records = records
+
+    def __len__(self):
+        """
+        Returns the number of asteroids in the wave.
+        """
+        return len(self._records)
+
+    # PUBLIC METHODS
+    def toJson(self):
+        """
+        Returns this wave as a wave JSON dictionary.
+        """
+        tiers = self.getTiers().tolist()
+        positions = self.getPositions().tolist()
+        directions = self.getDirections().tolist()
+        asteroids = []
+        for i in range(len(tiers)):
+            asteroids.append({"size": TIERS[tiers[i]], "position": positions[i],\
+                "direction": directions[i]})
+        return {"ship": {"position": list(self._ship[:2]), "angle": self._ship[2]},\
+            "asteroids": asteroids}
+
+
+class WaveStream(object):
+    """
+    A class that reads the asteroids of a wave file a few at a time.
+
+    The file may be a wave JSON file or a compiled wave file.  The ship is read
+    when the stream is created, and the asteroids are read on demand by the method
+    readAsteroids.  Only STREAM_CHUNK characters (or records) of the file are held
+    in memory at a time.  So memory stays bounded no matter how large the wave is,
+    provided that the "ship" of a JSON file comes before its "asteroids" (any
+    asteroids read while looking for the ship are kept until they are asked for).
+
+    A JSON file is parsed one value at a time with json.JSONDecoder.raw_decode, so
+    each asteroid dictionary is decoded as soon as it is complete.  The file is
+    closed once every asteroid has been read.
+    """
+    # Attribute _path: the file name of the wave
+    # Invariant: _path is a string
+    #
+    # Attribute _file: the open wave file, or None once it is closed
+    # Invariant: _file is a file object (text for JSON, binary for wave files)
+    #
+    # Attribute _ship: the ship position and angle
+    # Invariant: _ship is a tuple (x, y, angle) of numbers, or None before it is read
+    #
+    # Attribute _pending: the asteroids read from the file but not yet returned
+    # Invariant: _pending is a list of asteroid tuples (see readAsteroids)
+    #
+    # Attribute _count: the number of asteroids returned so far
+    # Invariant: _count is an int >= 0
+    #
+    # Attribute _remaining: the number of records left in a compiled wave file
+    # Invariant: _remaining is an int >= 0, or None for a JSON file
+    #
+    # Attribute _buffer: the part of a JSON file read but not yet parsed
+    # Invariant: _buffer is a string
+    #
+    # Attribute _pos: the position of the next character to parse in _buffer
+    # Invariant: _pos is an int, 0 <= _pos <= len(_buffer)
+    #
+    # Attribute _inside: whether the parser is inside the "asteroids" list
+    # Invariant: _inside is a bool
+    #
+    # Attribute _decoder: the JSON decoder for the values in the file
+    # Invariant: _decoder is a json.JSONDecoder
+
+    # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getShip(self):
+        """
+        Returns the ship position and angle as a tuple (x, y, angle).
+        """
+        return self._ship
+
+    def getCount(self):
+        """
+        Returns the number of asteroids read from the stream so far.
+        """
+        return self._count
+
+    def isDone(self):
+        """
+        Returns True if every asteroid in the wave has been read.
+        """
+        return self._file is None and len(self._pending) == 0
+
+    # INITIALIZER
+    def __init__(self, path):
+        """
+        Initializes a new stream over the wave file at path, and reads the ship.
+
+        The format of the file is chosen by its extension (see isWaveFile).  This
+        raises an IOError if the file is not a valid wave, or it has no ship.
+
+        Parameter path: the file name of the wave
+        Precondition: path is a string naming a wave JSON file or wave file
+        """
+        self._path = path
+        self._ship = None
+        self._pending = []
+        self._count = 0
+        self._remaining = None
+        self._buffer = ''
+        self._pos = 0
+        self._inside = False
+        self._decoder = json.JSONDecoder()
+        if isWaveFile(path):
+            self._file = open(path,'rb')
+            header = self._file.read(_HEADER.size)
+            x, y, angle, count = _readHeader(header,path,os.path.getsize(path))
+            self._ship = (x, y, angle)
+            self._remaining = count
+            if count == 0:
+                self.close()
+        else:
+            self._file = open(path,encoding='utf-8')
+            if self._skip() != '{':
+                self.close()
+                raise IOError('%s is not a wave file' % repr(path))
+            self._pos += 1
+            while self._ship is None and not self._file is None:
+                self._parse()
+        if self._ship is None:
+            raise IOError('%s has no ship' % repr(path))
+
+    # PUBLIC METHODS
+    def readAsteroids(self, limit):
+        """
+        Returns a list of at most limit asteroids read from the stream.
+
+        Each asteroid is a tuple (size, x, y, direction), where size is the size
+        name, (x, y) is the center, and direction is a two-element list.  The list
+        is shorter than limit (possibly empty) only at the end of the wave.
+
+        Parameter limit: the most asteroids to read
+        Precondition: limit is an int > 0
+        """
+        if not self._remaining is None:
+            self._readRecords(limit)
+        else:
+            while len(self._pending) < limit and not self._file is None:
+                self._parse()
+        result = self._pending[:limit]
+        del self._pending[:limit]
+        self._count += len(result)
+        return result
+
+    def close(self):
+        """
+        Closes the wave file.  No more asteroids are read after this.
+        """
+        if not self._file is None:
+            self._file.close()
+            self._file = None
+        self._buffer = ''
+        self._pos = 0
+
+    # HELPER METHODS
+    def _readRecords(self, limit):
+        """
+        Reads at most limit records of a compiled wave file into _pending.
+
+        Parameter limit: the most records to read
+        Precondition: limit is an int > 0
+        """
+        count = min(limit-len(self._pending),self._remaining)
+        if count > 0:
+            data = self._file.read(count*_RECORD.itemsize)
+            records = np.frombuffer(data,dtype=_RECORD)
+            if len(records) < count:
+                raise IOError('%s is truncated' % repr(self._path))
+            tiers = records['tier'].tolist()
+            positions = records['position'].tolist()
+            directions = records['direction'].tolist()
+            for i in range(count):
+                self._pending.append((TIERS[tiers[i]],positions[i][0],\
+                    positions[i][1],directions[i]))
+            self._remaining -= count
+        if self._remaining == 0:
+            self.close()
+
+    def _fill(self):
+        """
+        Returns True if more of the JSON file was read into _buffer.
+
+        The characters before _pos are dropped from the buffer first.
+        """
+        chunk = self._file.read(STREAM_CHUNK)
+        if len(chunk) == 0:
+            return False
+        self._buffer = self._buffer[self._pos:]+chunk
+        self._pos = 0
+        return True
+
+    def _skip(self):
+        """
+        Returns the next character that is not whitespace, or '' at the end.
+
+        The whitespace is skipped, but the character itself is not.
+        """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _decode(self):
+        """
+        Returns the next JSON value in the file, reading more of it as needed.
+
+        A value is only accepted once the delimiter after it (a comma, colon or
+        closing bracket) has been read.  Otherwise, a number cut off at the end of
+        the buffer (such as "1." for "1.5") would decode as a different number.
+        """
+        self._skip()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer,self._pos)
+            except ValueError:
+                end = None
+            if not end is None:
+                after = end
+                while after < len(self._buffer) and self._buffer[after].isspace():
+                    after += 1
+                if after < len(self._buffer) and self._buffer[after] in ',:]}':
+                    self._pos = end
+                    return value
+            if not self._fill():
+                raise IOError('%s is not a wave file' % repr(self._path))
+
+    def _parse(self):
+        """
+        Parses the next step of the JSON file.
+
+        A step is a key and its value outside of the "asteroids" list, or a single
+        asteroid inside of it.  Asteroids are added to _pending, and the ship is
+        stored in _ship.  The file is closed at the end of the wave.
+        """
+        char = self._skip()
+        if char == ',':
+            self._pos += 1
+            char = self._skip()
+        if char == '' or (char == '}' and not self._inside):
+            self.close()
+        elif char == ']' and self._inside:
+            self._pos += 1
+            self._inside = False
+        elif self._inside:
+            item = self._decode()
+            self._pending.append((item["size"],item["position"][0],\
+                item["position"][1],item["direction"]))
+        else:
+            key = self._decode()
+            if self._skip() != ':':
+                raise IOError('%s is not a wave file' % repr(self._path))
+            self._pos += 1
+            if key == "asteroids":
+                if self._skip() != '[':
+                    raise IOError('%s is not a wave file' % repr(self._path))
+                self._pos += 1
+                self._inside = True
+            else:
+                value = self._decode()
+                if key == "ship":
+                    self._ship = (value["position"][0],value["position"][1],\
+                        value["angle"])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python wavefile.py wave.json wave'+WAVE_SUFFIX)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        compileWave(json.load(f),sys.argv[2])
+    print('%s: %d asteroids' % (sys.argv[2],len(loadWave(sys.argv[2]))))